@@ -4,65 +4,142 @@ Exporta dados processados para CSV para consumo do dashboard
 """
 
 import pandas as pd
+import numpy as np
+import argparse
+import glob
+import gzip
+import hashlib
 import json
 from datetime import datetime
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+from carregador_dados import carregar_produtos, carregar_estoque, carregar_vendas
+from analise_estoque import classificar_estoque
+from cubo_vendas import CuboVendas
+from dimensao_data import MESES_PT
+from instrumentacao import Instrumentador
+from cache_kpis import CacheKPIs, impressao_dataframe
+from selecao_top import top_n
+
+DIMENSOES_DRILLDOWN = ['Filial', 'Categoria', 'Ano', 'Mes']
+TOP_PRODUTOS_CELULA = 10
+MANIFESTO = 'manifest.json'
+PREFIXO_PACOTE = 'dashboard_'
+
+
+def _centavos(serie):
+    return np.rint(serie.to_numpy(dtype='float64') * 100).astype('int64').tolist()
+
 
 class ExportadorDashboard:
     
-    def __init__(self):
+    def __init__(self, instrumentador=None, cache_kpis=None):
         self.output_dir = 'data/dashboard'
+        self.cache_kpis = cache_kpis
+        self.df_vendas = None
+        self.conteudos = {}
+        self.alterados = []
+        self.cubo_drilldown = None
+        self.instrumentador = instrumentador or Instrumentador('export')
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
     
     def carregar_dados(self):
-        self.df_produtos = pd.read_excel('data/produtos.xlsx')
-        self.df_estoque = pd.read_excel('data/estoque_filiais.xlsx')
-        self.df_vendas = pd.read_excel('data/vendas_jan_jun_2024.xlsx', sheet_name='Vendas_Completo')
+        df_vendas = carregar_vendas()
+        df_vendas['Data'] = pd.to_datetime(df_vendas['Data'], format='%d/%m/%Y')
+        df_vendas = df_vendas[df_vendas['Valor Total'] > 0]
+        
+        self.definir_dados(carregar_produtos(), carregar_estoque(), df_vendas)
+    
+    def definir_dados(self, df_produtos, df_estoque, df_vendas):
+        # Permite reaproveitar DataFrames já validados (ex.: ProcessadorDados)
+        self.df_produtos = df_produtos
+        self.df_estoque = df_estoque.copy()
+        self.df_vendas = df_vendas
+        self.cubo = CuboVendas.construir(self.df_vendas)
+        self._impressao_vendas = None
+    
+    def _gravar(self, nome_arquivo, conteudo):
+        # Só reescreve o que mudou: arquivos intactos mantêm mtime/ETag e continuam válidos no cache HTTP
+        if isinstance(conteudo, str):
+            conteudo = conteudo.encode('utf-8')
+        self.conteudos[nome_arquivo] = conteudo
+        
+        caminho = os.path.join(self.output_dir, nome_arquivo)
+        if os.path.exists(caminho) and os.path.getsize(caminho) == len(conteudo):
+            with open(caminho, 'rb') as f:
+                if f.read() == conteudo:
+                    return False
         
-        self.df_vendas['Data'] = pd.to_datetime(self.df_vendas['Data'], format='%d/%m/%Y')
-        self.df_vendas = self.df_vendas[self.df_vendas['Valor Total'] > 0]
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(conteudo)
+        os.replace(temporario, caminho)
+        self.alterados.append(nome_arquivo)
+        return True
+    
+    def _gravar_json(self, nome_arquivo, dados):
+        return self._gravar(nome_arquivo, json.dumps(dados, ensure_ascii=False, indent=2))
+    
+    def _gravar_csv(self, nome_arquivo, df):
+        return self._gravar(nome_arquivo, df.to_csv(index=False, lineterminator='\n'))
+    
+    def _ler_json(self, nome_arquivo):
+        try:
+            with open(os.path.join(self.output_dir, nome_arquivo), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def _memoizar(self, nome, calcular):
+        # Só a parte de cálculo é memoizada; a gravação dos arquivos continua a cada execução
+        if self.cache_kpis is None:
+            return calcular()
+        # Impressão calculada uma vez por definir_dados: o mesmo instantâneo das vendas usado no cubo
+        if self._impressao_vendas is None:
+            self._impressao_vendas = impressao_dataframe(self.df_vendas)
+        return self.cache_kpis.obter(f'dashboard.{nome}', [self._impressao_vendas], calcular)
     
     def calcular_kpis_gerais(self):
+        totais = self.cubo.totais({'Valor Total': ['sum', 'mean'], 'Qtd': 'sum'})
         kpis = {
-            'faturamento_total': float(self.df_vendas['Valor Total'].sum()),
+            'faturamento_total': float(totais[('Valor Total', 'sum')]),
             'total_vendas': int(len(self.df_vendas)),
-            'ticket_medio': float(self.df_vendas['Valor Total'].mean()),
-            'total_unidades': int(self.df_vendas['Qtd'].sum()),
+            'ticket_medio': float(totais[('Valor Total', 'mean')]),
+            'total_unidades': int(totais[('Qtd', 'sum')]),
             'taxa_conversao': 68.5,
             'ultima_atualizacao': datetime.now().strftime('%d/%m/%Y %H:%M:%S')
         }
         
-        with open(f'{self.output_dir}/kpis_gerais.json', 'w', encoding='utf-8') as f:
-            json.dump(kpis, f, ensure_ascii=False, indent=2)
+        # A data de atualização só avança quando os KPIs mudam; do contrário o arquivo seria sempre novo
+        anterior = self._ler_json('kpis_gerais.json')
+        if anterior is not None and 'ultima_atualizacao' in anterior:
+            sem_data = {k: v for k, v in kpis.items() if k != 'ultima_atualizacao'}
+            if sem_data == {k: v for k, v in anterior.items() if k != 'ultima_atualizacao'}:
+                kpis['ultima_atualizacao'] = anterior['ultima_atualizacao']
+        
+        self._gravar_json('kpis_gerais.json', kpis)
         
         return kpis
     
     def calcular_vendas_mensais(self):
-        self.df_vendas['Mes'] = self.df_vendas['Data'].dt.month
-        self.df_vendas['Ano'] = self.df_vendas['Data'].dt.year
-        
-        mensal = self.df_vendas.groupby('Mes').agg({
+        mensal = self.cubo.agregar('Mes', {
             'Valor Total': 'sum',
             'ID Venda': 'count'
         }).reset_index()
         
         mensal.columns = ['mes', 'faturamento', 'num_vendas']
-        mensal['mes_nome'] = mensal['mes'].map({
-            1: 'Janeiro', 2: 'Fevereiro', 3: 'Março',
-            4: 'Abril', 5: 'Maio', 6: 'Junho'
-        })
+        mensal['mes_nome'] = mensal['mes'].map(MESES_PT)
         
-        mensal[['mes_nome', 'faturamento', 'num_vendas']].to_csv(
-            f'{self.output_dir}/vendas_mensais.csv',
-            index=False,
-            encoding='utf-8'
-        )
+        self._gravar_csv('vendas_mensais.csv', mensal[['mes_nome', 'faturamento', 'num_vendas']])
         
         return mensal
     
     def calcular_vendas_filial(self):
-        por_filial = self.df_vendas.groupby('Filial').agg({
+        por_filial = self.cubo.agregar('Filial', {
             'Valor Total': 'sum',
             'ID Venda': 'count',
             'Qtd': 'sum'
@@ -72,11 +149,7 @@ class ExportadorDashboard:
         por_filial['ticket_medio'] = por_filial['faturamento'] / por_filial['num_vendas']
         por_filial = por_filial.sort_values('faturamento', ascending=False)
         
-        por_filial.to_csv(
-            f'{self.output_dir}/vendas_por_filial.csv',
-            index=False,
-            encoding='utf-8'
-        )
+        self._gravar_csv('vendas_por_filial.csv', por_filial)
         
         kpis_filial = {}
         for _, row in por_filial.iterrows():
@@ -88,13 +161,12 @@ class ExportadorDashboard:
                 'conversao': round(65 + (row['faturamento'] / por_filial['faturamento'].sum()) * 10, 1)
             }
         
-        with open(f'{self.output_dir}/kpis_por_filial.json', 'w', encoding='utf-8') as f:
-            json.dump(kpis_filial, f, ensure_ascii=False, indent=2)
+        self._gravar_json('kpis_por_filial.json', kpis_filial)
         
         return por_filial
     
     def calcular_vendas_categoria(self):
-        por_categoria = self.df_vendas.groupby('Categoria').agg({
+        por_categoria = self.cubo.agregar('Categoria', {
             'Valor Total': 'sum',
             'Qtd': 'sum'
         }).reset_index()
@@ -104,86 +176,199 @@ class ExportadorDashboard:
                                         por_categoria['faturamento'].sum() * 100).round(1)
         por_categoria = por_categoria.sort_values('faturamento', ascending=False)
         
-        por_categoria.to_csv(
-            f'{self.output_dir}/vendas_por_categoria.csv',
-            index=False,
-            encoding='utf-8'
-        )
+        self._gravar_csv('vendas_por_categoria.csv', por_categoria)
         
         return por_categoria
     
     def calcular_top_produtos(self):
-        top_produtos = self.df_vendas.groupby(['Cód. Produto', 'Produto']).agg({
+        top_produtos = self._memoizar('top_produtos', self._tabela_top_produtos)
+        self._gravar_csv('top_produtos.csv', top_produtos)
+        
+        return top_produtos
+    
+    def _tabela_top_produtos(self):
+        top_produtos = self.cubo.agregar(['Cód. Produto', 'Produto'], {
             'Valor Total': 'sum',
             'Qtd': 'sum',
             'ID Venda': 'count'
         }).reset_index()
         
         top_produtos.columns = ['codigo', 'produto', 'receita', 'unidades', 'transacoes']
-        top_produtos = top_produtos.sort_values('receita', ascending=False).head(10)
+        top_produtos = top_n(top_produtos, 'receita', 10)
         
         top_produtos['produto'] = top_produtos['produto'].str[:50]
         
-        top_produtos.to_csv(
-            f'{self.output_dir}/top_produtos.csv',
-            index=False,
-            encoding='utf-8'
-        )
-        
         return top_produtos
     
+    def calcular_cubo_drilldown(self, produtos_por_celula=TOP_PRODUTOS_CELULA):
+        # Filial × Categoria × Mês em colunas paralelas com dimensões codificadas por dicionário:
+        # o tamanho depende da cardinalidade do cubo, não do número de vendas
+        especificacao = {'Valor Total': 'sum', 'Qtd': 'sum', 'ID Venda': 'count'}
+        celulas = self.cubo.agregar(DIMENSOES_DRILLDOWN, especificacao).reset_index()
+        produtos = self.cubo.agregar(DIMENSOES_DRILLDOWN + ['Cód. Produto', 'Produto'],
+                                     {'Valor Total': 'sum', 'Qtd': 'sum'}).reset_index()
+        
+        meses = (celulas['Ano'].astype(int).astype(str) + '-' +
+                 celulas['Mes'].astype(int).astype(str).str.zfill(2))
+        codigos_filial, filiais = pd.factorize(celulas['Filial'], sort=True)
+        codigos_categoria, categorias = pd.factorize(celulas['Categoria'], sort=True)
+        codigos_mes, lista_meses = pd.factorize(meses, sort=True)
+        
+        # Top produtos de cada célula (receita decrescente, código como desempate)
+        indice_celulas = pd.MultiIndex.from_frame(celulas[DIMENSOES_DRILLDOWN])
+        produtos['celula'] = indice_celulas.get_indexer(pd.MultiIndex.from_frame(produtos[DIMENSOES_DRILLDOWN]))
+        top = top_n(produtos, 'Valor Total', produtos_por_celula, por='celula', desempate='Cód. Produto')
+        codigos_produto, catalogo = pd.factorize(top['Cód. Produto'], sort=True)
+        nomes = top.drop_duplicates('Cód. Produto').set_index('Cód. Produto')['Produto'].reindex(catalogo)
+        
+        cubo = {
+            'versao': 1,
+            'unidade_monetaria': 'centavos',
+            'dimensoes': {
+                'filial': list(filiais),
+                'categoria': list(categorias),
+                'mes': list(lista_meses),
+                'mes_nome': [MESES_PT[int(m[5:])] for m in lista_meses]
+            },
+            'celulas': {
+                'filial': codigos_filial.tolist(),
+                'categoria': codigos_categoria.tolist(),
+                'mes': codigos_mes.tolist(),
+                'faturamento': _centavos(celulas['Valor Total']),
+                'unidades': celulas['Qtd'].astype('int64').tolist(),
+                'transacoes': celulas['ID Venda'].astype('int64').tolist()
+            },
+            'produtos': {
+                'codigo': list(catalogo),
+                'nome': [str(nome)[:50] for nome in nomes]
+            },
+            'top_produtos': {
+                'top_n': produtos_por_celula,
+                'celula': top['celula'].astype('int64').tolist(),
+                'produto': codigos_produto.tolist(),
+                'faturamento': _centavos(top['Valor Total']),
+                'unidades': top['Qtd'].astype('int64').tolist()
+            }
+        }
+        
+        conteudo = json.dumps(cubo, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        # mtime=0: mesmo cubo, mesmos bytes
+        self._gravar('cubo_drilldown.json.gz', gzip.compress(conteudo, mtime=0))
+        self.cubo_drilldown = cubo
+        
+        return cubo
+    
     def processar_alertas_estoque(self):
-        self.df_estoque['status'] = self.df_estoque.apply(
-            lambda x: 'Crítico' if x['Quantidade Disponível'] < x['Estoque Mínimo'] * 0.5
-            else 'Baixo' if x['Quantidade Disponível'] < x['Estoque Mínimo']
-            else 'Normal', axis=1
-        )
+        self.df_estoque['status'] = classificar_estoque(self.df_estoque)['Status']
         
         alertas = self.df_estoque[self.df_estoque['status'].isin(['Crítico', 'Baixo'])].copy()
-        alertas = alertas.sort_values('Quantidade Disponível')
+        alertas = top_n(alertas, 'Quantidade Disponível', 10, ascendente=True)
         
         alertas_export = alertas[['Produto', 'Filial', 'Quantidade Disponível', 
-                                   'Estoque Mínimo', 'status']].head(10)
+                                   'Estoque Mínimo', 'status']]
         alertas_export.columns = ['produto', 'filial', 'estoque_atual', 'estoque_minimo', 'status']
         
-        alertas_export.to_csv(
-            f'{self.output_dir}/alertas_estoque.csv',
-            index=False,
-            encoding='utf-8'
-        )
+        self._gravar_csv('alertas_estoque.csv', alertas_export)
         
         return alertas_export
     
+    def gerar_pacote(self):
+        # Um único arquivo gzip com tudo o que o dashboard consome, nomeado pelo hash do conteúdo:
+        # o navegador pode guardá-lo indefinidamente e só o manifesto precisa ser revalidado
+        pacote = {'versao': 1, 'json': {}, 'csv': {}, 'cubo': self.cubo_drilldown}
+        for nome_arquivo, conteudo in sorted(self.conteudos.items()):
+            base, extensao = os.path.splitext(nome_arquivo)
+            if extensao == '.json' and nome_arquivo != MANIFESTO:
+                pacote['json'][base] = json.loads(conteudo)
+            elif extensao == '.csv':
+                pacote['csv'][base] = conteudo.decode('utf-8')
+        
+        serializado = json.dumps(pacote, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        hash_pacote = hashlib.sha256(serializado).hexdigest()
+        nome_pacote = f'{PREFIXO_PACOTE}{hash_pacote[:16]}.json.gz'
+        comprimido = gzip.compress(serializado, mtime=0)
+        self._gravar(nome_pacote, comprimido)
+        
+        manifesto = {
+            'versao': 1,
+            'pacote': nome_pacote,
+            'sha256': hash_pacote,
+            'bytes': len(comprimido),
+            'bytes_descomprimido': len(serializado),
+            'arquivos': {
+                nome_arquivo: hashlib.sha256(conteudo).hexdigest()[:16]
+                for nome_arquivo, conteudo in sorted(self.conteudos.items())
+                if not nome_arquivo.startswith(PREFIXO_PACOTE) and nome_arquivo != MANIFESTO
+            }
+        }
+        self._gravar_json(MANIFESTO, manifesto)
+        
+        # Pacotes antigos não são mais referenciados pelo manifesto
+        for antigo in glob.glob(os.path.join(self.output_dir, f'{PREFIXO_PACOTE}*.json.gz')):
+            if os.path.basename(antigo) != nome_pacote:
+                os.remove(antigo)
+        
+        return manifesto
+    
     def executar_exportacao(self):
         print('\nIniciando exportação de dados para dashboard...\n')
+        self.alterados = []
         
         print('1. Carregando dados...')
-        self.carregar_dados()
+        if self.df_vendas is None:
+            with self.instrumentador.etapa('export_carregar_dados') as etapa:
+                self.carregar_dados()
+                etapa['linhas_saida'] = len(self.df_vendas)
         
         print('2. Calculando KPIs gerais...')
-        kpis = self.calcular_kpis_gerais()
+        with self.instrumentador.etapa('export_kpis_gerais', len(self.df_vendas)) as etapa:
+            kpis = self.calcular_kpis_gerais()
+            etapa['linhas_saida'] = 1
         print(f'   Faturamento: R$ {kpis["faturamento_total"]:,.2f}')
         
         print('3. Processando vendas mensais...')
-        mensal = self.calcular_vendas_mensais()
+        with self.instrumentador.etapa('export_vendas_mensais', len(self.df_vendas)) as etapa:
+            mensal = self.calcular_vendas_mensais()
+            etapa['linhas_saida'] = len(mensal)
         print(f'   {len(mensal)} meses processados')
         
         print('4. Processando vendas por filial...')
-        filial = self.calcular_vendas_filial()
+        with self.instrumentador.etapa('export_vendas_filial', len(self.df_vendas)) as etapa:
+            filial = self.calcular_vendas_filial()
+            etapa['linhas_saida'] = len(filial)
         print(f'   {len(filial)} filiais processadas')
         
         print('5. Processando vendas por categoria...')
-        categoria = self.calcular_vendas_categoria()
+        with self.instrumentador.etapa('export_vendas_categoria', len(self.df_vendas)) as etapa:
+            categoria = self.calcular_vendas_categoria()
+            etapa['linhas_saida'] = len(categoria)
         print(f'   {len(categoria)} categorias processadas')
         
         print('6. Processando top produtos...')
-        top = self.calcular_top_produtos()
+        with self.instrumentador.etapa('export_top_produtos', len(self.df_vendas)) as etapa:
+            top = self.calcular_top_produtos()
+            etapa['linhas_saida'] = len(top)
         print(f'   Top {len(top)} produtos exportados')
         
         print('7. Processando alertas de estoque...')
-        alertas = self.processar_alertas_estoque()
+        with self.instrumentador.etapa('export_alertas_estoque', len(self.df_estoque)) as etapa:
+            alertas = self.processar_alertas_estoque()
+            etapa['linhas_saida'] = len(alertas)
         print(f'   {len(alertas)} alertas identificados')
         
+        print('8. Gerando cubo de drill-down...')
+        with self.instrumentador.etapa('export_cubo_drilldown', len(self.df_vendas)) as etapa:
+            cubo = self.calcular_cubo_drilldown()
+            etapa['linhas_saida'] = len(cubo['celulas']['faturamento'])
+        print(f'   {len(cubo["celulas"]["faturamento"])} células, '
+              f'{len(cubo["top_produtos"]["celula"])} entradas de top produtos')
+        
+        print('9. Gerando pacote do dashboard...')
+        with self.instrumentador.etapa('export_pacote', len(self.conteudos)) as etapa:
+            manifesto = self.gerar_pacote()
+            etapa['linhas_saida'] = len(manifesto['arquivos'])
+        print(f'   {manifesto["pacote"]} ({manifesto["bytes"] / 1024:.1f} KB)')
+        
         print(f'\nExportação concluída!')
         print(f'Arquivos salvos em: {self.output_dir}/')
         print('\nArquivos gerados:')
@@ -194,11 +379,39 @@ class ExportadorDashboard:
         print('  - vendas_por_categoria.csv')
         print('  - top_produtos.csv')
         print('  - alertas_estoque.csv')
+        print('  - cubo_drilldown.json.gz')
+        print(f'  - {manifesto["pacote"]}')
+        print(f'  - {MANIFESTO}')
+        
+        inalterados = len(self.conteudos) - len(self.alterados)
+        print(f'\n{len(self.alterados)} arquivos reescritos, {inalterados} sem alteração')
         print()
 
 def main():
-    exportador = ExportadorDashboard()
-    exportador.executar_exportacao()
+    parser = argparse.ArgumentParser(description='Exportação de dados para o dashboard')
+    parser.add_argument('--instrumentar', action='store_true',
+                        help='grava log JSON com tempo, CPU, memória e linhas de cada etapa')
+    parser.add_argument('--memoria', action='store_true',
+                        help='com --instrumentar, pico de memória por etapa via tracemalloc (mais lento)')
+    parser.add_argument('--perfil', action='store_true',
+                        help='com --instrumentar, grava também um perfil cProfile por etapa')
+    parser.add_argument('--cache-kpis', action='store_true',
+                        help='reaproveita KPIs já calculados para os mesmos dados (cache em disco)')
+    args = parser.parse_args()
+    
+    instrumentador = None
+    if args.instrumentar:
+        instrumentador = Instrumentador.ativo('export', memoria=args.memoria, perfil=args.perfil)
+    cache_kpis = CacheKPIs.persistente() if args.cache_kpis else None
+    exportador = ExportadorDashboard(instrumentador=instrumentador, cache_kpis=cache_kpis)
+    try:
+        exportador.executar_exportacao()
+    finally:
+        if instrumentador is not None:
+            instrumentador.imprimir_resumo()
+            print(f'\nLog de execução: {instrumentador.salvar()}\n')
+        if cache_kpis is not None:
+            cache_kpis.imprimir_resumo()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,297 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Ponto de entrada único: ETL, análise, relatórios e exportação num só processo
+Os dados são carregados e validados uma vez pelo ProcessadorDados e repassados aos demais módulos
+"""
+
+import argparse
+import os
+import sys
+from datetime import date
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+
+
+def _resolver_filiais(nomes):
+    # Nome completo ou chave curta ('centro'), como no servidor de KPIs; filial desconhecida lista as opções
+    from carregador_dados import carregar_estoque
+    from servidor_kpis import chave_filial
+
+    filiais = sorted(carregar_estoque()['Filial'].dropna().unique())
+    resolvidas = []
+    for nome in nomes:
+        encontradas = [f for f in filiais if nome.lower() in (chave_filial(f), f.lower())]
+        if not encontradas:
+            raise ValueError(f"Filial desconhecida: {nome} (opções: {', '.join(filiais)})")
+        resolvidas.extend(encontradas)
+    return resolvidas
+
+
+def _preparar_dados(args, executar_etl=False):
+    # Importação adiada: --help e erros de argumento não pagam o custo do pandas
+    from processar_dados import ProcessadorDados, ESCOPOS_OUTLIERS
+    from armazem_vendas import ArmazemVendas
+    from carregador_dados import ARQUIVO_VENDAS
+
+    armazem = None
+    if args.armazem:
+        armazem = ArmazemVendas(por_filial=args.armazem_por_filial, fonte=args.vendas or ARQUIVO_VENDAS)
+    opcoes_etl = {}
+    if executar_etl:
+        opcoes_etl = dict(outliers_por=ESCOPOS_OUTLIERS[args.outliers_por], outliers_exato=args.outliers_exato,
+                          frequencia_previsao=args.previsao_frequencia, horizonte_previsao=args.previsao_horizonte)
+    processador = ProcessadorDados(compacto=args.compacto,
+                                   excel_streaming=getattr(args, 'excel_streaming', False),
+                                   instrumentador=args.instrumentador, armazem=armazem,
+                                   fonte_vendas=args.vendas, workers_carga=args.workers_carga, **opcoes_etl)
+    if executar_etl:
+        if args.blocos:
+            processador.executar_pipeline_em_blocos(args.blocos)
+        elif args.incremental:
+            processador.executar_pipeline_incremental()
+        else:
+            processador.executar_pipeline()
+    else:
+        print('\nCarregando e validando dados...')
+        processador.carregar_e_validar(args.inicio, args.fim, args.filial)
+        print(f'   Produtos: {len(processador.produtos)} | Estoque: {len(processador.estoque)} | '
+              f'Vendas: {len(processador.vendas)}')
+        processador.imprimir_relatorio_carga()
+        if processador.vendas.empty:
+            print('   Sem vendas no período/filiais selecionados')
+        if armazem is not None and armazem.estatisticas['particoes_lidas'] + armazem.estatisticas['particoes_podadas']:
+            print(f'   Armazém: {armazem.estatisticas["particoes_lidas"]} partições lidas, '
+                  f'{armazem.estatisticas["particoes_podadas"]} ignoradas')
+        elif armazem is not None:
+            print(f'   Armazém criado em {armazem.diretorio}')
+
+    return processador
+
+
+def executar_analise(processador):
+    from analise_vendas import AnaliseVendas, main as relatorio_console
+
+    with processador.instrumentador.etapa('analise_console', len(processador.vendas)):
+        relatorio_console(AnaliseVendas.a_partir_do_processador(processador))
+
+
+def executar_relatorios(processador, args):
+    from gerar_relatorios import GeradorRelatorios
+
+    gerador = GeradorRelatorios(excel_streaming=getattr(args, 'excel_streaming', False),
+                                instrumentador=processador.instrumentador, cache_kpis=args.cache_kpis)
+    gerador.definir_dados(processador.produtos, processador.estoque, processador.vendas)
+
+    if getattr(args, 'por_filial', False):
+        relatorios = gerador.gerar_relatorios_por_filial(max_workers=args.workers)
+    else:
+        relatorios = [gerador.gerar_relatorio_completo(), gerador.gerar_relatorio_estoque_detalhado()]
+
+    for relatorio in relatorios:
+        print(f'Gerado: {relatorio}')
+
+
+def executar_exportacao(processador, args):
+    from exportar_dashboard_data import ExportadorDashboard
+
+    exportador = ExportadorDashboard(instrumentador=processador.instrumentador, cache_kpis=args.cache_kpis)
+    exportador.definir_dados(processador.produtos, processador.estoque, processador.vendas)
+    exportador.executar_exportacao()
+
+
+def comando_etl(args):
+    _preparar_dados(args, executar_etl=True)
+
+
+def comando_analyze(args):
+    executar_analise(_preparar_dados(args))
+
+
+def comando_report(args):
+    executar_relatorios(_preparar_dados(args), args)
+
+
+def comando_export(args):
+    executar_exportacao(_preparar_dados(args), args)
+
+
+def comando_serve(args):
+    import asyncio
+    from servidor_kpis import ConsultasKPI, executar_servidor
+
+    processador = _preparar_dados(args)
+    consultas = ConsultasKPI.a_partir_do_processador(processador)
+    # O log de instrumentação cobre a carga; o servidor roda até Ctrl+C
+    try:
+        asyncio.run(executar_servidor(consultas, args.host, args.porta, args.workers))
+    except KeyboardInterrupt:
+        print('\nServidor encerrado\n')
+
+
+def comando_simulate(args):
+    from simulacao_ruptura import SimuladorRuptura, imprimir_ranking
+
+    processador = _preparar_dados(args)
+    simulador = SimuladorRuptura(args.caminhos, args.prazo, semente=args.semente, max_workers=args.workers)
+    with processador.instrumentador.etapa('simular_ruptura', len(processador.estoque)) as etapa:
+        resultado = simulador.simular(processador.estoque, processador.vendas)
+        etapa['linhas_saida'] = len(resultado)
+    imprimir_ranking(simulador.ranking(resultado, args.top), simulador)
+    if args.saida:
+        resultado.to_csv(args.saida, index=False)
+        print(f'\nSalvo em: {args.saida}')
+
+
+def comando_all(args):
+    processador = _preparar_dados(args, executar_etl=True)
+    executar_analise(processador)
+    executar_relatorios(processador, args)
+    executar_exportacao(processador, args)
+
+
+def _opcoes_etl(subparser):
+    # Espelham ESCOPOS_OUTLIERS, FREQUENCIAS e HORIZONTE_DIAS_PADRAO; literais para o --help não importar o pandas
+    subparser.add_argument('--outliers-por', choices=('categoria', 'filial', 'produto', 'global'), default='categoria',
+                           help='grupo dentro do qual o IQR de Valor Total é calculado')
+    subparser.add_argument('--outliers-exato', action='store_true',
+                           help='quartis exatos (ordenação completa) em vez do sketch aproximado')
+    subparser.add_argument('--previsao-frequencia', choices=('diaria', 'semanal'), default='diaria',
+                           help='séries de demanda diárias ou semanais por produto e filial')
+    subparser.add_argument('--previsao-horizonte', type=int, default=30,
+                           help='dias de demanda prevista usados na cobertura e na reposição')
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        description='Sistema de Análise de Vendas e Estoque - execução unificada'
+    )
+    parser.add_argument('--compacto', action='store_true',
+                        help='mantém as vendas em memória com categorias e tipos reduzidos')
+    parser.add_argument('--instrumentar', action='store_true',
+                        help='grava log JSON com tempo, CPU, memória e linhas de cada etapa')
+    parser.add_argument('--memoria', action='store_true',
+                        help='com --instrumentar, pico de memória por etapa via tracemalloc (mais lento)')
+    parser.add_argument('--perfil', action='store_true',
+                        help='com --instrumentar, grava também um perfil cProfile por etapa')
+    parser.add_argument('--cache-kpis', action='store_true',
+                        help='reaproveita KPIs já calculados para os mesmos dados (cache em disco)')
+    parser.add_argument('--vendas', default=None,
+                        help='planilha, diretório ou glob de planilhas de vendas (lidas em paralelo, sem IDs repetidos)')
+    parser.add_argument('--workers-carga', type=int, default=None,
+                        help='com --vendas, processos para ler as planilhas')
+    parser.add_argument('--armazem', action='store_true',
+                        help='lê as vendas do armazém particionado (criado na primeira execução)')
+    parser.add_argument('--armazem-por-filial', action='store_true',
+                        help='com --armazem, particiona também por filial ao gravar')
+    parser.add_argument('--inicio', default=None, help='só vendas a partir desta data (AAAA-MM-DD)')
+    parser.add_argument('--fim', default=None, help='só vendas até esta data, inclusive (AAAA-MM-DD)')
+    parser.add_argument('--filial', action='append', default=None,
+                        help='só vendas desta filial (repetível)')
+    subparsers = parser.add_subparsers(dest='comando', required=True)
+
+    etl = subparsers.add_parser('etl', help='pipeline ETL e dataset processado')
+    etl.add_argument('--incremental', action='store_true',
+                     help='processa apenas as vendas posteriores à última execução')
+    etl.add_argument('--excel-streaming', action='store_true',
+                     help='grava o dataset processado linha a linha')
+    etl.add_argument('--blocos', type=int, default=None, metavar='N',
+                     help='lê e agrega as vendas em blocos de N linhas (memória limitada; só métricas, sem dataset)')
+    _opcoes_etl(etl)
+    etl.set_defaults(funcao=comando_etl)
+
+    analyze = subparsers.add_parser('analyze', help='relatório de KPIs no console')
+    analyze.set_defaults(funcao=comando_analyze)
+
+    report = subparsers.add_parser('report', help='relatórios Excel')
+    report.add_argument('--por-filial', action='store_true',
+                        help='gera também um relatório por filial, em paralelo')
+    report.add_argument('--workers', type=int, default=None,
+                        help='número de processos para o modo --por-filial')
+    report.add_argument('--excel-streaming', action='store_true',
+                        help='grava as planilhas linha a linha')
+    report.set_defaults(funcao=comando_report)
+
+    export = subparsers.add_parser('export', help='arquivos do dashboard')
+    export.set_defaults(funcao=comando_export)
+
+    serve = subparsers.add_parser('serve', help='servidor local de consultas de KPIs (HTTP/JSON)')
+    serve.add_argument('--host', default='127.0.0.1', help='endereço de escuta (padrão: só esta máquina)')
+    serve.add_argument('--porta', type=int, default=8765, help='porta TCP (0 = escolhe uma livre)')
+    serve.add_argument('--workers', type=int, default=None, help='threads para as consultas')
+    serve.set_defaults(funcao=comando_serve)
+
+    simulate = subparsers.add_parser('simulate', help='risco de ruptura de estoque por simulação Monte Carlo')
+    simulate.add_argument('--caminhos', type=int, default=10000, help='trajetórias de demanda por item')
+    simulate.add_argument('--prazo', type=int, default=7, help='dias até a próxima entrega')
+    simulate.add_argument('--semente', type=int, default=42, help='semente (resultado reprodutível)')
+    simulate.add_argument('--workers', type=int, default=None, help='processos para catálogos grandes')
+    simulate.add_argument('--top', type=int, default=10, help='itens exibidos no ranking')
+    simulate.add_argument('--saida', default=None, help='grava o estoque com as colunas de risco em CSV')
+    simulate.set_defaults(funcao=comando_simulate)
+
+    todos = subparsers.add_parser('all', help='ETL, análise, relatórios e exportação')
+    todos.add_argument('--por-filial', action='store_true',
+                       help='gera também um relatório por filial, em paralelo')
+    todos.add_argument('--workers', type=int, default=None,
+                       help='número de processos para o modo --por-filial')
+    todos.add_argument('--excel-streaming', action='store_true',
+                       help='grava as planilhas linha a linha')
+    _opcoes_etl(todos)
+    # all precisa das vendas completas em memória para análise, relatórios e exportação
+    todos.set_defaults(funcao=comando_all, incremental=False, blocos=None)
+
+    return parser
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    # ETL e export gravam artefatos globais (dataset, estado incremental, data/dashboard): um recorte os corromperia
+    if args.comando in ('etl', 'all', 'export') and (args.inicio or args.fim or args.filial):
+        parser.error(f'--inicio/--fim/--filial não se aplicam ao comando {args.comando} '
+                     '(use analyze, report, serve ou simulate)')
+    if args.comando == 'etl' and args.blocos is not None:
+        if args.blocos < 1:
+            parser.error('--blocos precisa ser um inteiro positivo')
+        if args.incremental or args.armazem:
+            parser.error('--blocos não grava dataset nem armazém: não combina com --incremental/--armazem')
+    datas = {}
+    for opcao in ('inicio', 'fim'):
+        valor = getattr(args, opcao)
+        if valor is None:
+            continue
+        try:
+            datas[opcao] = date.fromisoformat(valor)
+        except ValueError:
+            parser.error(f'--{opcao} inválido: {valor} (use AAAA-MM-DD)')
+    if len(datas) == 2 and datas['inicio'] > datas['fim']:
+        parser.error(f'--inicio {args.inicio} é posterior a --fim {args.fim}')
+    if args.filial:
+        try:
+            args.filial = _resolver_filiais(args.filial)
+        except ValueError as erro:
+            parser.error(str(erro))
+
+    args.instrumentador = None
+    if args.instrumentar:
+        from instrumentacao import Instrumentador
+        args.instrumentador = Instrumentador.ativo(args.comando, memoria=args.memoria, perfil=args.perfil)
+
+    if args.cache_kpis:
+        from cache_kpis import CacheKPIs
+        args.cache_kpis = CacheKPIs.persistente()
+    else:
+        args.cache_kpis = None
+
+    try:
+        args.funcao(args)
+    finally:
+        if args.instrumentador is not None:
+            args.instrumentador.imprimir_resumo()
+            print(f'\nLog de execução: {args.instrumentador.salvar()}\n')
+        if args.cache_kpis is not None:
+            args.cache_kpis.imprimir_resumo()
+
+
+if __name__ == '__main__':
+    main()
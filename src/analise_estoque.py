@@ -0,0 +1,61 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Classificação vetorizada do nível de estoque
+Definição única dos limites Crítico/Baixo/Normal usada por todos os módulos
+"""
+
+import pandas as pd
+import numpy as np
+
+LIMITE_CRITICO = 0.5
+LIMITE_BAIXO = 1.0
+
+ROTULOS_STATUS = ('Crítico', 'Baixo', 'Normal')
+
+
+class AnalisadorEstoque:
+
+    def __init__(self, limite_critico=LIMITE_CRITICO, limite_baixo=LIMITE_BAIXO,
+                 rotulos=ROTULOS_STATUS):
+        if not 0 <= limite_critico <= limite_baixo:
+            raise ValueError("Limites inválidos: esperado 0 <= limite_critico <= limite_baixo")
+        if len(rotulos) != 3:
+            raise ValueError("São necessários três rótulos: crítico, baixo e normal")
+
+        self.limite_critico = limite_critico
+        self.limite_baixo = limite_baixo
+        self.rotulos = tuple(rotulos)
+
+    def classificar(self, df, categorico=False):
+        quantidade = df['Quantidade Disponível'].to_numpy(dtype='float64')
+        minimo = df['Estoque Mínimo'].to_numpy(dtype='float64')
+
+        # Crítico: abaixo de limite_critico x mínimo; Baixo: abaixo de limite_baixo x mínimo
+        codigos = np.full(len(df), 2, dtype='int8')
+        codigos[quantidade < minimo * self.limite_baixo] = 1
+        codigos[quantidade < minimo * self.limite_critico] = 0
+
+        if categorico:
+            status = pd.Categorical.from_codes(codigos, categories=list(self.rotulos), ordered=True)
+        else:
+            status = np.array(self.rotulos, dtype=object)[codigos]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            perc_minimo = np.round(quantidade / minimo * 100, 1)
+
+        diferenca = df['Quantidade Disponível'] - df['Estoque Mínimo']
+
+        return pd.DataFrame({
+            'Status': status,
+            '% do Mínimo': perc_minimo,
+            'Necessidade_Reposicao': np.where(diferenca < 0, -diferenca, 0),
+            'Diferenca_Minimo': diferenca
+        }, index=df.index)
+
+
+_analisador_padrao = AnalisadorEstoque()
+
+
+def classificar_estoque(df, categorico=False, **limites):
+    analisador = AnalisadorEstoque(**limites) if limites else _analisador_padrao
+    return analisador.classificar(df, categorico=categorico)
@@ -5,6 +5,10 @@ Arquivo: analise_vendas.py
 Este é o código PRINCIPAL do sistema.
 Lê as planilhas, limpa os dados, calcula KPIs e gera insights.
 
+Os KPIs ficam na classe AnaliseVendas como propriedades calculadas sob demanda
+e memorizadas: quem importa o módulo paga só pelas dependências do KPI que usar.
+O relatório de console é o main() no fim do arquivo.
+
 Autor: Seu Nome
 Data: 2024
 """
@@ -12,322 +16,468 @@ Data: 2024
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from functools import cached_property
+import sys
 import warnings
+from carregador_dados import carregar_produtos, carregar_estoque, carregar_vendas
+from analise_estoque import classificar_estoque
+from cubo_vendas import CuboVendas
+from dimensao_data import DimensaoData, MESES_PT
+from selecao_top import top_n
 warnings.filterwarnings('ignore')
 
-# ============================================================
-# CONFIGURAÇÕES
-# ============================================================
-print("\n" + "=" * 70)
-print(" SISTEMA DE ANÁLISE DE VENDAS E ESTOQUE")
-print("=" * 70)
-print(f"Executado em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
-print("=" * 70 + "\n")
-
-# ============================================================
-# ETAPA 1: CARREGAR OS DADOS
-# ============================================================
-print("📂 [ETAPA 1/5] CARREGANDO DADOS DAS PLANILHAS...")
-print("-" * 70)
-
-try:
-    # Carregar produtos
-    print("   Lendo: data/produtos.xlsx")
-    df_produtos = pd.read_excel('data/produtos.xlsx', sheet_name='Cadastro_Produtos')
-    print(f"    {len(df_produtos)} produtos carregados")
-    
-    # Carregar estoque
-    print("   Lendo: data/estoque_filiais.xlsx")
-    df_estoque = pd.read_excel('data/estoque_filiais.xlsx', sheet_name='Posicao_Estoque')
-    print(f"    {len(df_estoque)} registros de estoque carregados")
-    
-    # Carregar vendas
-    print("   Lendo: data/vendas_jan_jun_2024.xlsx")
-    df_vendas = pd.read_excel('data/vendas_jan_jun_2024.xlsx', sheet_name='Vendas_Completo')
-    print(f"    {len(df_vendas)} vendas carregadas")
-    
-except FileNotFoundError as e:
-    print(f"\n ERRO: Arquivo não encontrado!")
-    print(f"   {e}")
-    print("\n💡 Certifique-se de ter executado 'setup_planilhas.py' primeiro")
-    exit(1)
-
-print("\n Todos os dados carregados com sucesso!\n")
-
-# ============================================================
-# ETAPA 2: LIMPEZA E VALIDAÇÃO DOS DADOS
-# ============================================================
-print(" [ETAPA 2/5] LIMPEZA E VALIDAÇÃO DOS DADOS...")
-print("-" * 70)
-
-# ----- LIMPAR PRODUTOS -----
-print("\n Limpando dados de PRODUTOS:")
-produtos_antes = len(df_produtos)
-
-# Remover espaços extras
-df_produtos['Descrição'] = df_produtos['Descrição'].str.strip()
-df_produtos['Categoria'] = df_produtos['Categoria'].str.strip()
-
-# Validar preços
-df_produtos = df_produtos[df_produtos['Preço Venda'] > 0]
-df_produtos = df_produtos[df_produtos['Custo Aquisição'] > 0]
-
-# Calcular margem real
-df_produtos['Margem Lucro (%)'] = ((df_produtos['Preço Venda'] - df_produtos['Custo Aquisição']) / df_produtos['Preço Venda'] * 100).round(2)
 
-print(f"   • Produtos válidos: {len(df_produtos)}/{produtos_antes}")
-print(f"   • Campos limpos: Descrição, Categoria")
-print(f"   • Margem de lucro calculada")
+class AnaliseVendas:
 
-# ----- LIMPAR ESTOQUE -----
-print("\n Limpando dados de ESTOQUE:")
-estoque_antes = len(df_estoque)
+    @classmethod
+    def a_partir_do_processador(cls, processador):
+        # Reaproveita os dados já carregados e validados pelo ETL
+        analise = cls()
+        analise.produtos_brutos = processador.brutos['produtos']
+        analise.estoque_bruto = processador.brutos['estoque']
+        analise.vendas_brutas = processador.brutos['vendas']
 
-# Preencher valores vazios
-df_estoque['Última Entrada'] = df_estoque['Última Entrada'].fillna('Sem registro')
-df_estoque['Lote'] = df_estoque['Lote'].fillna('N/A')
+        analise.produtos = processador.produtos.rename(columns={'Margem_Real': 'Margem Lucro (%)'})
+        analise.vendas = processador.vendas
 
-# Criar coluna de status do estoque
-df_estoque['Status Estoque'] = df_estoque.apply(
-    lambda row: 'CRÍTICO' if row['Quantidade Disponível'] < row['Estoque Mínimo'] * 0.5
-    else 'BAIXO' if row['Quantidade Disponível'] < row['Estoque Mínimo']
-    else 'NORMAL', axis=1
-)
+        df_estoque = processador.estoque.copy()
+        niveis_estoque = classificar_estoque(df_estoque, rotulos=('CRÍTICO', 'BAIXO', 'NORMAL'))
+        df_estoque['Status Estoque'] = niveis_estoque['Status']
+        df_estoque['% do Mínimo'] = niveis_estoque['% do Mínimo']
+        analise.estoque = df_estoque
+
+        return analise
+
+    # ============================================================
+    # ETAPA 1: CARREGAR OS DADOS
+    # ============================================================
+    @cached_property
+    def produtos_brutos(self):
+        return carregar_produtos()
+
+    @cached_property
+    def estoque_bruto(self):
+        return carregar_estoque()
+
+    @cached_property
+    def vendas_brutas(self):
+        return carregar_vendas()
+
+    # ============================================================
+    # ETAPA 2: LIMPEZA E VALIDAÇÃO DOS DADOS
+    # ============================================================
+    @cached_property
+    def produtos(self):
+        df_produtos = self.produtos_brutos.copy()
+
+        # Remover espaços extras
+        df_produtos['Descrição'] = df_produtos['Descrição'].str.strip()
+        df_produtos['Categoria'] = df_produtos['Categoria'].str.strip()
+
+        # Validar preços
+        df_produtos = df_produtos[df_produtos['Preço Venda'] > 0]
+        df_produtos = df_produtos[df_produtos['Custo Aquisição'] > 0]
+
+        # Calcular margem real
+        df_produtos['Margem Lucro (%)'] = ((df_produtos['Preço Venda'] - df_produtos['Custo Aquisição']) / df_produtos['Preço Venda'] * 100).round(2)
+
+        return df_produtos
+
+    @cached_property
+    def estoque(self):
+        df_estoque = self.estoque_bruto.copy()
+
+        # Preencher valores vazios
+        df_estoque['Última Entrada'] = df_estoque['Última Entrada'].fillna('Sem registro')
+        df_estoque['Lote'] = df_estoque['Lote'].fillna('N/A')
+
+        # Criar coluna de status do estoque e percentual do estoque mínimo
+        niveis_estoque = classificar_estoque(df_estoque, rotulos=('CRÍTICO', 'BAIXO', 'NORMAL'))
+        df_estoque['Status Estoque'] = niveis_estoque['Status']
+        df_estoque['% do Mínimo'] = niveis_estoque['% do Mínimo']
+
+        return df_estoque
+
+    @cached_property
+    def vendas(self):
+        df_vendas = self.vendas_brutas.copy()
+
+        # Converter data para formato correto
+        df_vendas['Data'] = pd.to_datetime(df_vendas['Data'], format='%d/%m/%Y', errors='coerce')
+
+        # Remover vendas com data inválida
+        df_vendas = df_vendas.dropna(subset=['Data'])
+
+        # Extrair informações da data (calculadas uma vez por data distinta)
+        df_vendas, _ = DimensaoData().anexar(df_vendas, atributos={
+            'Ano': 'Ano',
+            'Mês': 'Mes',
+            'Mês Nome': 'Nome_Mes',
+            'Dia Semana': 'Nome_Dia_PT'
+        })
+
+        # Preencher CPF vazio
+        df_vendas['CPF Cliente'] = df_vendas['CPF Cliente'].fillna('Não informado')
+
+        # Remover vendas com valor zerado ou negativo
+        df_vendas = df_vendas[df_vendas['Valor Total'] > 0]
+
+        # Calcular ticket por categoria
+        df_vendas['Ticket Categoria'] = df_vendas.groupby('Categoria')['Valor Total'].transform('mean')
+
+        return df_vendas
+
+    # ============================================================
+    # ETAPA 3: ANÁLISE DE VENDAS - KPIs PRINCIPAIS
+    # ============================================================
+    @cached_property
+    def cubo(self):
+        # Cubo de agregação: todas as visões de vendas são roll-ups dele
+        return CuboVendas.construir(self.vendas)
+
+    @cached_property
+    def kpis_gerais(self):
+        totais = self.cubo.totais({'Valor Total': ['sum', 'mean'], 'Qtd': 'sum', 'Desconto': 'sum'})
+        return {
+            'total_vendas': len(self.vendas),
+            'faturamento_total': totais[('Valor Total', 'sum')],
+            'ticket_medio': totais[('Valor Total', 'mean')],
+            'total_unidades': int(totais[('Qtd', 'sum')]),
+            'desconto_total': totais[('Desconto', 'sum')]
+        }
+
+    @property
+    def faturamento_total(self):
+        return self.kpis_gerais['faturamento_total']
+
+    @cached_property
+    def vendas_filial(self):
+        vendas_filial = self.cubo.agregar('Filial', {
+            'ID Venda': 'count',
+            'Valor Total': ['sum', 'mean'],
+            'Qtd': 'sum',
+            'Desconto': 'sum'
+        }).round(2)
+
+        vendas_filial.columns = ['Qtd_Vendas', 'Faturamento', 'Ticket_Medio', 'Unidades', 'Descontos']
+        vendas_filial['% do Total'] = (vendas_filial['Faturamento'] / self.faturamento_total * 100).round(2)
+        return vendas_filial.sort_values('Faturamento', ascending=False)
+
+    @cached_property
+    def vendas_categoria(self):
+        vendas_categoria = self.cubo.agregar('Categoria', {
+            'Valor Total': 'sum',
+            'Qtd': 'sum',
+            'ID Venda': 'count'
+        }).round(2)
+
+        vendas_categoria.columns = ['Faturamento', 'Unidades', 'Transações']
+        vendas_categoria['% Faturamento'] = (vendas_categoria['Faturamento'] / self.faturamento_total * 100).round(2)
+        return vendas_categoria.sort_values('Faturamento', ascending=False)
+
+    @cached_property
+    def top_produtos(self):
+        top_produtos = self.cubo.agregar(['Cód. Produto', 'Produto'], {
+            'Valor Total': 'sum',
+            'Qtd': 'sum',
+            'ID Venda': 'count'
+        }).round(2)
+
+        top_produtos.columns = ['Receita', 'Unidades', 'Transações']
+        return top_n(top_produtos, 'Receita', 10)
+
+    def top_produtos_por(self, por, n=10):
+        # Ranking dentro de cada filial/categoria/mês sem ordenar o agregado inteiro
+        por = [por] if isinstance(por, str) else list(por)
+        ranking = self.cubo.agregar(por + ['Cód. Produto', 'Produto'], {
+            'Valor Total': 'sum',
+            'Qtd': 'sum',
+            'ID Venda': 'count'
+        }).round(2)
+
+        ranking.columns = ['Receita', 'Unidades', 'Transações']
+        return top_n(ranking.reset_index(), 'Receita', n, por=por, desempate='Cód. Produto', coluna_posicao='Posição')
+
+    @cached_property
+    def vendas_mes(self):
+        return self.cubo.agregar('Mes', {
+            'Valor Total': 'sum',
+            'ID Venda': 'count'
+        }).round(2)
+
+    @cached_property
+    def crescimento(self):
+        # Primeiro mês contra o último mês do período
+        meses = sorted(self.vendas_mes.index)
+        inicio = self.vendas_mes.loc[meses[0], 'Valor Total']
+        fim = self.vendas_mes.loc[meses[-1], 'Valor Total']
+        return (fim - inicio) / inicio * 100
+
+    # ============================================================
+    # ETAPA 4: ANÁLISE DE ESTOQUE - ALERTAS
+    # ============================================================
+    @cached_property
+    def status_estoque(self):
+        return self.estoque['Status Estoque'].value_counts()
+
+    # Conjuntos completos sem ordenação; as listagens pegam só os N mais urgentes com top_n
+    @cached_property
+    def criticos(self):
+        return self.estoque[self.estoque['Status Estoque'] == 'CRÍTICO']
+
+    @cached_property
+    def baixos(self):
+        return self.estoque[self.estoque['Status Estoque'] == 'BAIXO']
+
+    def mais_urgentes(self, itens, n):
+        return top_n(itens, '% do Mínimo', n, ascendente=True)
+
+    @cached_property
+    def estoque_filial(self):
+        df_estoque = self.estoque
+        estoque_filial = df_estoque.groupby('Filial').agg({
+            'Quantidade Disponível': 'sum',
+            'Código Produto': 'count'
+        })
+        estoque_filial.columns = ['Total_Unidades', 'SKUs']
+
+        em_alerta = df_estoque['Status Estoque'].isin(['CRÍTICO', 'BAIXO'])
+        estoque_filial['Alertas'] = em_alerta.groupby(df_estoque['Filial']).sum().astype(int)
+        return estoque_filial
 
-# Calcular percentual do estoque mínimo
-df_estoque['% do Mínimo'] = ((df_estoque['Quantidade Disponível'] / df_estoque['Estoque Mínimo']) * 100).round(1)
-
-print(f"   • Registros válidos: {len(df_estoque)}/{estoque_antes}")
-print(f"   • Campos vazios preenchidos: Última Entrada, Lote")
-print(f"   • Status de estoque calculado")
-
-# ----- LIMPAR VENDAS -----
-print("\n Limpando dados de VENDAS:")
-vendas_antes = len(df_vendas)
-
-# Converter data para formato correto
-df_vendas['Data'] = pd.to_datetime(df_vendas['Data'], format='%d/%m/%Y', errors='coerce')
-
-# Remover vendas com data inválida
-df_vendas = df_vendas.dropna(subset=['Data'])
-
-# Extrair informações da data
-df_vendas['Ano'] = df_vendas['Data'].dt.year
-df_vendas['Mês'] = df_vendas['Data'].dt.month
-df_vendas['Mês Nome'] = df_vendas['Data'].dt.strftime('%B')
-df_vendas['Dia Semana'] = df_vendas['Data'].dt.day_name()
-
-# Preencher CPF vazio
-df_vendas['CPF Cliente'] = df_vendas['CPF Cliente'].fillna('Não informado')
-
-# Remover vendas com valor zerado ou negativo
-df_vendas = df_vendas[df_vendas['Valor Total'] > 0]
-
-# Calcular ticket por categoria
-df_vendas['Ticket Categoria'] = df_vendas.groupby('Categoria')['Valor Total'].transform('mean')
-
-print(f"   • Vendas válidas: {len(df_vendas)}/{vendas_antes}")
-print(f"   • Vendas removidas (inválidas): {vendas_antes - len(df_vendas)}")
-print(f"   • Datas convertidas e validadas")
-print(f"   • Campos calculados: Mês, Ano, Dia da Semana")
-
-print("\n Limpeza concluída!\n")
 
 # ============================================================
-# ETAPA 3: ANÁLISE DE VENDAS - KPIs PRINCIPAIS
+# RELATÓRIO DE CONSOLE
 # ============================================================
-print(" [ETAPA 3/5] CALCULANDO KPIs DE VENDAS...")
-print("-" * 70)
-
-# KPIs Gerais
-total_vendas = len(df_vendas)
-faturamento_total = df_vendas['Valor Total'].sum()
-ticket_medio = df_vendas['Valor Total'].mean()
-total_unidades = df_vendas['Qtd'].sum()
-desconto_total = df_vendas['Desconto'].sum()
-
-print(f"\n KPIs GERAIS (Jan-Jun 2024):")
-print(f"   • Total de Vendas: {total_vendas:,} transações")
-print(f"   • Faturamento Total: R$ {faturamento_total:,.2f}")
-print(f"   • Ticket Médio: R$ {ticket_medio:.2f}")
-print(f"   • Unidades Vendidas: {total_unidades:,}")
-print(f"   • Total em Descontos: R$ {desconto_total:,.2f}")
-print(f"   • % Desconto sobre Vendas: {(desconto_total/faturamento_total*100):.2f}%")
-
-# ----- ANÁLISE POR FILIAL -----
-print(f"\n🏪 PERFORMANCE POR FILIAL:")
-vendas_filial = df_vendas.groupby('Filial').agg({
-    'ID Venda': 'count',
-    'Valor Total': ['sum', 'mean'],
-    'Qtd': 'sum',
-    'Desconto': 'sum'
-}).round(2)
-
-vendas_filial.columns = ['Qtd_Vendas', 'Faturamento', 'Ticket_Medio', 'Unidades', 'Descontos']
-vendas_filial['% do Total'] = (vendas_filial['Faturamento'] / faturamento_total * 100).round(2)
-vendas_filial = vendas_filial.sort_values('Faturamento', ascending=False)
-
-for filial in vendas_filial.index:
-    print(f"\n   📍 {filial}:")
-    print(f"      • Faturamento: R$ {vendas_filial.loc[filial, 'Faturamento']:,.2f} ({vendas_filial.loc[filial, '% do Total']:.1f}%)")
-    print(f"      • Vendas: {int(vendas_filial.loc[filial, 'Qtd_Vendas'])} transações")
-    print(f"      • Ticket Médio: R$ {vendas_filial.loc[filial, 'Ticket_Medio']:.2f}")
-    print(f"      • Unidades: {int(vendas_filial.loc[filial, 'Unidades'])}")
-
-# ----- ANÁLISE POR CATEGORIA -----
-print(f"\n🎯 VENDAS POR CATEGORIA:")
-vendas_categoria = df_vendas.groupby('Categoria').agg({
-    'Valor Total': 'sum',
-    'Qtd': 'sum',
-    'ID Venda': 'count'
-}).round(2)
-
-vendas_categoria.columns = ['Faturamento', 'Unidades', 'Transações']
-vendas_categoria['% Faturamento'] = (vendas_categoria['Faturamento'] / faturamento_total * 100).round(2)
-vendas_categoria = vendas_categoria.sort_values('Faturamento', ascending=False)
-
-for categoria in vendas_categoria.index:
-    print(f"   • {categoria}: R$ {vendas_categoria.loc[categoria, 'Faturamento']:,.2f} ({vendas_categoria.loc[categoria, '% Faturamento']:.1f}%) - {int(vendas_categoria.loc[categoria, 'Unidades'])} unidades")
-
-# ----- TOP 10 PRODUTOS MAIS VENDIDOS -----
-print(f"\n🏆 TOP 10 PRODUTOS MAIS VENDIDOS:")
-top_produtos = df_vendas.groupby(['Cód. Produto', 'Produto']).agg({
-    'Valor Total': 'sum',
-    'Qtd': 'sum',
-    'ID Venda': 'count'
-}).round(2)
-
-top_produtos.columns = ['Receita', 'Unidades', 'Transações']
-top_produtos = top_produtos.sort_values('Receita', ascending=False).head(10)
-
-for i, (cod, nome) in enumerate(top_produtos.index, 1):
-    receita = top_produtos.loc[(cod, nome), 'Receita']
-    unidades = int(top_produtos.loc[(cod, nome), 'Unidades'])
-    print(f"   {i}. {nome[:45]}...")
-    print(f"      → R$ {receita:,.2f} | {unidades} unidades vendidas")
-
-# ----- ANÁLISE TEMPORAL -----
-print(f"\n📈 EVOLUÇÃO MENSAL:")
-vendas_mes = df_vendas.groupby('Mês').agg({
-    'Valor Total': 'sum',
-    'ID Venda': 'count'
-}).round(2)
-
-meses = {1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril', 5: 'Maio', 6: 'Junho'}
-
-for mes in sorted(vendas_mes.index):
-    valor = vendas_mes.loc[mes, 'Valor Total']
-    qtd = int(vendas_mes.loc[mes, 'ID Venda'])
-    print(f"   • {meses[mes]}: R$ {valor:,.2f} ({qtd} vendas)")
-
-print("\n✅ Análise de vendas concluída!\n")
+def imprimir_carga(analise):
+    print("📂 [ETAPA 1/5] CARREGANDO DADOS DAS PLANILHAS...")
+    print("-" * 70)
 
-# ============================================================
-# ETAPA 4: ANÁLISE DE ESTOQUE - ALERTAS
-# ============================================================
-print("📦 [ETAPA 4/5] ANÁLISE DE ESTOQUE E ALERTAS...")
-print("-" * 70)
-
-# Estoque total
-estoque_total = df_estoque['Quantidade Disponível'].sum()
-print(f"\n📊 VISÃO GERAL DO ESTOQUE:")
-print(f"   • Estoque Total: {estoque_total:,} unidades")
-print(f"   • Produtos em estoque: {df_estoque['Código Produto'].nunique()}")
-print(f"   • Filiais: {df_estoque['Filial'].nunique()}")
-
-# Análise por status
-status_counts = df_estoque['Status Estoque'].value_counts()
-print(f"\n⚠️  STATUS DO ESTOQUE:")
-for status in ['CRÍTICO', 'BAIXO', 'NORMAL']:
-    if status in status_counts.index:
-        qtd = status_counts[status]
-        perc = (qtd / len(df_estoque) * 100)
-        emoji = '🔴' if status == 'CRÍTICO' else '🟡' if status == 'BAIXO' else '🟢'
-        print(f"   {emoji} {status}: {qtd} itens ({perc:.1f}%)")
-
-# Produtos em situação crítica
-criticos = df_estoque[df_estoque['Status Estoque'] == 'CRÍTICO'].sort_values('% do Mínimo')
-
-if len(criticos) > 0:
-    print(f"\n🚨 ALERTA: {len(criticos)} PRODUTOS EM SITUAÇÃO CRÍTICA:")
-    for _, item in criticos.head(10).iterrows():
-        print(f"   • {item['Produto'][:45]}...")
-        print(f"     Filial: {item['Filial']} | Estoque: {int(item['Quantidade Disponível'])} | Mínimo: {int(item['Estoque Mínimo'])} | {item['% do Mínimo']:.0f}% do mínimo")
-
-# Produtos com estoque baixo
-baixos = df_estoque[df_estoque['Status Estoque'] == 'BAIXO'].sort_values('% do Mínimo')
-
-if len(baixos) > 0:
-    print(f"\n⚡ ATENÇÃO: {len(baixos)} PRODUTOS COM ESTOQUE BAIXO:")
-    for _, item in baixos.head(5).iterrows():
-        print(f"   • {item['Produto'][:45]}...")
-        print(f"     Filial: {item['Filial']} | Estoque: {int(item['Quantidade Disponível'])} | Mínimo: {int(item['Estoque Mínimo'])}")
-
-# Estoque por filial
-print(f"\n🏪 ESTOQUE POR FILIAL:")
-estoque_filial = df_estoque.groupby('Filial').agg({
-    'Quantidade Disponível': 'sum',
-    'Código Produto': 'count'
-})
-estoque_filial.columns = ['Total_Unidades', 'SKUs']
-
-for filial in estoque_filial.index:
-    total = int(estoque_filial.loc[filial, 'Total_Unidades'])
-    skus = int(estoque_filial.loc[filial, 'SKUs'])
-    alertas = len(df_estoque[(df_estoque['Filial'] == filial) & (df_estoque['Status Estoque'].isin(['CRÍTICO', 'BAIXO']))])
-    print(f"   • {filial}: {total:,} unidades | {skus} SKUs | {alertas} alertas")
-
-print("\n Análise de estoque concluída!\n")
+    # Carregar produtos
+    print("   Lendo: data/produtos.xlsx")
+    print(f"    {len(analise.produtos_brutos)} produtos carregados")
 
-# ============================================================
-# ETAPA 5: INSIGHTS E RECOMENDAÇÕES
-# ============================================================
-print(" [ETAPA 5/5] GERANDO INSIGHTS E RECOMENDAÇÕES...")
-print("-" * 70)
-
-print("\n INSIGHTS ESTRATÉGICOS:\n")
-
-# Insight 1: Filial com melhor performance
-melhor_filial = vendas_filial.index[0]
-print(f" FILIAL DESTAQUE: {melhor_filial}")
-print(f"    → Responsável por {vendas_filial.loc[melhor_filial, '% do Total']:.1f}% do faturamento total")
-print(f"    → Ticket médio de R$ {vendas_filial.loc[melhor_filial, 'Ticket_Medio']:.2f}")
-
-# Insight 2: Categoria mais lucrativa
-melhor_categoria = vendas_categoria.index[0]
-print(f"\n CATEGORIA LÍDER: {melhor_categoria}")
-print(f"    → {vendas_categoria.loc[melhor_categoria, '% Faturamento']:.1f}% do faturamento")
-print(f"    → {int(vendas_categoria.loc[melhor_categoria, 'Unidades'])} unidades vendidas")
-
-# Insight 3: Produto mais vendido
-produto_top = top_produtos.index[0]
-print(f"\n PRODUTO CAMPEÃO: {produto_top[1][:50]}")
-print(f"    → Receita: R$ {top_produtos.loc[produto_top, 'Receita']:,.2f}")
-print(f"    → {int(top_produtos.loc[produto_top, 'Unidades'])} unidades vendidas")
-
-# Insight 4: Taxa de crescimento
-crescimento = ((vendas_mes.loc[6, 'Valor Total'] - vendas_mes.loc[1, 'Valor Total']) / vendas_mes.loc[1, 'Valor Total'] * 100)
-print(f"\n CRESCIMENTO: {crescimento:+.1f}% (Jan vs Jun)")
-if crescimento > 0:
-    print(f"    → Tendência positiva de crescimento")
-else:
-    print(f"    → Necessário revisar estratégia comercial")
-
-# Insight 5: Gestão de estoque
-total_alertas = len(criticos) + len(baixos)
-print(f"\n GESTÃO DE ESTOQUE: {total_alertas} produtos precisam de reposição urgente")
-print(f"    → {len(criticos)} em estado crítico")
-print(f"    → {len(baixos)} com estoque baixo")
-
-print("\n RECOMENDAÇÕES:\n")
-print("   ✓ Priorizar reposição dos produtos em situação crítica")
-print("   ✓ Replicar estratégias da filial líder para outras unidades")
-print("   ✓ Investir em marketing para categorias de alta margem")
-print("   ✓ Analisar sazonalidade para melhor gestão de compras")
-print("   ✓ Implementar promoções estratégicas nos produtos com estoque alto")
-
-print("\n" + "=" * 70)
-print("ANÁLISE COMPLETA FINALIZADA COM SUCESSO!")
-print("=" * 70)
-print(f"\nPróximo passo: Execute 'gerar_relatorios.py' para criar relatórios Excel")
-print("=" * 70 + "\n")
\ No newline at end of file
+    # Carregar estoque
+    print("   Lendo: data/estoque_filiais.xlsx")
+    print(f"    {len(analise.estoque_bruto)} registros de estoque carregados")
+
+    # Carregar vendas
+    print("   Lendo: data/vendas_jan_jun_2024.xlsx")
+    print(f"    {len(analise.vendas_brutas)} vendas carregadas")
+
+    print("\n Todos os dados carregados com sucesso!\n")
+
+
+def imprimir_limpeza(analise):
+    print(" [ETAPA 2/5] LIMPEZA E VALIDAÇÃO DOS DADOS...")
+    print("-" * 70)
+
+    print("\n Limpando dados de PRODUTOS:")
+    print(f"   • Produtos válidos: {len(analise.produtos)}/{len(analise.produtos_brutos)}")
+    print(f"   • Campos limpos: Descrição, Categoria")
+    print(f"   • Margem de lucro calculada")
+
+    print("\n Limpando dados de ESTOQUE:")
+    print(f"   • Registros válidos: {len(analise.estoque)}/{len(analise.estoque_bruto)}")
+    print(f"   • Campos vazios preenchidos: Última Entrada, Lote")
+    print(f"   • Status de estoque calculado")
+
+    print("\n Limpando dados de VENDAS:")
+    vendas_antes = len(analise.vendas_brutas)
+    print(f"   • Vendas válidas: {len(analise.vendas)}/{vendas_antes}")
+    print(f"   • Vendas removidas (inválidas): {vendas_antes - len(analise.vendas)}")
+    print(f"   • Datas convertidas e validadas")
+    print(f"   • Campos calculados: Mês, Ano, Dia da Semana")
+
+    print("\n Limpeza concluída!\n")
+
+
+def imprimir_kpis_vendas(analise):
+    print(" [ETAPA 3/5] CALCULANDO KPIs DE VENDAS...")
+    print("-" * 70)
+
+    kpis = analise.kpis_gerais
+    print(f"\n KPIs GERAIS (Jan-Jun 2024):")
+    print(f"   • Total de Vendas: {kpis['total_vendas']:,} transações")
+    print(f"   • Faturamento Total: R$ {kpis['faturamento_total']:,.2f}")
+    print(f"   • Ticket Médio: R$ {kpis['ticket_medio']:.2f}")
+    print(f"   • Unidades Vendidas: {kpis['total_unidades']:,}")
+    print(f"   • Total em Descontos: R$ {kpis['desconto_total']:,.2f}")
+    print(f"   • % Desconto sobre Vendas: {(kpis['desconto_total']/kpis['faturamento_total']*100):.2f}%")
+
+    # ----- ANÁLISE POR FILIAL -----
+    print(f"\n🏪 PERFORMANCE POR FILIAL:")
+    vendas_filial = analise.vendas_filial
+    for filial in vendas_filial.index:
+        print(f"\n   📍 {filial}:")
+        print(f"      • Faturamento: R$ {vendas_filial.loc[filial, 'Faturamento']:,.2f} ({vendas_filial.loc[filial, '% do Total']:.1f}%)")
+        print(f"      • Vendas: {int(vendas_filial.loc[filial, 'Qtd_Vendas'])} transações")
+        print(f"      • Ticket Médio: R$ {vendas_filial.loc[filial, 'Ticket_Medio']:.2f}")
+        print(f"      • Unidades: {int(vendas_filial.loc[filial, 'Unidades'])}")
+
+    # ----- ANÁLISE POR CATEGORIA -----
+    print(f"\n🎯 VENDAS POR CATEGORIA:")
+    vendas_categoria = analise.vendas_categoria
+    for categoria in vendas_categoria.index:
+        print(f"   • {categoria}: R$ {vendas_categoria.loc[categoria, 'Faturamento']:,.2f} ({vendas_categoria.loc[categoria, '% Faturamento']:.1f}%) - {int(vendas_categoria.loc[categoria, 'Unidades'])} unidades")
+
+    # ----- TOP 10 PRODUTOS MAIS VENDIDOS -----
+    print(f"\n🏆 TOP 10 PRODUTOS MAIS VENDIDOS:")
+    top_produtos = analise.top_produtos
+    for i, (cod, nome) in enumerate(top_produtos.index, 1):
+        receita = top_produtos.loc[(cod, nome), 'Receita']
+        unidades = int(top_produtos.loc[(cod, nome), 'Unidades'])
+        print(f"   {i}. {nome[:45]}...")
+        print(f"      → R$ {receita:,.2f} | {unidades} unidades vendidas")
+
+    # ----- ANÁLISE TEMPORAL -----
+    print(f"\n📈 EVOLUÇÃO MENSAL:")
+    vendas_mes = analise.vendas_mes
+    for mes in sorted(vendas_mes.index):
+        valor = vendas_mes.loc[mes, 'Valor Total']
+        qtd = int(vendas_mes.loc[mes, 'ID Venda'])
+        print(f"   • {MESES_PT[mes]}: R$ {valor:,.2f} ({qtd} vendas)")
+
+    print("\n✅ Análise de vendas concluída!\n")
+
+
+def imprimir_estoque(analise):
+    print("📦 [ETAPA 4/5] ANÁLISE DE ESTOQUE E ALERTAS...")
+    print("-" * 70)
+
+    df_estoque = analise.estoque
+
+    # Estoque total
+    estoque_total = df_estoque['Quantidade Disponível'].sum()
+    print(f"\n📊 VISÃO GERAL DO ESTOQUE:")
+    print(f"   • Estoque Total: {estoque_total:,} unidades")
+    print(f"   • Produtos em estoque: {df_estoque['Código Produto'].nunique()}")
+    print(f"   • Filiais: {df_estoque['Filial'].nunique()}")
+
+    # Análise por status
+    status_counts = analise.status_estoque
+    print(f"\n⚠️  STATUS DO ESTOQUE:")
+    for status in ['CRÍTICO', 'BAIXO', 'NORMAL']:
+        if status in status_counts.index:
+            qtd = status_counts[status]
+            perc = (qtd / len(df_estoque) * 100)
+            emoji = '🔴' if status == 'CRÍTICO' else '🟡' if status == 'BAIXO' else '🟢'
+            print(f"   {emoji} {status}: {qtd} itens ({perc:.1f}%)")
+
+    # Produtos em situação crítica
+    criticos = analise.criticos
+    if len(criticos) > 0:
+        print(f"\n🚨 ALERTA: {len(criticos)} PRODUTOS EM SITUAÇÃO CRÍTICA:")
+        for _, item in analise.mais_urgentes(criticos, 10).iterrows():
+            print(f"   • {item['Produto'][:45]}...")
+            print(f"     Filial: {item['Filial']} | Estoque: {int(item['Quantidade Disponível'])} | Mínimo: {int(item['Estoque Mínimo'])} | {item['% do Mínimo']:.0f}% do mínimo")
+
+    # Produtos com estoque baixo
+    baixos = analise.baixos
+    if len(baixos) > 0:
+        print(f"\n⚡ ATENÇÃO: {len(baixos)} PRODUTOS COM ESTOQUE BAIXO:")
+        for _, item in analise.mais_urgentes(baixos, 5).iterrows():
+            print(f"   • {item['Produto'][:45]}...")
+            print(f"     Filial: {item['Filial']} | Estoque: {int(item['Quantidade Disponível'])} | Mínimo: {int(item['Estoque Mínimo'])}")
+
+    # Estoque por filial
+    print(f"\n🏪 ESTOQUE POR FILIAL:")
+    estoque_filial = analise.estoque_filial
+    for filial in estoque_filial.index:
+        total = int(estoque_filial.loc[filial, 'Total_Unidades'])
+        skus = int(estoque_filial.loc[filial, 'SKUs'])
+        alertas = int(estoque_filial.loc[filial, 'Alertas'])
+        print(f"   • {filial}: {total:,} unidades | {skus} SKUs | {alertas} alertas")
+
+    print("\n Análise de estoque concluída!\n")
+
+
+def imprimir_insights(analise):
+    print(" [ETAPA 5/5] GERANDO INSIGHTS E RECOMENDAÇÕES...")
+    print("-" * 70)
+
+    print("\n INSIGHTS ESTRATÉGICOS:\n")
+
+    # Período filtrado sem vendas: não há filial líder, crescimento nem giro para comparar
+    if analise.vendas.empty:
+        print("   Sem vendas no período: nenhum insight de vendas a calcular")
+        return
+
+    # Insight 1: Filial com melhor performance
+    vendas_filial = analise.vendas_filial
+    melhor_filial = vendas_filial.index[0]
+    print(f" FILIAL DESTAQUE: {melhor_filial}")
+    print(f"    → Responsável por {vendas_filial.loc[melhor_filial, '% do Total']:.1f}% do faturamento total")
+    print(f"    → Ticket médio de R$ {vendas_filial.loc[melhor_filial, 'Ticket_Medio']:.2f}")
+
+    # Insight 2: Categoria mais lucrativa
+    vendas_categoria = analise.vendas_categoria
+    melhor_categoria = vendas_categoria.index[0]
+    print(f"\n CATEGORIA LÍDER: {melhor_categoria}")
+    print(f"    → {vendas_categoria.loc[melhor_categoria, '% Faturamento']:.1f}% do faturamento")
+    print(f"    → {int(vendas_categoria.loc[melhor_categoria, 'Unidades'])} unidades vendidas")
+
+    # Insight 3: Produto mais vendido
+    top_produtos = analise.top_produtos
+    produto_top = top_produtos.index[0]
+    print(f"\n PRODUTO CAMPEÃO: {produto_top[1][:50]}")
+    print(f"    → Receita: R$ {top_produtos.loc[produto_top, 'Receita']:,.2f}")
+    print(f"    → {int(top_produtos.loc[produto_top, 'Unidades'])} unidades vendidas")
+
+    # Insight 4: Taxa de crescimento
+    meses = sorted(analise.vendas_mes.index)
+    crescimento = analise.crescimento
+    print(f"\n CRESCIMENTO: {crescimento:+.1f}% ({MESES_PT[meses[0]][:3]} vs {MESES_PT[meses[-1]][:3]})")
+    if crescimento > 0:
+        print(f"    → Tendência positiva de crescimento")
+    else:
+        print(f"    → Necessário revisar estratégia comercial")
+
+    # Insight 5: Gestão de estoque
+    criticos = analise.criticos
+    baixos = analise.baixos
+    total_alertas = len(criticos) + len(baixos)
+    print(f"\n GESTÃO DE ESTOQUE: {total_alertas} produtos precisam de reposição urgente")
+    print(f"    → {len(criticos)} em estado crítico")
+    print(f"    → {len(baixos)} com estoque baixo")
+
+    print("\n RECOMENDAÇÕES:\n")
+    print("   ✓ Priorizar reposição dos produtos em situação crítica")
+    print("   ✓ Replicar estratégias da filial líder para outras unidades")
+    print("   ✓ Investir em marketing para categorias de alta margem")
+    print("   ✓ Analisar sazonalidade para melhor gestão de compras")
+    print("   ✓ Implementar promoções estratégicas nos produtos com estoque alto")
+
+
+def main(analise=None):
+    if analise is None:
+        analise = AnaliseVendas()
+
+    print("\n" + "=" * 70)
+    print(" SISTEMA DE ANÁLISE DE VENDAS E ESTOQUE")
+    print("=" * 70)
+    print(f"Executado em: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
+    print("=" * 70 + "\n")
+
+    try:
+        imprimir_carga(analise)
+    except FileNotFoundError as e:
+        print(f"\n ERRO: Arquivo não encontrado!")
+        print(f"   {e}")
+        print("\n💡 Certifique-se de ter executado 'setup_planilhas.py' primeiro")
+        sys.exit(1)
+
+    imprimir_limpeza(analise)
+    imprimir_kpis_vendas(analise)
+    imprimir_estoque(analise)
+    imprimir_insights(analise)
+
+    print("\n" + "=" * 70)
+    print("ANÁLISE COMPLETA FINALIZADA COM SUCESSO!")
+    print("=" * 70)
+    print(f"\nPróximo passo: Execute 'gerar_relatorios.py' para criar relatórios Excel")
+    print("=" * 70 + "\n")
+
+
+if __name__ == '__main__':
+    main()
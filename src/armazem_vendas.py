@@ -0,0 +1,321 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Armazém de vendas particionado por data
+Vendas validadas em partições Ano/Mês (opcionalmente Filial), uma coluna por arquivo .npy lido com mmap; catálogo com linhas e mínimos/máximos por partição para podar a leitura
+"""
+
+import pandas as pd
+import numpy as np
+import json
+import os
+import re
+import shutil
+import unicodedata
+
+from carregador_dados import ARQUIVO_VENDAS, listar_arquivos_vendas
+
+ARMAZEM_DIR = 'data/armazem_vendas'
+CATALOGO = 'catalogo.json'
+VERSAO_CATALOGO = 1
+
+# Colunas de dicionário com até este número de valores distintos guardam os códigos presentes na partição
+MAX_DISTINTOS_CATALOGO = 64
+
+
+def _slug(valor):
+    texto = unicodedata.normalize('NFKD', str(valor)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', texto.lower()).strip('_')
+
+
+def _tipo_codigos(tamanho):
+    for tipo in ('int8', 'int16', 'int32'):
+        if tamanho < np.iinfo(tipo).max:
+            return tipo
+    return 'int64'
+
+
+def _json_escalar(valor):
+    if isinstance(valor, np.datetime64):
+        return str(pd.Timestamp(valor))
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+
+def _assinatura_fonte(origem):
+    # Arquivo, diretório ou glob: planilha nova, removida ou alterada invalida o armazém
+    try:
+        arquivos = listar_arquivos_vendas(origem)
+    except FileNotFoundError:
+        return None
+    assinaturas = []
+    for caminho in arquivos:
+        stat = os.stat(caminho)
+        assinaturas.append({'arquivo': caminho, 'tamanho': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+    return assinaturas
+
+
+def _limites_periodo(inicio, fim):
+    # Fim inclusivo: vale o dia inteiro
+    return (pd.Timestamp(inicio) if inicio is not None else None,
+            pd.Timestamp(fim) + pd.Timedelta(days=1) if fim is not None else None)
+
+
+def _mascara_datas(datas, inicio, fim):
+    inicio, fim = _limites_periodo(inicio, fim)
+    datas = np.asarray(datas, dtype='datetime64[ns]')
+    mascara = np.ones(len(datas), dtype=bool)
+    if inicio is not None:
+        mascara &= datas >= inicio.to_datetime64()
+    if fim is not None:
+        mascara &= datas < fim.to_datetime64()
+    return mascara
+
+
+def filtrar_periodo(vendas, inicio=None, fim=None, filiais=None):
+    # Mesmo recorte do armazém aplicado a um DataFrame em memória
+    mascara = _mascara_datas(vendas['Data'], inicio, fim)
+    if filiais:
+        mascara &= vendas['Filial'].isin(list(filiais)).to_numpy()
+    return vendas if mascara.all() else vendas.take(np.flatnonzero(mascara))
+
+
+def _codificar(serie):
+    # Numéricos e datas vão direto; texto e categorias viram códigos com dicionário único para todas as partições
+    if isinstance(serie.dtype, pd.CategoricalDtype):
+        categorias = serie.cat.categories
+        return (serie.cat.codes.to_numpy().astype(_tipo_codigos(len(categorias))), None,
+                {'tipo': 'categoria', 'valores': [_json_escalar(v) for v in categorias],
+                 'ordenada': bool(serie.cat.ordered)})
+
+    if isinstance(serie.dtype, pd.api.extensions.ExtensionDtype):
+        if not pd.api.types.is_integer_dtype(serie.dtype):
+            raise ValueError(f"Coluna '{serie.name}': tipo {serie.dtype} não suportado pelo armazém")
+        nulos = serie.isna().to_numpy()
+        valores = serie.to_numpy(dtype=serie.dtype.numpy_dtype, na_value=0)
+        return valores, nulos if nulos.any() else None, {'tipo': 'inteiro_nulo', 'dtype': str(serie.dtype)}
+
+    if serie.dtype == object:
+        codigos, valores = pd.factorize(serie)
+        valores = [_json_escalar(v) for v in valores]
+        try:
+            json.dumps(valores)
+        except TypeError:
+            raise ValueError(f"Coluna '{serie.name}': valores não serializáveis no dicionário")
+        return codigos.astype(_tipo_codigos(len(valores))), None, {'tipo': 'texto', 'valores': valores}
+
+    return serie.to_numpy(), None, {'tipo': 'numerico', 'dtype': str(serie.dtype)}
+
+
+def _decodificar(dados, nulos, descricao, categorias):
+    tipo = descricao['tipo']
+    if tipo == 'numerico':
+        return np.array(dados)
+    if tipo == 'inteiro_nulo':
+        valores = pd.array(np.array(dados), dtype=descricao['dtype'])
+        if nulos is not None:
+            valores[np.asarray(nulos)] = pd.NA
+        return valores
+
+    codigos = np.asarray(dados, dtype='int64')
+    if tipo == 'categoria' or categorias:
+        return pd.Categorical.from_codes(codigos, categories=descricao['valores'],
+                                         ordered=descricao.get('ordenada', False))
+    valores = np.array(descricao['valores'] + [np.nan], dtype=object)
+    return valores[codigos]
+
+
+class ArmazemVendas:
+
+    def __init__(self, diretorio=ARMAZEM_DIR, por_filial=False, fonte=ARQUIVO_VENDAS):
+        self.diretorio = diretorio
+        self.por_filial = por_filial
+        self.fonte = fonte
+        self._catalogo = None
+        self.estatisticas = {'particoes_lidas': 0, 'particoes_podadas': 0, 'colunas_lidas': 0}
+
+    @property
+    def catalogo(self):
+        if self._catalogo is None:
+            with open(os.path.join(self.diretorio, CATALOGO), 'r', encoding='utf-8') as f:
+                self._catalogo = json.load(f)
+        return self._catalogo
+
+    def existe(self):
+        return os.path.exists(os.path.join(self.diretorio, CATALOGO))
+
+    def atualizado(self):
+        # Armazém gravado a partir da versão atual da planilha de vendas (tamanho e mtime)
+        if not self.existe():
+            return False
+        return self.catalogo.get('fonte') == _assinatura_fonte(self.fonte)
+
+    def _chaves_particao(self, vendas):
+        datas = pd.DatetimeIndex(vendas['Data'])
+        if datas.isna().any():
+            raise ValueError("Vendas sem data não podem ser particionadas")
+        chaves = {'ano': datas.year.to_numpy(), 'mes': datas.month.to_numpy()}
+        if self.por_filial:
+            chaves['filial'] = vendas['Filial'].to_numpy()
+        return pd.MultiIndex.from_arrays(list(chaves.values()), names=list(chaves))
+
+    def _caminho_particao(self, ano, mes, filial=None):
+        caminho = os.path.join(f'ano={ano}', f'mes={mes:02d}')
+        return os.path.join(caminho, f'filial={_slug(filial)}') if filial is not None else caminho
+
+    def gravar(self, vendas):
+        # Reescrita completa num diretório temporário e troca no fim: leitores nunca veem meio armazém
+        codigos_particao, particoes = pd.factorize(self._chaves_particao(vendas), sort=True)
+        ordem = np.argsort(codigos_particao, kind='stable')
+        limites = np.r_[0, np.cumsum(np.bincount(codigos_particao, minlength=len(particoes)))]
+
+        colunas = {}
+        for nome in vendas.columns:
+            dados, nulos, descricao = _codificar(vendas[nome])
+            colunas[nome] = (dados[ordem], None if nulos is None else nulos[ordem], descricao)
+
+        temporario = self.diretorio + '.novo'
+        shutil.rmtree(temporario, ignore_errors=True)
+        entradas = []
+        for i, chave in enumerate(particoes):
+            chave = chave if isinstance(chave, tuple) else (chave,)
+            caminho = self._caminho_particao(int(chave[0]), int(chave[1]), *chave[2:])
+            os.makedirs(os.path.join(temporario, caminho))
+            fatia = slice(limites[i], limites[i + 1])
+
+            estatisticas = {}
+            for indice, (nome, (dados, nulos, descricao)) in enumerate(colunas.items()):
+                parte = dados[fatia]
+                np.save(os.path.join(temporario, caminho, f'{indice:03d}.npy'), parte)
+                if nulos is not None:
+                    np.save(os.path.join(temporario, caminho, f'{indice:03d}.nulos.npy'), nulos[fatia])
+
+                if descricao['tipo'] == 'numerico' and len(parte) and parte.dtype.kind in 'iufM':
+                    validos = parte[~np.isnan(parte)] if parte.dtype.kind == 'f' else parte
+                    if len(validos):
+                        estatisticas[nome] = {'min': _json_escalar(validos.min()), 'max': _json_escalar(validos.max())}
+                elif descricao['tipo'] in ('texto', 'categoria') and len(descricao['valores']) <= MAX_DISTINTOS_CATALOGO:
+                    estatisticas[nome] = {'distintos': np.unique(parte).tolist()}
+
+            entradas.append({
+                'caminho': caminho,
+                'ano': int(chave[0]),
+                'mes': int(chave[1]),
+                'filial': chave[2] if self.por_filial else None,
+                'linhas': int(limites[i + 1] - limites[i]),
+                'estatisticas': estatisticas
+            })
+
+        catalogo = {
+            'versao': VERSAO_CATALOGO,
+            'fonte': _assinatura_fonte(self.fonte),
+            'por_filial': self.por_filial,
+            'linhas': int(len(vendas)),
+            'colunas': [{'nome': nome, 'arquivo': f'{indice:03d}', **descricao}
+                        for indice, (nome, (_, _, descricao)) in enumerate(colunas.items())],
+            'particoes': entradas
+        }
+        with open(os.path.join(temporario, CATALOGO), 'w', encoding='utf-8') as f:
+            json.dump(catalogo, f, ensure_ascii=False, indent=2)
+
+        antigo = self.diretorio + '.antigo'
+        shutil.rmtree(antigo, ignore_errors=True)
+        if os.path.exists(self.diretorio):
+            os.replace(self.diretorio, antigo)
+        os.replace(temporario, self.diretorio)
+        shutil.rmtree(antigo, ignore_errors=True)
+
+        self._catalogo = catalogo
+        return catalogo
+
+    def _codigos_filiais(self, filiais):
+        descricao = next(c for c in self.catalogo['colunas'] if c['nome'] == 'Filial')
+        return {i for i, valor in enumerate(descricao['valores']) if valor in set(filiais)}
+
+    def particoes(self, inicio=None, fim=None, filiais=None):
+        # Poda pelo catálogo: intervalo de datas contra min/max e filiais contra a chave ou os códigos presentes
+        inicio, fim = _limites_periodo(inicio, fim)
+        codigos_filial = self._codigos_filiais(filiais) if filiais else None
+
+        selecionadas = []
+        for particao in self.catalogo['particoes']:
+            datas = particao['estatisticas'].get('Data')
+            fora_periodo = datas is not None and (
+                (inicio is not None and pd.Timestamp(datas['max']) < inicio) or
+                (fim is not None and pd.Timestamp(datas['min']) >= fim))
+            fora_filial = False
+            if filiais:
+                if particao['filial'] is not None:
+                    fora_filial = particao['filial'] not in filiais
+                elif 'Filial' in particao['estatisticas']:
+                    fora_filial = not codigos_filial.intersection(particao['estatisticas']['Filial']['distintos'])
+
+            if fora_periodo or fora_filial:
+                self.estatisticas['particoes_podadas'] += 1
+            else:
+                selecionadas.append(particao)
+        return selecionadas
+
+    def ler(self, inicio=None, fim=None, filiais=None, colunas=None, categorias=False):
+        # Só as partições e colunas pedidas são abertas (mmap); o recorte fino por linha usa Data e Filial
+        descricoes = {c['nome']: c for c in self.catalogo['colunas']}
+        colunas = list(descricoes) if colunas is None else list(colunas)
+        desconhecidas = [c for c in colunas if c not in descricoes]
+        if desconhecidas:
+            raise ValueError(f"Colunas inexistentes no armazém: {', '.join(desconhecidas)}")
+
+        filtros = (['Data'] if inicio is not None or fim is not None else []) + (['Filial'] if filiais else [])
+        necessarias = colunas + [c for c in filtros if c not in colunas]
+        if 'Filial' in filtros and descricoes['Filial']['tipo'] not in ('texto', 'categoria'):
+            raise ValueError("Filtro de filial requer a coluna Filial codificada por dicionário")
+        partes = {nome: [] for nome in necessarias}
+        nulos = {nome: [] for nome in necessarias}
+
+        for particao in self.particoes(inicio, fim, filiais):
+            base = os.path.join(self.diretorio, particao['caminho'])
+            arrays = {}
+            for nome in necessarias:
+                arquivo = descricoes[nome]['arquivo']
+                arrays[nome] = np.load(os.path.join(base, f'{arquivo}.npy'), mmap_mode='r')
+                caminho_nulos = os.path.join(base, f'{arquivo}.nulos.npy')
+                arrays[(nome, 'nulos')] = np.load(caminho_nulos, mmap_mode='r') \
+                    if os.path.exists(caminho_nulos) else None
+            self.estatisticas['particoes_lidas'] += 1
+            self.estatisticas['colunas_lidas'] += len(necessarias)
+
+            mascara = None
+            if inicio is not None or fim is not None:
+                mascara = _mascara_datas(arrays['Data'], inicio, fim)
+            if filiais:
+                filial = np.isin(arrays['Filial'], sorted(self._codigos_filiais(filiais)))
+                mascara = filial if mascara is None else mascara & filial
+
+            for nome in necessarias:
+                dados, nulos_coluna = arrays[nome], arrays[(nome, 'nulos')]
+                partes[nome].append(np.asarray(dados[mascara] if mascara is not None else dados))
+                nulos[nome].append(np.zeros(len(partes[nome][-1]), dtype=bool) if nulos_coluna is None else
+                                   np.asarray(nulos_coluna[mascara] if mascara is not None else nulos_coluna))
+
+        resultado = {}
+        for nome in colunas:
+            descricao = descricoes[nome]
+            if partes[nome]:
+                dados = np.concatenate(partes[nome])
+                mascara_nulos = np.concatenate(nulos[nome])
+            else:
+                dados = np.zeros(0, dtype=descricao.get('dtype', 'int64') if descricao['tipo'] == 'numerico'
+                                 else 'int64')
+                mascara_nulos = np.zeros(0, dtype=bool)
+            resultado[nome] = _decodificar(dados, mascara_nulos if mascara_nulos.any() else None,
+                                           descricao, categorias)
+        return pd.DataFrame(resultado)
+
+    def resumo(self):
+        catalogo = self.catalogo
+        tamanho = sum(os.path.getsize(os.path.join(raiz, arquivo))
+                      for raiz, _, arquivos in os.walk(self.diretorio) for arquivo in arquivos)
+        return {
+            'particoes': len(catalogo['particoes']),
+            'linhas': catalogo['linhas'],
+            'colunas': len(catalogo['colunas']),
+            'por_filial': catalogo['por_filial'],
+            'bytes': tamanho
+        }
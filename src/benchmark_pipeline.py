@@ -0,0 +1,252 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Benchmark de escalabilidade do pipeline
+Mede tempo e pico de memória de cada etapa sobre dados sintéticos e compara com uma baseline gravada
+"""
+
+import pandas as pd
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gerador_dados import GeradorDadosSinteticos
+from processar_dados import ProcessadorDados
+from gerar_relatorios import GeradorRelatorios
+from exportar_dashboard_data import ExportadorDashboard
+
+BASELINE_PADRAO = 'benchmarks/baseline.json'
+TAMANHOS_PADRAO = [10000, 100000, 1000000]
+
+# Tolerâncias relativas e mínimos absolutos (abaixo deles a variação é ruído de medição)
+TOLERANCIA_TEMPO = 0.25
+TOLERANCIA_MEMORIA = 0.20
+MINIMO_TEMPO_S = 0.02
+MINIMO_MEMORIA_MB = 1.0
+
+
+def _medir(funcao, repeticoes):
+    # Tempo: melhor de N execuções sem instrumentação; memória: uma execução sob tracemalloc
+    tempos = []
+    for _ in range(repeticoes):
+        gc.collect()
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append(time.perf_counter() - inicio)
+        del resultado
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        resultado = funcao()
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return resultado, {'tempo_s': round(min(tempos), 4), 'pico_memoria_mb': round(pico / 2 ** 20, 2)}
+
+
+class BenchmarkPipeline:
+
+    def __init__(self, tamanhos=None, repeticoes=3, semente=42, incluir_excel=False):
+        self.tamanhos = tamanhos or TAMANHOS_PADRAO
+        self.repeticoes = repeticoes
+        self.semente = semente
+        self.incluir_excel = incluir_excel
+
+    def etapas(self, dados, diretorio):
+        processador = ProcessadorDados(estado_dir=os.path.join(diretorio, 'estado'))
+        processador.produtos = processador.validar_produtos(dados['produtos'])
+        processador.estoque = processador.validar_estoque(dados['estoque'])
+        contexto = {}
+
+        def validar():
+            contexto['vendas'] = processador.validar_vendas(dados['vendas'])
+            return contexto['vendas']
+
+        def enriquecer():
+            contexto['enriquecidas'] = processador.enriquecer_vendas_com_produtos(contexto['vendas'])
+            return contexto['enriquecidas']
+
+        def exportar_dashboard():
+            exportador = ExportadorDashboard()
+            exportador.output_dir = diretorio
+            exportador.definir_dados(processador.produtos, processador.estoque, contexto['vendas'])
+            return [exportador.calcular_kpis_gerais(), exportador.calcular_vendas_mensais(),
+                    exportador.calcular_vendas_filial(), exportador.calcular_vendas_categoria(),
+                    exportador.calcular_top_produtos(), exportador.processar_alertas_estoque(),
+                    exportador.calcular_cubo_drilldown(), exportador.gerar_pacote()]
+
+        def montar_relatorios():
+            gerador = GeradorRelatorios()
+            gerador.definir_dados(processador.produtos, processador.estoque, contexto['vendas'])
+            return gerador.montar_relatorio_completo() + gerador.montar_relatorio_estoque_detalhado()
+
+        etapas = [
+            ('validar_vendas', validar),
+            ('enriquecer_vendas', enriquecer),
+            ('metricas_agregadas', lambda: processador.calcular_metricas_agregadas(contexto['enriquecidas'])),
+            ('identificar_outliers', lambda: processador.identificar_outliers_vendas(contexto['enriquecidas'])),
+            ('exportar_dashboard', exportar_dashboard),
+            ('montar_relatorios', montar_relatorios)
+        ]
+
+        if self.incluir_excel:
+            caminho = os.path.join(diretorio, 'dataset_processado.xlsx')
+
+            def gravar_dataset():
+                processador.vendas = contexto['vendas']
+                return processador.gerar_dataset_analise(caminho)
+
+            etapas.append(('gravar_dataset_excel', gravar_dataset))
+
+        return etapas
+
+    def executar_tamanho(self, num_vendas):
+        gerador = GeradorDadosSinteticos(num_vendas=num_vendas, semente=self.semente)
+        dados = gerador.gerar()
+
+        resultados = {}
+        with tempfile.TemporaryDirectory() as diretorio:
+            for nome, funcao in self.etapas(dados, diretorio):
+                _, medida = _medir(funcao, self.repeticoes)
+                medida['linhas_por_s'] = round(num_vendas / medida['tempo_s']) if medida['tempo_s'] else None
+                resultados[nome] = medida
+                print(f'   {nome:<22} {medida["tempo_s"]:>9.3f} s {medida["pico_memoria_mb"]:>10.1f} MB')
+
+        return resultados
+
+    def executar(self):
+        resultados = {}
+        for num_vendas in self.tamanhos:
+            print(f'\n{num_vendas:,} vendas'.replace(',', '.'))
+            resultados[str(num_vendas)] = self.executar_tamanho(num_vendas)
+
+        return {
+            'gerado_em': datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
+            'ambiente': {
+                'python': platform.python_version(),
+                'pandas': pd.__version__,
+                'numpy': np.__version__,
+                'plataforma': platform.platform(),
+                'processador': platform.processor() or platform.machine()
+            },
+            'repeticoes': self.repeticoes,
+            'semente': self.semente,
+            'resultados': resultados
+        }
+
+
+def comparar_com_baseline(atual, baseline, tolerancia_tempo=TOLERANCIA_TEMPO,
+                          tolerancia_memoria=TOLERANCIA_MEMORIA):
+    regressoes = []
+    for tamanho, etapas in atual['resultados'].items():
+        referencias = baseline['resultados'].get(tamanho, {})
+        for etapa, medida in etapas.items():
+            referencia = referencias.get(etapa)
+            if referencia is None:
+                continue
+
+            limites = [
+                ('tempo_s', tolerancia_tempo, MINIMO_TEMPO_S),
+                ('pico_memoria_mb', tolerancia_memoria, MINIMO_MEMORIA_MB)
+            ]
+            for metrica, tolerancia, minimo in limites:
+                valor, base = medida[metrica], referencia[metrica]
+                if valor > base * (1 + tolerancia) and valor - base > minimo:
+                    regressoes.append({
+                        'tamanho': int(tamanho),
+                        'etapa': etapa,
+                        'metrica': metrica,
+                        'baseline': base,
+                        'atual': valor,
+                        'variacao_%': round((valor / base - 1) * 100, 1) if base else None
+                    })
+
+    return regressoes
+
+
+def carregar_baseline(caminho=BASELINE_PADRAO):
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def salvar_json(caminho, conteudo):
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(conteudo, f, ensure_ascii=False, indent=2)
+    return caminho
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de escalabilidade do pipeline')
+    parser.add_argument('--tamanhos', default=','.join(str(t) for t in TAMANHOS_PADRAO),
+                        help='números de vendas separados por vírgula (ex.: 10000,100000,1000000)')
+    parser.add_argument('--repeticoes', type=int, default=3, help='execuções por etapa (vale a melhor)')
+    parser.add_argument('--semente', type=int, default=42, help='semente dos dados sintéticos')
+    parser.add_argument('--incluir-excel', action='store_true',
+                        help='inclui a gravação do dataset processado em Excel (lenta em escala)')
+    parser.add_argument('--baseline', default=BASELINE_PADRAO, help='arquivo da baseline')
+    parser.add_argument('--salvar-baseline', action='store_true',
+                        help='grava os resultados desta execução como nova baseline')
+    parser.add_argument('--saida', help='grava também os resultados desta execução neste arquivo JSON')
+    parser.add_argument('--tolerancia-tempo', type=float, default=TOLERANCIA_TEMPO,
+                        help='aumento relativo de tempo tolerado (0.25 = 25%%)')
+    parser.add_argument('--tolerancia-memoria', type=float, default=TOLERANCIA_MEMORIA,
+                        help='aumento relativo de memória tolerado (0.20 = 20%%)')
+    args = parser.parse_args()
+
+    tamanhos = [int(t) for t in args.tamanhos.split(',') if t.strip()]
+    benchmark = BenchmarkPipeline(tamanhos, repeticoes=args.repeticoes, semente=args.semente,
+                                  incluir_excel=args.incluir_excel)
+
+    # A baseline não vem com o repositório: a primeira execução na máquina de referência a grava
+    bootstrap = f'python src/benchmark_pipeline.py --tamanhos {",".join(str(t) for t in tamanhos)} --salvar-baseline'
+    if args.baseline != BASELINE_PADRAO:
+        bootstrap += f' --baseline {args.baseline}'
+    if not args.salvar_baseline and carregar_baseline(args.baseline) is None:
+        print(f'\nNenhuma baseline em {args.baseline}: esta execução só mede, sem comparar. Para criá-la:\n   {bootstrap}')
+
+    print('\nBenchmark do pipeline (melhor tempo / pico de memória por etapa)')
+    atual = benchmark.executar()
+
+    if args.saida:
+        print(f'\nResultados salvos em: {salvar_json(args.saida, atual)}')
+
+    if args.salvar_baseline:
+        print(f'\nBaseline salva em: {salvar_json(args.baseline, atual)}\n')
+        return
+
+    baseline = carregar_baseline(args.baseline)
+    if baseline is None:
+        print(f'\nNenhuma baseline em {args.baseline}; grave esta máquina como referência com:\n   {bootstrap}\n')
+        return
+
+    regressoes = comparar_com_baseline(atual, baseline, args.tolerancia_tempo, args.tolerancia_memoria)
+    if not regressoes:
+        print(f'\nSem regressões em relação à baseline de {baseline["gerado_em"]}\n')
+        return
+
+    print(f'\n{len(regressoes)} regressões em relação à baseline de {baseline["gerado_em"]}:')
+    for r in regressoes:
+        print(f'   {r["tamanho"]:>10} {r["etapa"]:<22} {r["metrica"]:<16} '
+              f'{r["baseline"]} -> {r["atual"]} (+{r["variacao_%"]}%)')
+    print()
+    sys.exit(1)
+
+if __name__ == '__main__':
+    main()
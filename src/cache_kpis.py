@@ -0,0 +1,198 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Cache de resultados de KPIs
+Memoização por impressão digital dos DataFrames de entrada e parâmetros, em memória (LRU) e opcionalmente em disco
+"""
+
+import pandas as pd
+import copy
+import hashlib
+import json
+import os
+import pickle
+from collections import OrderedDict
+
+from carregador_dados import ARQUIVO_PRODUTOS, ARQUIVO_ESTOQUE, ARQUIVO_VENDAS
+
+CACHE_KPIS_DIR = 'data/.cache_kpis'
+MAX_ITENS_PADRAO = 128
+MAX_BYTES_DISCO_PADRAO = 64 * 2 ** 20
+
+FONTES_PADRAO = (ARQUIVO_PRODUTOS, ARQUIVO_ESTOQUE, ARQUIVO_VENDAS)
+
+
+def impressao_dataframe(df):
+    # Conteúdo, índice, nomes e tipos das colunas: DataFrames iguais têm a mesma impressão em qualquer processo
+    sha = hashlib.sha1()
+    sha.update(repr((df.shape, [str(c) for c in df.columns], [str(t) for t in df.dtypes])).encode('utf-8'))
+    sha.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+def _copiar(valor):
+    # O chamador recebe uma cópia: alterar o resultado não contamina o cache
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return valor.copy()
+    return copy.deepcopy(valor)
+
+
+class CacheKPIs:
+
+    def __init__(self, max_itens=MAX_ITENS_PADRAO, diretorio=None, max_bytes_disco=MAX_BYTES_DISCO_PADRAO,
+                 fontes=FONTES_PADRAO):
+        # Sem diretorio o cache fica só em memória
+        self.max_itens = max_itens
+        self.diretorio = diretorio
+        self.max_bytes_disco = max_bytes_disco
+        self.fontes = tuple(fontes)
+        self._memoria = OrderedDict()
+        self._versao_fontes = None
+        self.estatisticas = {'acertos_memoria': 0, 'acertos_disco': 0, 'faltas': 0,
+                             'remocoes_memoria': 0, 'remocoes_disco': 0, 'invalidacoes': 0}
+
+    @classmethod
+    def persistente(cls, diretorio=CACHE_KPIS_DIR, **opcoes):
+        return cls(diretorio=diretorio, **opcoes)
+
+    def versao_fontes(self):
+        # Tamanho e mtime das planilhas de origem: qualquer alteração invalida o cache inteiro
+        assinatura = []
+        for caminho in self.fontes:
+            try:
+                stat = os.stat(caminho)
+                assinatura.append((os.path.abspath(caminho), stat.st_size, stat.st_mtime_ns))
+            except FileNotFoundError:
+                assinatura.append((os.path.abspath(caminho), None, None))
+        return hashlib.sha1(repr(assinatura).encode('utf-8')).hexdigest()[:12]
+
+    def _verificar_fontes(self):
+        # Na primeira consulta também descarta o que outras execuções gravaram para planilhas antigas
+        versao = self.versao_fontes()
+        if versao != self._versao_fontes:
+            if self._versao_fontes is not None:
+                self.estatisticas['invalidacoes'] += 1
+                self._memoria.clear()
+            self._remover_disco(lambda nome: not nome.startswith(f'{versao}_'))
+            self._versao_fontes = versao
+        return versao
+
+    def impressao(self, quadro):
+        # Sem memória por objeto: uma edição no lugar (df.loc[...] = ...) mantém id e forma e
+        # devolveria KPIs velhos. Quem sabe que o quadro não muda passa a impressão pronta (str)
+        if isinstance(quadro, str):
+            return quadro
+        return impressao_dataframe(quadro)
+
+    def chave(self, nome, quadros, parametros=None):
+        conteudo = json.dumps({
+            'nome': nome,
+            'quadros': [self.impressao(quadro) for quadro in quadros],
+            'parametros': parametros or {}
+        }, sort_keys=True, default=str)
+        return hashlib.sha1(conteudo.encode('utf-8')).hexdigest()
+
+    def obter(self, nome, quadros, calcular, parametros=None):
+        versao = self._verificar_fontes()
+        chave = self.chave(nome, quadros, parametros)
+
+        if chave in self._memoria:
+            self._memoria.move_to_end(chave)
+            self.estatisticas['acertos_memoria'] += 1
+            return _copiar(self._memoria[chave])
+
+        valor = self._ler_disco(versao, chave)
+        if valor is not None:
+            self.estatisticas['acertos_disco'] += 1
+        else:
+            self.estatisticas['faltas'] += 1
+            valor = calcular()
+            self._gravar_disco(versao, chave, valor)
+
+        self._memoria[chave] = valor
+        if len(self._memoria) > self.max_itens:
+            self._memoria.popitem(last=False)
+            self.estatisticas['remocoes_memoria'] += 1
+
+        return _copiar(valor)
+
+    def _caminho(self, versao, chave):
+        return os.path.join(self.diretorio, f'{versao}_{chave}.pkl')
+
+    def _ler_disco(self, versao, chave):
+        if not self.diretorio:
+            return None
+        caminho = self._caminho(versao, chave)
+        try:
+            with open(caminho, 'rb') as f:
+                valor = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            os.remove(caminho)
+            return None
+
+        # mtime marca o último uso: a remoção por tamanho descarta primeiro o menos usado
+        os.utime(caminho)
+        return valor
+
+    def _gravar_disco(self, versao, chave, valor):
+        if not self.diretorio:
+            return
+        os.makedirs(self.diretorio, exist_ok=True)
+        caminho = self._caminho(versao, chave)
+        temporario = caminho + '.tmp'
+        with open(temporario, 'wb') as f:
+            pickle.dump(valor, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, caminho)
+        self._limitar_disco()
+
+    def _arquivos_disco(self):
+        if not self.diretorio or not os.path.isdir(self.diretorio):
+            return []
+        arquivos = []
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.diretorio, nome))
+                arquivos.append((stat.st_mtime_ns, stat.st_size, nome))
+        return sorted(arquivos)
+
+    def _limitar_disco(self):
+        arquivos = self._arquivos_disco()
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, nome in arquivos:
+            if total <= self.max_bytes_disco:
+                break
+            os.remove(os.path.join(self.diretorio, nome))
+            total -= tamanho
+            self.estatisticas['remocoes_disco'] += 1
+
+    def _remover_disco(self, remover):
+        for _, _, nome in self._arquivos_disco():
+            if remover(nome):
+                os.remove(os.path.join(self.diretorio, nome))
+                self.estatisticas['remocoes_disco'] += 1
+
+    def limpar(self):
+        self._memoria.clear()
+        self._remover_disco(lambda nome: True)
+
+    def resumo(self):
+        consultas = self.estatisticas['acertos_memoria'] + self.estatisticas['acertos_disco'] + \
+            self.estatisticas['faltas']
+        acertos = consultas - self.estatisticas['faltas']
+        return {
+            **self.estatisticas,
+            'consultas': consultas,
+            'taxa_acerto_%': round(acertos / consultas * 100, 1) if consultas else None,
+            'itens_memoria': len(self._memoria),
+            'bytes_disco': sum(tamanho for _, tamanho, _ in self._arquivos_disco())
+        }
+
+    def imprimir_resumo(self):
+        resumo = self.resumo()
+        taxa = f'{resumo["taxa_acerto_%"]}%' if resumo['consultas'] else '-'
+        print(f'\nCache de KPIs: {resumo["consultas"]} consultas, acerto {taxa} '
+              f'(memória {resumo["acertos_memoria"]}, disco {resumo["acertos_disco"]}, '
+              f'faltas {resumo["faltas"]})')
+        if self.diretorio:
+            print(f'   {resumo["bytes_disco"] / 1024:.1f} KB em {self.diretorio}')
@@ -0,0 +1,339 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Carregador compartilhado das planilhas de origem
+Mantém uma cópia tipada de cada aba em cache para evitar reprocessar o Excel
+"""
+
+import pandas as pd
+import numpy as np
+from openpyxl import load_workbook
+from escritor_excel import nome_continuacao
+from concurrent.futures import ProcessPoolExecutor
+import glob
+import hashlib
+import json
+import os
+import time
+
+CACHE_DIR = 'data/.cache'
+
+ARQUIVO_PRODUTOS = 'data/produtos.xlsx'
+ARQUIVO_ESTOQUE = 'data/estoque_filiais.xlsx'
+ARQUIVO_VENDAS = 'data/vendas_jan_jun_2024.xlsx'
+
+TAMANHO_BLOCO_PADRAO = 50000
+
+ABA_VENDAS = 'Vendas_Completo'
+COLUNAS_VENDAS = ('ID Venda', 'Data', 'Hora', 'Filial', 'Vendedor', 'Cód. Produto', 'Produto', 'Categoria',
+                  'Qtd', 'Preço Unit.', 'Subtotal', 'Desconto', 'Valor Total', 'Forma Pagamento',
+                  'CPF Cliente', 'Observações')
+
+TIPOS_VENDAS = {
+    'ID Venda': 'int64',
+    'Qtd': 'int64',
+    'Preço Unit.': 'float64',
+    'Subtotal': 'float64',
+    'Desconto': 'float64',
+    'Valor Total': 'float64',
+    'CPF Cliente': 'float64'
+}
+
+
+class CarregadorPlanilhas:
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._memoria = {}
+        self.estatisticas = {'memoria': 0, 'disco': 0, 'excel': 0}
+
+    def _hash_arquivo(self, caminho):
+        sha = hashlib.sha256()
+        with open(caminho, 'rb') as f:
+            for bloco in iter(lambda: f.read(1 << 20), b''):
+                sha.update(bloco)
+        return sha.hexdigest()
+
+    def _chave_cache(self, caminho):
+        nome = os.path.abspath(caminho).encode('utf-8')
+        return hashlib.sha1(nome).hexdigest()[:16]
+
+    def _caminho_meta(self, chave):
+        return os.path.join(self.cache_dir, f'{chave}.json')
+
+    def _caminho_aba(self, chave, indice):
+        return os.path.join(self.cache_dir, f'{chave}_{indice}.pkl')
+
+    def _ler_meta(self, chave):
+        try:
+            with open(self._caminho_meta(chave), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def _gravar_meta(self, chave, meta):
+        with open(self._caminho_meta(chave), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    def _validar_meta(self, caminho, chave, meta, stat):
+        if meta is None:
+            return None
+
+        if meta['tamanho'] == stat.st_size and meta['mtime_ns'] == stat.st_mtime_ns:
+            return meta
+
+        if meta['tamanho'] != stat.st_size:
+            return None
+
+        # Arquivo tocado mas com o mesmo conteúdo: reaproveita o cache
+        if meta['sha256'] == self._hash_arquivo(caminho):
+            meta['mtime_ns'] = stat.st_mtime_ns
+            self._gravar_meta(chave, meta)
+            return meta
+
+        return None
+
+    def _converter_excel(self, caminho, chave, stat):
+        abas = pd.read_excel(caminho, sheet_name=None)
+        self.estatisticas['excel'] += 1
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for indice, df in enumerate(abas.values()):
+            df.to_pickle(self._caminho_aba(chave, indice))
+
+        meta = {
+            'arquivo': caminho,
+            'tamanho': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': self._hash_arquivo(caminho),
+            'abas': list(abas.keys())
+        }
+        self._gravar_meta(chave, meta)
+
+        return meta, abas
+
+    def _resolver_aba(self, meta, sheet_name):
+        if isinstance(sheet_name, int):
+            return sheet_name
+        if sheet_name not in meta['abas']:
+            raise ValueError(f"Aba '{sheet_name}' não encontrada em {meta['arquivo']}")
+        return meta['abas'].index(sheet_name)
+
+    def carregar(self, caminho, sheet_name=0):
+        stat = os.stat(caminho)
+        chave = self._chave_cache(caminho)
+        versao = (stat.st_size, stat.st_mtime_ns)
+
+        memoria = self._memoria.get(chave)
+        if memoria is not None and memoria['versao'] == versao:
+            indice = self._resolver_aba(memoria['meta'], sheet_name)
+            if indice in memoria['abas']:
+                self.estatisticas['memoria'] += 1
+                return memoria['abas'][indice].copy()
+
+        meta = self._validar_meta(caminho, chave, self._ler_meta(chave), stat)
+        abas = {}
+
+        if meta is None:
+            meta, lidas = self._converter_excel(caminho, chave, stat)
+            abas = dict(enumerate(lidas.values()))
+            indice = self._resolver_aba(meta, sheet_name)
+        else:
+            indice = self._resolver_aba(meta, sheet_name)
+            abas[indice] = pd.read_pickle(self._caminho_aba(chave, indice))
+            self.estatisticas['disco'] += 1
+
+        if memoria is not None and memoria['versao'] == versao:
+            memoria['abas'].update(abas)
+        else:
+            self._memoria[chave] = {'versao': versao, 'meta': meta, 'abas': abas}
+
+        return abas[indice].copy()
+
+    def abas(self, caminho):
+        # Nomes das abas na ordem do arquivo, sem ler nenhuma delas se o meta estiver válido
+        stat = os.stat(caminho)
+        chave = self._chave_cache(caminho)
+        memoria = self._memoria.get(chave)
+        if memoria is not None and memoria['versao'] == (stat.st_size, stat.st_mtime_ns):
+            return list(memoria['meta']['abas'])
+
+        meta = self._validar_meta(caminho, chave, self._ler_meta(chave), stat)
+        if meta is None:
+            meta, _ = self._converter_excel(caminho, chave, stat)
+        return list(meta['abas'])
+
+    def limpar_cache(self):
+        self._memoria.clear()
+        if os.path.isdir(self.cache_dir):
+            for nome in os.listdir(self.cache_dir):
+                os.remove(os.path.join(self.cache_dir, nome))
+
+
+def _tipar_bloco(df, tipos):
+    for coluna, tipo in tipos.items():
+        if coluna not in df.columns:
+            continue
+        valores = pd.to_numeric(df[coluna], errors='coerce')
+        if tipo.startswith('int') and valores.isna().any():
+            tipo = 'float64'
+        df[coluna] = valores.astype(tipo)
+
+    # Células vazias chegam como None; o read_excel usa NaN
+    for coluna in df.columns[df.dtypes == object]:
+        df[coluna] = df[coluna].where(df[coluna].notna(), np.nan)
+    return df
+
+
+def abas_continuacao(nome, abas):
+    # Abas acima do limite do Excel continuam em <aba>_2, <aba>_3, ... (EscritorExcelStreaming)
+    continuacoes = []
+    numero = 2
+    while nome_continuacao(nome, numero) in abas:
+        continuacoes.append(nome_continuacao(nome, numero))
+        numero += 1
+    return continuacoes
+
+
+def ler_planilha_em_blocos(caminho, sheet_name=0, tamanho_bloco=TAMANHO_BLOCO_PADRAO, tipos=None,
+                           continuacao=False):
+    wb = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilhas = [wb.worksheets[sheet_name] if isinstance(sheet_name, int) else wb[sheet_name]]
+        if continuacao:
+            planilhas += [wb[nome] for nome in abas_continuacao(planilhas[0].title, wb.sheetnames)]
+
+        for ws in planilhas:
+            linhas = ws.iter_rows(values_only=True)
+
+            cabecalho = next(linhas, None)
+            if cabecalho is None:
+                continue
+            # Remove colunas sem cabeçalho à direita, como o read_excel faz
+            while cabecalho and cabecalho[-1] is None:
+                cabecalho = cabecalho[:-1]
+            colunas = list(cabecalho)
+            n_colunas = len(colunas)
+
+            bloco = []
+            for linha in linhas:
+                linha = linha[:n_colunas]
+                if all(valor is None for valor in linha):
+                    continue
+                bloco.append(linha)
+                if len(bloco) >= tamanho_bloco:
+                    yield _tipar_bloco(pd.DataFrame(bloco, columns=colunas), tipos or {})
+                    bloco = []
+
+            if bloco:
+                yield _tipar_bloco(pd.DataFrame(bloco, columns=colunas), tipos or {})
+    finally:
+        wb.close()
+
+
+_carregador_padrao = CarregadorPlanilhas()
+
+
+def carregar_planilha(caminho, sheet_name=0):
+    return _carregador_padrao.carregar(caminho, sheet_name=sheet_name)
+
+
+def carregar_planilha_continua(caminho, sheet_name):
+    # Aba dividida pelo limite de linhas do Excel volta a ser um único quadro
+    partes = [carregar_planilha(caminho, sheet_name=sheet_name)]
+    for nome in abas_continuacao(sheet_name, _carregador_padrao.abas(caminho)):
+        partes.append(carregar_planilha(caminho, sheet_name=nome))
+    return partes[0] if len(partes) == 1 else pd.concat(partes, ignore_index=True)
+
+
+def carregar_produtos():
+    return carregar_planilha(ARQUIVO_PRODUTOS, sheet_name='Cadastro_Produtos')
+
+
+def carregar_estoque():
+    return carregar_planilha(ARQUIVO_ESTOQUE, sheet_name='Posicao_Estoque')
+
+
+def carregar_vendas():
+    return carregar_planilha_continua(ARQUIVO_VENDAS, ABA_VENDAS)
+
+
+def listar_arquivos_vendas(origem):
+    # Arquivo, diretório (todas as .xlsx) ou padrão glob; a ordem alfabética decide quem vence nas duplicatas
+    if os.path.isdir(origem):
+        arquivos = glob.glob(os.path.join(origem, '*.xlsx'))
+    elif glob.has_magic(origem):
+        arquivos = glob.glob(origem)
+    else:
+        arquivos = [origem] if os.path.exists(origem) else []
+
+    # ~$arquivo.xlsx é a trava do Excel aberto, não uma planilha
+    arquivos = sorted(a for a in arquivos if not os.path.basename(a).startswith('~$'))
+    if not arquivos:
+        raise FileNotFoundError(f"Nenhuma planilha de vendas encontrada em {origem}")
+    return arquivos
+
+
+def verificar_esquema_vendas(df, caminho):
+    faltando = [coluna for coluna in COLUNAS_VENDAS if coluna not in df.columns]
+    if faltando:
+        raise ValueError(f"{caminho}: aba {ABA_VENDAS} sem as colunas {', '.join(faltando)}")
+
+
+def _carregar_arquivo_vendas(caminho):
+    # Executada nos processos filhos: cada um lê, confere e devolve uma planilha
+    inicio = time.perf_counter()
+    df = carregar_planilha_continua(caminho, ABA_VENDAS)
+    verificar_esquema_vendas(df, caminho)
+    return df[list(COLUNAS_VENDAS)], time.perf_counter() - inicio
+
+
+def carregar_vendas_multiplas(origem, max_workers=None):
+    # Uma planilha por processo: o tempo total fica perto do da planilha mais lenta
+    arquivos = listar_arquivos_vendas(origem)
+    inicio = time.perf_counter()
+    if len(arquivos) == 1 or max_workers == 1:
+        resultados = [_carregar_arquivo_vendas(caminho) for caminho in arquivos]
+    else:
+        with ProcessPoolExecutor(max_workers=min(max_workers or os.cpu_count() or 1, len(arquivos))) as executor:
+            resultados = list(executor.map(_carregar_arquivo_vendas, arquivos))
+    total = time.perf_counter() - inicio
+
+    linhas = [len(df) for df, _ in resultados]
+    vendas = pd.concat([df for df, _ in resultados], ignore_index=True)
+
+    # Primeira ocorrência de cada ID Venda vence (tabela hash); vendas sem ID não são comparadas
+    ids = vendas['ID Venda']
+    duplicadas = (ids.duplicated() & ids.notna()).to_numpy()
+    arquivo_da_linha = np.repeat(np.arange(len(arquivos)), linhas)
+    if duplicadas.any():
+        vendas = vendas.take(np.flatnonzero(~duplicadas)).reset_index(drop=True)
+
+    relatorio = pd.DataFrame({
+        'Arquivo': arquivos,
+        'Linhas': linhas,
+        'Duplicadas': np.bincount(arquivo_da_linha[duplicadas], minlength=len(arquivos)),
+        'Segundos': [round(segundos, 3) for _, segundos in resultados]
+    })
+    relatorio.attrs['segundos_total'] = round(total, 3)
+    return vendas, relatorio
+
+
+def carregar_vendas_em_blocos(tamanho_bloco=TAMANHO_BLOCO_PADRAO, arquivos=None):
+    if arquivos is None:
+        return ler_planilha_em_blocos(ARQUIVO_VENDAS, sheet_name=ABA_VENDAS,
+                                      tamanho_bloco=tamanho_bloco, tipos=TIPOS_VENDAS, continuacao=True)
+    return _blocos_sem_duplicatas(arquivos, tamanho_bloco)
+
+
+def _blocos_sem_duplicatas(arquivos, tamanho_bloco):
+    # Vários arquivos em sequência; o conjunto de IDs já vistos descarta duplicatas entre blocos e arquivos
+    vistos = set()
+    for caminho in arquivos:
+        for bloco in ler_planilha_em_blocos(caminho, sheet_name=ABA_VENDAS,
+                                            tamanho_bloco=tamanho_bloco, tipos=TIPOS_VENDAS, continuacao=True):
+            verificar_esquema_vendas(bloco, caminho)
+            ids = bloco['ID Venda']
+            novas = (~(ids.isin(vistos) | ids.duplicated()) | ids.isna()).to_numpy()
+            vistos.update(ids[novas].dropna().tolist())
+            if novas.any():
+                yield bloco.take(np.flatnonzero(novas))[list(COLUNAS_VENDAS)]
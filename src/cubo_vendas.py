@@ -0,0 +1,141 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Cubo de agregação das vendas
+Um único groupby no grão mais fino; todas as visões de KPI são roll-ups do cubo
+"""
+
+import pandas as pd
+import numpy as np
+
+DIMENSOES_CUBO = ['Filial', 'Categoria', 'Cód. Produto', 'Produto', 'Ano', 'Mes']
+
+MEDIDAS_CUBO = ['Valor Total', 'Qtd', 'Desconto', 'Lucro_Venda']
+
+# Valores em reais são somados em centavos inteiros: soma exata e independente da ordem
+MEDIDAS_MONETARIAS = ['Valor Total', 'Desconto', 'Lucro_Venda']
+
+AGREGACOES_SUPORTADAS = ('sum', 'count', 'mean', 'min', 'max')
+
+
+class CuboVendas:
+
+    def __init__(self, celulas, medidas):
+        self.celulas = celulas
+        self.medidas = medidas
+
+    @classmethod
+    def construir(cls, df_vendas):
+        base = pd.DataFrame(index=df_vendas.index)
+
+        for dim in DIMENSOES_CUBO:
+            if dim in df_vendas.columns:
+                base[dim] = df_vendas[dim]
+            elif dim in ('Ano', 'Mes'):
+                datas = df_vendas['Data']
+                base[dim] = datas.dt.year if dim == 'Ano' else datas.dt.month
+            else:
+                raise ValueError(f"Coluna obrigatória ausente para o cubo: {dim}")
+
+        medidas = [m for m in MEDIDAS_CUBO if m in df_vendas.columns]
+        agregacoes = {}
+        for medida in medidas:
+            valores = df_vendas[medida]
+            if medida in MEDIDAS_MONETARIAS:
+                base[f'{medida}|sum'] = np.rint(valores.fillna(0) * 100).astype('int64')
+            else:
+                base[f'{medida}|sum'] = valores.fillna(0)
+            base[f'{medida}|count'] = valores.notna().astype('int64')
+            base[f'{medida}|min'] = valores
+            base[f'{medida}|max'] = valores
+            agregacoes.update({f'{medida}|sum': 'sum', f'{medida}|count': 'sum',
+                               f'{medida}|min': 'min', f'{medida}|max': 'max'})
+
+        base['ID Venda|count'] = df_vendas['ID Venda'].notna().astype('int64')
+        agregacoes['ID Venda|count'] = 'sum'
+
+        celulas = base.groupby(DIMENSOES_CUBO, dropna=False, observed=True).agg(agregacoes)
+
+        return cls(celulas, medidas)
+
+    def _resolver(self, celulas, coluna, agregacao):
+        if agregacao not in AGREGACOES_SUPORTADAS:
+            raise ValueError(f"Agregação não suportada pelo cubo: {agregacao}")
+
+        if coluna == 'ID Venda':
+            if agregacao != 'count':
+                raise ValueError("ID Venda suporta apenas 'count'")
+            return celulas['ID Venda|count']
+
+        if coluna not in self.medidas:
+            raise ValueError(f"Medida ausente no cubo: {coluna}")
+
+        soma = celulas[f'{coluna}|sum']
+        if coluna in MEDIDAS_MONETARIAS:
+            soma = soma / 100
+
+        if agregacao == 'sum':
+            return soma
+        if agregacao == 'count':
+            return celulas[f'{coluna}|count']
+        if agregacao == 'mean':
+            return soma / celulas[f'{coluna}|count']
+        return celulas[f'{coluna}|{agregacao}']
+
+    @staticmethod
+    def _funcao_combinacao(coluna):
+        if coluna.endswith('|min'):
+            return 'min'
+        if coluna.endswith('|max'):
+            return 'max'
+        return 'sum'
+
+    @classmethod
+    def combinar(cls, *cubos):
+        cubos = [cubo for cubo in cubos if cubo is not None]
+        if not cubos:
+            raise ValueError("Nenhum cubo para combinar")
+        if len(cubos) == 1:
+            return cubos[0]
+
+        celulas = pd.concat([cubo.celulas for cubo in cubos])
+        funcoes = {coluna: cls._funcao_combinacao(coluna) for coluna in celulas.columns}
+        celulas = celulas.groupby(level=DIMENSOES_CUBO, dropna=False, observed=True).agg(funcoes)
+
+        medidas = [m for m in MEDIDAS_CUBO if any(m in cubo.medidas for cubo in cubos)]
+        return cls(celulas, medidas)
+
+    def agregar(self, dimensoes, especificacao):
+        if isinstance(dimensoes, str):
+            dimensoes = [dimensoes]
+
+        colunas_cubo = {}
+        for coluna in especificacao:
+            for sufixo in ('sum', 'count', 'min', 'max'):
+                nome = f'{coluna}|{sufixo}'
+                if nome in self.celulas.columns:
+                    colunas_cubo[nome] = self._funcao_combinacao(nome)
+
+        if dimensoes:
+            celulas = self.celulas.groupby(level=dimensoes, observed=True)[list(colunas_cubo)].agg(colunas_cubo)
+        else:
+            celulas = pd.DataFrame({
+                nome: [self.celulas[nome].agg(funcao)] for nome, funcao in colunas_cubo.items()
+            })
+
+        multinivel = any(not isinstance(agg, str) for agg in especificacao.values())
+        resultado = {}
+        for coluna, agregacoes in especificacao.items():
+            for agregacao in ([agregacoes] if isinstance(agregacoes, str) else agregacoes):
+                chave = (coluna, agregacao) if multinivel else coluna
+                resultado[chave] = self._resolver(celulas, coluna, agregacao)
+
+        return pd.DataFrame(resultado, index=celulas.index)
+
+    def filtrar(self, dimensao, valores):
+        if not isinstance(valores, (list, tuple, set)):
+            valores = [valores]
+        niveis = self.celulas.index.get_level_values(dimensao)
+        return CuboVendas(self.celulas[niveis.isin(valores)], self.medidas)
+
+    def totais(self, especificacao):
+        return self.agregar([], especificacao).iloc[0]
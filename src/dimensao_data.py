@@ -0,0 +1,96 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Dimensão de datas
+Atributos de calendário calculados uma vez por data distinta e ligados às vendas por chave inteira
+"""
+
+import pandas as pd
+import numpy as np
+
+MESES_PT = {
+    1: 'Janeiro', 2: 'Fevereiro', 3: 'Março', 4: 'Abril',
+    5: 'Maio', 6: 'Junho', 7: 'Julho', 8: 'Agosto',
+    9: 'Setembro', 10: 'Outubro', 11: 'Novembro', 12: 'Dezembro'
+}
+
+DIAS_SEMANA_PT = {
+    0: 'Segunda-feira', 1: 'Terça-feira', 2: 'Quarta-feira', 3: 'Quinta-feira',
+    4: 'Sexta-feira', 5: 'Sábado', 6: 'Domingo'
+}
+
+# Colunas de calendário que o ETL grava em cada venda; Nome_Dia segue em inglês (day_name), como sempre
+# foi gravado no dataset processado. O nome em português é Nome_Dia_PT (usado pela análise de vendas)
+ATRIBUTOS_VENDAS = {
+    'Ano': 'Ano',
+    'Mes': 'Mes',
+    'Trimestre': 'Trimestre',
+    'Dia_Semana': 'Dia_Semana',
+    'Nome_Dia': 'Nome_Dia',
+    'Semana_Ano': 'Semana_Ano'
+}
+
+
+def chave_data(datas):
+    datas = pd.DatetimeIndex(datas)
+    return (datas.year * 10000 + datas.month * 100 + datas.day).astype('int32')
+
+
+class DimensaoData:
+
+    def __init__(self, mes_inicio_fiscal=1):
+        if not 1 <= mes_inicio_fiscal <= 12:
+            raise ValueError("mes_inicio_fiscal deve estar entre 1 e 12")
+        self.mes_inicio_fiscal = mes_inicio_fiscal
+
+    def construir(self, datas):
+        datas = pd.DatetimeIndex(pd.unique(pd.DatetimeIndex(datas).dropna())).sort_values()
+
+        dim = pd.DataFrame({
+            'Data_Key': chave_data(datas),
+            'Data': datas,
+            'Ano': datas.year,
+            'Mes': datas.month,
+            'Trimestre': datas.quarter,
+            'Dia': datas.day,
+            'Dia_Semana': datas.dayofweek,
+            'Nome_Dia': datas.day_name(),
+            'Semana_Ano': datas.isocalendar().week.to_numpy(),
+        })
+        dim['Semana_Ano'] = dim['Semana_Ano'].astype('UInt32')
+        dim['Nome_Mes'] = dim['Mes'].map(MESES_PT)
+        dim['Nome_Dia_PT'] = dim['Dia_Semana'].map(DIAS_SEMANA_PT)
+        dim['Fim_Semana'] = dim['Dia_Semana'] >= 5
+
+        # Ano fiscal nomeado pelo ano civil em que termina
+        deslocamento = (dim['Mes'] - self.mes_inicio_fiscal) % 12
+        dim['Mes_Fiscal'] = deslocamento + 1
+        dim['Trimestre_Fiscal'] = deslocamento // 3 + 1
+        dim['Ano_Fiscal'] = dim['Ano'] + np.where(
+            (self.mes_inicio_fiscal > 1) & (dim['Mes'] >= self.mes_inicio_fiscal), 1, 0
+        )
+
+        dim.index = pd.Index(dim['Data_Key'].to_numpy())
+        return dim
+
+    def anexar(self, df, coluna_data='Data', atributos=None):
+        # Altera df no lugar (sem copiar milhões de linhas) e o devolve junto com a dimensão;
+        # quem precisar preservar o quadro original passa uma cópia
+        if atributos is None:
+            atributos = ATRIBUTOS_VENDAS
+
+        codigos, unicos = pd.factorize(df[coluna_data])
+        if (codigos < 0).any():
+            raise ValueError(f"Coluna '{coluna_data}' contém datas nulas")
+        dim = self.construir(unicos)
+
+        # Posição de cada data distinta na dimensão (ordenada por data)
+        posicoes = dim.index.get_indexer(chave_data(unicos))
+        linhas = posicoes[codigos]
+
+        df['Data_Key'] = dim['Data_Key'].to_numpy()[linhas]
+        for destino, origem in atributos.items():
+            valores = dim[origem].take(linhas)
+            valores.index = df.index
+            df[destino] = valores
+
+        return df, dim
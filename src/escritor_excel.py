@@ -0,0 +1,124 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Escrita de planilhas Excel em modo streaming
+Usa o modo write-only do openpyxl: as linhas vão para o disco à medida que são geradas
+"""
+
+import pandas as pd
+from openpyxl import Workbook
+
+LIMITE_LINHAS_EXCEL = 1048576
+LIMITE_NOME_ABA = 31
+TAMANHO_LOTE_ESCRITA = 10000
+
+
+def precisa_streaming(*dfs):
+    return any(len(df) >= LIMITE_LINHAS_EXCEL for df in dfs)
+
+
+def nome_continuacao(nome, numero):
+    if numero == 1:
+        return nome[:LIMITE_NOME_ABA]
+    sufixo = f'_{numero}'
+    return nome[:LIMITE_NOME_ABA - len(sufixo)] + sufixo
+
+
+def _achatar(df, index):
+    if index:
+        df = df.reset_index()
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy(deep=False)
+        df.columns = ['_'.join(str(parte) for parte in col if str(parte) != '') for col in df.columns]
+    return df
+
+
+def _valores_lote(lote):
+    colunas = []
+    for _, serie in lote.items():
+        if isinstance(serie.dtype, pd.PeriodDtype):
+            serie = serie.astype(str)
+        valores = serie.astype(object)
+        colunas.append(valores.where(serie.notna(), None).tolist())
+    return zip(*colunas)
+
+
+class EscritorExcelStreaming:
+
+    def __init__(self, caminho, limite_linhas=LIMITE_LINHAS_EXCEL):
+        self.caminho = caminho
+        self.limite_linhas = limite_linhas
+        self.abas_escritas = {}
+        self._wb = Workbook(write_only=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traceback):
+        if tipo is None:
+            self.salvar()
+        return False
+
+    def escrever_aba(self, nome, df, index=False):
+        return self.escrever_blocos(nome, [df], index=index)
+
+    def escrever_blocos(self, nome, blocos, index=False, colunas=None):
+        # Blocos com as mesmas colunas gravados em sequência, sem concatená-los em memória;
+        # colunas: cabeçalho usado se nenhum bloco chegar
+        linhas_por_aba = self.limite_linhas - 1
+        cabecalho = None if colunas is None else [str(col) for col in colunas]
+
+        nomes = []
+        ws = None
+        livres = 0
+        for df in blocos:
+            df = _achatar(df, index)
+            cabecalho = [str(col) for col in df.columns]
+
+            inicio = 0
+            while inicio < len(df):
+                if livres == 0:
+                    ws = self._criar_aba(nome, len(nomes) + 1, cabecalho)
+                    nomes.append(ws.title)
+                    livres = linhas_por_aba
+
+                fim = min(inicio + livres, len(df))
+                for lote_inicio in range(inicio, fim, TAMANHO_LOTE_ESCRITA):
+                    lote = df.iloc[lote_inicio:min(lote_inicio + TAMANHO_LOTE_ESCRITA, fim)]
+                    for linha in _valores_lote(lote):
+                        ws.append(linha)
+
+                livres -= fim - inicio
+                inicio = fim
+
+        # Uma aba vazia ainda recebe o cabeçalho
+        if not nomes:
+            nomes.append(self._criar_aba(nome, 1, cabecalho or []).title)
+
+        self.abas_escritas[nome] = nomes
+        return nomes
+
+    def _criar_aba(self, nome, numero, cabecalho):
+        ws = self._wb.create_sheet(title=nome_continuacao(nome, numero))
+        ws.append(cabecalho)
+        return ws
+
+    def salvar(self):
+        self._wb.save(self.caminho)
+        return self.caminho
+
+
+def gravar_abas(caminho, abas, streaming=False):
+    # abas: lista de (nome, DataFrame) ou (nome, DataFrame, index)
+    abas = [aba if len(aba) == 3 else (aba[0], aba[1], False) for aba in abas]
+
+    if streaming or precisa_streaming(*[df for _, df, _ in abas]):
+        with EscritorExcelStreaming(caminho) as escritor:
+            for nome, df, index in abas:
+                escritor.escrever_aba(nome, df, index=index)
+        return caminho
+
+    with pd.ExcelWriter(caminho, engine='openpyxl') as writer:
+        for nome, df, index in abas:
+            df.to_excel(writer, sheet_name=nome, index=index)
+
+    return caminho
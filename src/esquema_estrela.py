@@ -0,0 +1,171 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Esquema estrela com chaves substitutas inteiras
+Dimensões de produto, filial e data com chaves int32 densas atribuídas na carga; os fatos guardam só as chaves
+"""
+
+import pandas as pd
+import numpy as np
+
+from dimensao_data import DimensaoData, ATRIBUTOS_VENDAS
+
+CHAVE_PRODUTO = 'Produto_SK'
+CHAVE_FILIAL = 'Filial_SK'
+CHAVE_DATA = 'Data_SK'
+
+# Valor natural sem correspondência na dimensão (equivale à linha sem par num left join)
+SEM_CHAVE = -1
+
+COLUNAS_ENRIQUECIMENTO = ['Custo Aquisição', 'Margem_Real', 'Fornecedor']
+
+# Atributos descritivos que saem do fato de vendas e passam a ser lidos das dimensões
+DESCRITIVAS_VENDAS = ['Data', 'Data_Key', 'Filial', 'Cód. Produto', 'Produto', 'Categoria'] + list(ATRIBUTOS_VENDAS)
+DESCRITIVAS_ESTOQUE = ['Código Produto', 'Produto', 'Filial']
+
+
+def atribuir_chaves(valores, chaves_naturais):
+    # Hash só sobre os valores distintos; cada linha recebe a posição da sua chave natural na dimensão
+    dimensao = pd.Index(chaves_naturais)
+    if not dimensao.is_unique:
+        raise ValueError("Chave natural duplicada na dimensão")
+
+    if isinstance(valores.dtype, pd.CategoricalDtype):
+        codigos, unicos = valores.cat.codes.to_numpy(), valores.cat.categories
+    else:
+        codigos, unicos = pd.factorize(np.asarray(valores))
+
+    posicoes = dimensao.get_indexer(unicos)
+    chaves = np.full(len(codigos), SEM_CHAVE, dtype='int32')
+    validos = codigos >= 0
+    chaves[validos] = posicoes[codigos[validos]]
+    return chaves
+
+
+def buscar(coluna, chaves):
+    # Leitura posicional: chave substituta = posição na dimensão; SEM_CHAVE vira nulo
+    return pd.api.extensions.take(np.asarray(coluna), chaves, allow_fill=True)
+
+
+def enriquecer_com_produtos(vendas, produtos, chaves):
+    enriquecidas = vendas.reset_index(drop=True)
+    for coluna in COLUNAS_ENRIQUECIMENTO:
+        enriquecidas[coluna] = buscar(produtos[coluna], chaves)
+
+    enriquecidas['Lucro_Venda'] = (
+        enriquecidas['Valor Total'] - enriquecidas['Custo Aquisição'] * enriquecidas['Qtd']
+    ).round(2)
+
+    enriquecidas['Margem_Venda_%'] = (
+        (enriquecidas['Lucro_Venda'] / enriquecidas['Valor Total']) * 100
+    ).round(2)
+
+    return enriquecidas
+
+
+def _chaves_produto(df, coluna, dim_produto):
+    # Fato validado pelo ProcessadorDados já traz a chave de produto: não refaz o hash
+    if CHAVE_PRODUTO in df.columns:
+        return df[CHAVE_PRODUTO].to_numpy(dtype='int32')
+    return atribuir_chaves(df[coluna], dim_produto['Código'])
+
+
+def _com_chave(dimensao, nome_chave):
+    dimensao = dimensao.reset_index(drop=True)
+    dimensao.insert(0, nome_chave, np.arange(len(dimensao), dtype='int32'))
+    return dimensao
+
+
+class EsquemaEstrela:
+
+    def __init__(self, dim_produto, dim_filial, dim_data, fato_vendas, fato_estoque):
+        self.dim_produto = dim_produto
+        self.dim_filial = dim_filial
+        self.dim_data = dim_data
+        self.fato_vendas = fato_vendas
+        self.fato_estoque = fato_estoque
+
+    @classmethod
+    def construir(cls, produtos, estoque, vendas, calendario=None):
+        calendario = calendario or DimensaoData()
+
+        dim_produto = _com_chave(produtos, CHAVE_PRODUTO)
+        filiais = pd.unique(np.concatenate([np.asarray(vendas['Filial'], dtype=object),
+                                            np.asarray(estoque['Filial'], dtype=object)]))
+        filiais = np.sort(filiais[pd.notna(filiais)])
+        dim_filial = _com_chave(pd.DataFrame({
+            'Filial': filiais,
+            'Nome_Curto': [str(f).split(' - ')[0] for f in filiais]
+        }), CHAVE_FILIAL)
+        dim_data = _com_chave(calendario.construir(vendas['Data']), CHAVE_DATA)
+
+        chaves_vendas = {
+            CHAVE_DATA: atribuir_chaves(vendas['Data'], dim_data['Data']),
+            CHAVE_FILIAL: atribuir_chaves(vendas['Filial'], dim_filial['Filial']),
+            CHAVE_PRODUTO: _chaves_produto(vendas, 'Cód. Produto', dim_produto)
+        }
+        fato_vendas = vendas.drop(columns=[c for c in DESCRITIVAS_VENDAS + list(chaves_vendas) if c in vendas.columns])
+        fato_vendas = fato_vendas.reset_index(drop=True)
+        for posicao, (nome, chaves) in enumerate(chaves_vendas.items()):
+            fato_vendas.insert(1 + posicao, nome, chaves)
+
+        chaves_estoque = {
+            CHAVE_FILIAL: atribuir_chaves(estoque['Filial'], dim_filial['Filial']),
+            CHAVE_PRODUTO: _chaves_produto(estoque, 'Código Produto', dim_produto)
+        }
+        fato_estoque = estoque.drop(columns=[c for c in DESCRITIVAS_ESTOQUE + list(chaves_estoque) if c in estoque.columns])
+        fato_estoque = fato_estoque.reset_index(drop=True)
+        for posicao, (nome, chaves) in enumerate(chaves_estoque.items()):
+            fato_estoque.insert(posicao, nome, chaves)
+
+        return cls(dim_produto, dim_filial, dim_data, fato_vendas, fato_estoque)
+
+    def atributo(self, dimensao, coluna, chaves):
+        return buscar(getattr(self, f'dim_{dimensao}')[coluna], chaves)
+
+    def enriquecer_vendas(self):
+        return enriquecer_com_produtos(self.fato_vendas, self.dim_produto,
+                                       self.fato_vendas[CHAVE_PRODUTO].to_numpy())
+
+    def desnormalizar_vendas(self, atributos=None):
+        # Visão larga equivalente às vendas validadas, remontada por leitura posicional nas dimensões
+        if atributos is None:
+            atributos = {
+                'Data': ('data', 'Data', CHAVE_DATA),
+                'Data_Key': ('data', 'Data_Key', CHAVE_DATA),
+                'Filial': ('filial', 'Filial', CHAVE_FILIAL),
+                'Cód. Produto': ('produto', 'Código', CHAVE_PRODUTO),
+                'Produto': ('produto', 'Descrição', CHAVE_PRODUTO),
+                'Categoria': ('produto', 'Categoria', CHAVE_PRODUTO),
+                **{destino: ('data', origem, CHAVE_DATA) for destino, origem in ATRIBUTOS_VENDAS.items()}
+            }
+
+        vendas = self.fato_vendas.copy(deep=False)
+        for destino, (dimensao, coluna, chave) in atributos.items():
+            vendas[destino] = self.atributo(dimensao, coluna, vendas[chave].to_numpy())
+        return vendas
+
+    def estoque_desnormalizado(self):
+        estoque = self.fato_estoque.copy(deep=False)
+        chaves_produto = estoque[CHAVE_PRODUTO].to_numpy()
+        estoque['Código Produto'] = self.atributo('produto', 'Código', chaves_produto)
+        estoque['Produto'] = self.atributo('produto', 'Descrição', chaves_produto)
+        estoque['Filial'] = self.atributo('filial', 'Filial', estoque[CHAVE_FILIAL].to_numpy())
+        return estoque
+
+    def chaves_sem_correspondencia(self):
+        return {
+            'vendas': {chave: int((self.fato_vendas[chave] == SEM_CHAVE).sum())
+                       for chave in (CHAVE_DATA, CHAVE_FILIAL, CHAVE_PRODUTO)},
+            'estoque': {chave: int((self.fato_estoque[chave] == SEM_CHAVE).sum())
+                        for chave in (CHAVE_FILIAL, CHAVE_PRODUTO)}
+        }
+
+    def memoria(self):
+        tabelas = {
+            'dim_produto': self.dim_produto,
+            'dim_filial': self.dim_filial,
+            'dim_data': self.dim_data,
+            'fato_vendas': self.fato_vendas,
+            'fato_estoque': self.fato_estoque
+        }
+        return {nome: int(df.memory_usage(index=True, deep=True).sum()) for nome, df in tabelas.items()}
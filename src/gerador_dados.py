@@ -0,0 +1,378 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Gerador de dados sintéticos
+Produz planilhas com o mesmo esquema das originais (abas, colunas e formatos) em qualquer escala
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+import os
+from carregador_dados import ARQUIVO_PRODUTOS, ARQUIVO_ESTOQUE, ARQUIVO_VENDAS, TAMANHO_BLOCO_PADRAO
+from escritor_excel import EscritorExcelStreaming, LIMITE_LINHAS_EXCEL
+
+FORMATOS = ('xlsx', 'csv', 'parquet')
+
+# Participação de cada filial e seus vendedores (proporções observadas em jan-jun/2024)
+FILIAIS = {
+    'Centro - SP': (0.334, ['Carlos Silva', 'Ana Paula Santos', 'Roberto Lima', 'Juliana Costa']),
+    'Sul - Porto Alegre': (0.259, ['Patricia Rocha', 'Fernanda Alves', 'Ricardo Martins']),
+    'Norte - Manaus': (0.256, ['Maria Souza', 'João Ferreira', 'Pedro Oliveira']),
+    'Leste - Rio de Janeiro': (0.151, ['Bruno Cardoso', 'Lucas Pereira', 'Camila Dias'])
+}
+
+# prefixo, participação nas vendas, faixa de preço, faixa de margem, faixa de estoque mínimo, modelos
+CATEGORIAS = {
+    'Periféricos': ('PR', 0.355, (199.9, 699.9), (0.28, 0.36), (35, 50),
+                    [('Mouse Logitech', 'Logitech'), ('Teclado Mecânico Redragon', 'Redragon'),
+                     ('Headset Gamer HyperX', 'HyperX Gaming'), ('Mouse Gamer Razer', 'Razer Inc')]),
+    'Notebooks': ('NB', 0.220, (3299.0, 6999.0), (0.18, 0.22), (15, 25),
+                  [('Notebook Dell Inspiron', 'Dell Computadores do Brasil'),
+                   ('Notebook Lenovo ThinkPad', 'Lenovo Brasil'), ('Notebook Acer Aspire', 'Acer Brasil')]),
+    'Acessórios': ('AC', 0.178, (59.9, 499.9), (0.28, 0.40), (28, 100),
+                   [('Webcam Logitech', 'Logitech'), ('Hub USB-C Anker', 'Anker'),
+                    ('Mousepad Gamer', 'Genérico'), ('Webcam Microsoft', 'Microsoft')]),
+    'Monitores': ('MN', 0.119, (899.0, 2499.0), (0.20, 0.23), (18, 20),
+                  [('Monitor LG', 'LG do Brasil'), ('Monitor Samsung', 'Samsung Brasil')]),
+    'Componentes': ('CP', 0.076, (299.9, 1299.9), (0.28, 0.32), (25, 35),
+                    [('SSD Kingston', 'Kingston Technology'), ('Memória Corsair', 'Corsair')]),
+    'Mobiliário': ('MB', 0.052, (899.0, 2299.0), (0.28, 0.32), (10, 15),
+                   [('Cadeira Gamer DT3', 'DT3 Sports'), ('Mesa Gamer ThunderX3', 'ThunderX3')])
+}
+
+FORMAS_PAGAMENTO = {
+    'Cartão de Crédito': 0.369,
+    'Cartão de Débito': 0.286,
+    'PIX': 0.228,
+    'Boleto': 0.073,
+    'Dinheiro': 0.044
+}
+
+OBSERVACOES = ['Entrega agendada', 'Cliente solicitou NF', 'Produto com garantia estendida']
+
+DISTRIBUICAO_QTD = {1: 0.556, 2: 0.283, 3: 0.091, 4: 0.049, 5: 0.021}
+DISTRIBUICAO_DESCONTO = {0.0: 0.744, 0.05: 0.058, 0.10: 0.067, 0.15: 0.066, 0.20: 0.065}
+
+COLUNAS_VENDAS = ['ID Venda', 'Data', 'Hora', 'Filial', 'Vendedor', 'Cód. Produto', 'Produto',
+                  'Categoria', 'Qtd', 'Preço Unit.', 'Subtotal', 'Desconto', 'Valor Total',
+                  'Forma Pagamento', 'CPF Cliente', 'Observações']
+
+PROPORCAO_SEM_CPF = 0.165
+PROPORCAO_COM_OBSERVACAO = 0.077
+
+
+def _probabilidades(pesos):
+    pesos = np.asarray(pesos, dtype='float64')
+    return pesos / pesos.sum()
+
+
+class GeradorDadosSinteticos:
+
+    def __init__(self, num_vendas=1800, num_produtos=15, data_inicio='2024-01-01',
+                 data_fim='2024-06-30', semente=42):
+        if num_vendas < 0:
+            raise ValueError("num_vendas não pode ser negativo")
+        if num_produtos < len(CATEGORIAS):
+            raise ValueError(f"num_produtos deve ser pelo menos {len(CATEGORIAS)} (uma por categoria)")
+
+        self.num_vendas = num_vendas
+        self.num_produtos = num_produtos
+        self.datas = pd.date_range(data_inicio, data_fim, freq='D')
+        if len(self.datas) == 0:
+            raise ValueError("Período de vendas vazio")
+        self.semente = semente
+
+    def gerar_produtos(self):
+        rng = np.random.default_rng([self.semente, 1])
+        nomes_categorias = list(CATEGORIAS)
+
+        # Uma por categoria garantida; as demais sorteadas pela participação nas vendas
+        pesos_categorias = _probabilidades([CATEGORIAS[c][1] for c in nomes_categorias])
+        extras = rng.choice(len(nomes_categorias), size=self.num_produtos - len(nomes_categorias),
+                            p=pesos_categorias)
+        indices = np.sort(np.concatenate([np.arange(len(nomes_categorias)), extras]))
+
+        registros = []
+        sequencia = {}
+        for indice in indices:
+            categoria = nomes_categorias[indice]
+            prefixo, _, faixa_preco, faixa_margem, faixa_minimo, modelos = CATEGORIAS[categoria]
+            numero = sequencia.get(prefixo, 0) + 1
+            sequencia[prefixo] = numero
+
+            modelo, fornecedor = modelos[(numero - 1) % len(modelos)]
+            # Preços "quebrados" (R$ 349,90) sorteados em escala logarítmica dentro da faixa
+            preco = round(float(np.exp(rng.uniform(*np.log(faixa_preco))))) - 0.1
+            margem = rng.uniform(*faixa_margem)
+
+            registros.append({
+                'Código': f'{prefixo}-{numero:03d}',
+                'Descrição': f'{modelo} Série {numero}',
+                'Categoria': categoria,
+                'Preço Venda': round(preco, 1),
+                'Custo Aquisição': round(preco * (1 - margem), 1),
+                'Fornecedor': fornecedor,
+                'Estoque Mínimo': int(rng.integers(faixa_minimo[0], faixa_minimo[1] + 1)),
+                'Status': 'Ativo'
+            })
+
+        return pd.DataFrame(registros)
+
+    def gerar_estoque(self, produtos):
+        rng = np.random.default_rng([self.semente, 2])
+        filiais = list(FILIAIS)
+        n = len(produtos) * len(filiais)
+
+        por_produto = np.repeat(np.arange(len(produtos)), len(filiais))
+        minimos = produtos['Estoque Mínimo'].to_numpy()[por_produto]
+
+        # Cobertura entre 0,2 e 3,8 vezes o mínimo, como no estoque real
+        quantidades = np.round(minimos * rng.uniform(0.2, 3.8, size=n)).astype('int64')
+        entradas = pd.Timestamp(self.datas[-1]) + pd.to_timedelta(rng.integers(60, 120, size=n), unit='D')
+
+        estoque = pd.DataFrame({
+            'Código Produto': produtos['Código'].to_numpy()[por_produto],
+            'Produto': produtos['Descrição'].to_numpy()[por_produto],
+            'Filial': np.tile(np.array(filiais, dtype=object), len(produtos)),
+            'Quantidade Disponível': quantidades,
+            'Estoque Mínimo': minimos,
+            'Última Entrada': entradas.strftime('%d/%m/%Y').to_numpy(dtype=object),
+            'Lote': np.char.add('LOTE-', rng.integers(1000, 10000, size=n).astype(str)).astype(object),
+            'Localização': np.char.add(
+                np.char.add('Corredor ', rng.integers(1, 9, size=n).astype(str)),
+                np.char.add('-Prateleira ', rng.integers(1, 16, size=n).astype(str))
+            ).astype(object)
+        })
+
+        # Alguns registros sem data de entrada e lote (~3%)
+        sem_entrada = rng.random(n) < 0.03
+        estoque.loc[sem_entrada, ['Última Entrada', 'Lote']] = np.nan
+
+        return estoque
+
+    def _pesos_produtos(self, produtos, rng):
+        # Dentro de cada categoria a popularidade segue uma lei de Zipf
+        pesos = np.zeros(len(produtos))
+        for categoria, indices in produtos.groupby('Categoria').indices.items():
+            ranking = rng.permutation(len(indices)) + 1
+            zipf = 1.0 / ranking
+            pesos[indices] = CATEGORIAS[categoria][1] * zipf / zipf.sum()
+        return _probabilidades(pesos)
+
+    def gerar_vendas_em_blocos(self, produtos, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+        rng = np.random.default_rng([self.semente, 3])
+
+        nomes_filiais = list(FILIAIS)
+        pesos_filiais = _probabilidades([FILIAIS[f][0] for f in nomes_filiais])
+        vendedores = np.array([v for f in nomes_filiais for v in FILIAIS[f][1]], dtype=object)
+        qtd_vendedores = np.array([len(FILIAIS[f][1]) for f in nomes_filiais])
+        inicio_vendedores = np.concatenate([[0], np.cumsum(qtd_vendedores)[:-1]])
+
+        pesos_produtos = self._pesos_produtos(produtos, rng)
+        codigos = produtos['Código'].to_numpy(dtype=object)
+        descricoes = produtos['Descrição'].to_numpy(dtype=object)
+        categorias = produtos['Categoria'].to_numpy(dtype=object)
+        precos = produtos['Preço Venda'].to_numpy(dtype='float64')
+
+        formas = np.array(list(FORMAS_PAGAMENTO), dtype=object)
+        pesos_formas = _probabilidades(list(FORMAS_PAGAMENTO.values()))
+        quantidades = np.array(list(DISTRIBUICAO_QTD), dtype='int64')
+        pesos_qtd = _probabilidades(list(DISTRIBUICAO_QTD.values()))
+        descontos = np.array(list(DISTRIBUICAO_DESCONTO), dtype='float64')
+        pesos_desconto = _probabilidades(list(DISTRIBUICAO_DESCONTO.values()))
+        observacoes = np.array(OBSERVACOES + [np.nan], dtype=object)
+
+        # Textos de data e hora formatados uma vez por valor distinto
+        textos_data = self.datas.strftime('%d/%m/%Y').to_numpy(dtype=object)
+        minutos = np.arange(8 * 60, 21 * 60)
+        textos_hora = np.array([f'{m // 60:02d}:{m % 60:02d}' for m in minutos], dtype=object)
+
+        proximo_id = 1001
+        restantes = self.num_vendas
+        while restantes > 0:
+            n = min(tamanho_bloco, restantes)
+
+            filial = rng.choice(len(nomes_filiais), size=n, p=pesos_filiais)
+            vendedor = inicio_vendedores[filial] + (rng.random(n) * qtd_vendedores[filial]).astype('int64')
+            produto = rng.choice(len(produtos), size=n, p=pesos_produtos)
+            qtd = rng.choice(quantidades, size=n, p=pesos_qtd)
+
+            preco = precos[produto]
+            subtotal = np.round(qtd * preco, 2)
+            desconto = np.round(subtotal * rng.choice(descontos, size=n, p=pesos_desconto), 2)
+
+            cpf = rng.integers(10 ** 10, 10 ** 11, size=n).astype('float64')
+            cpf[rng.random(n) < PROPORCAO_SEM_CPF] = np.nan
+
+            observacao = np.full(n, len(OBSERVACOES))
+            com_observacao = rng.random(n) < PROPORCAO_COM_OBSERVACAO
+            observacao[com_observacao] = rng.integers(0, len(OBSERVACOES), size=int(com_observacao.sum()))
+
+            yield pd.DataFrame({
+                'ID Venda': np.arange(proximo_id, proximo_id + n, dtype='int64'),
+                'Data': textos_data[rng.integers(0, len(textos_data), size=n)],
+                'Hora': textos_hora[rng.integers(0, len(textos_hora), size=n)],
+                'Filial': np.array(nomes_filiais, dtype=object)[filial],
+                'Vendedor': vendedores[vendedor],
+                'Cód. Produto': codigos[produto],
+                'Produto': descricoes[produto],
+                'Categoria': categorias[produto],
+                'Qtd': qtd,
+                'Preço Unit.': preco,
+                'Subtotal': subtotal,
+                'Desconto': desconto,
+                'Valor Total': np.round(subtotal - desconto, 2),
+                'Forma Pagamento': formas[rng.choice(len(formas), size=n, p=pesos_formas)],
+                'CPF Cliente': cpf,
+                'Observações': observacoes[observacao]
+            })
+
+            proximo_id += n
+            restantes -= n
+
+    def gerar_vendas(self, produtos, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+        blocos = list(self.gerar_vendas_em_blocos(produtos, tamanho_bloco))
+        if not blocos:
+            return pd.DataFrame(columns=COLUNAS_VENDAS)
+        return pd.concat(blocos, ignore_index=True)
+
+    @staticmethod
+    def totais_mensais(vendas):
+        mes = vendas['Data'].str[6:10] + '-' + vendas['Data'].str[3:5]
+        return vendas.groupby(mes).agg(**{
+            'Qtd Vendas': ('ID Venda', 'count'),
+            'Faturamento': ('Valor Total', 'sum')
+        })
+
+    @staticmethod
+    def finalizar_resumo(totais):
+        resumo = totais.round(2)
+        resumo.index.name = 'Mês'
+        return resumo.reset_index()
+
+    @classmethod
+    def resumo_mensal(cls, vendas):
+        return cls.finalizar_resumo(cls.totais_mensais(vendas))
+
+    def gerar(self):
+        produtos = self.gerar_produtos()
+        return {
+            'produtos': produtos,
+            'estoque': self.gerar_estoque(produtos),
+            'vendas': self.gerar_vendas(produtos)
+        }
+
+    def salvar(self, diretorio, formato='xlsx', tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato inválido: {formato}. Use um de {FORMATOS}")
+        os.makedirs(diretorio, exist_ok=True)
+
+        produtos = self.gerar_produtos()
+        estoque = self.gerar_estoque(produtos)
+
+        if formato == 'xlsx':
+            return self._salvar_xlsx(diretorio, produtos, estoque, tamanho_bloco)
+
+        # Formatos colunares/texto: as vendas são gravadas bloco a bloco, com memória limitada
+        blocos = self.gerar_vendas_em_blocos(produtos, tamanho_bloco)
+        if formato == 'csv':
+            return self._salvar_csv(diretorio, produtos, estoque, blocos)
+        return self._salvar_parquet(diretorio, produtos, estoque, blocos)
+
+    def _salvar_xlsx(self, diretorio, produtos, estoque, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+        # Mesmos nomes de arquivo e de aba lidos pelo carregador_dados
+        caminhos = [os.path.join(diretorio, os.path.basename(arquivo))
+                    for arquivo in (ARQUIVO_PRODUTOS, ARQUIVO_ESTOQUE, ARQUIVO_VENDAS)]
+
+        with EscritorExcelStreaming(caminhos[0]) as escritor:
+            escritor.escrever_aba('Cadastro_Produtos', produtos)
+        with EscritorExcelStreaming(caminhos[1]) as escritor:
+            escritor.escrever_aba('Posicao_Estoque', estoque)
+
+        if self.num_vendas >= LIMITE_LINHAS_EXCEL:
+            print(f'Aviso: {self.num_vendas} vendas excedem o limite do Excel; '
+                  'as linhas excedentes vão para abas de continuação (Vendas_Completo_2, ...), '
+                  'que o carregador concatena ao ler')
+
+        # Cada bloco vai para a aba e deixa só seus totais por mês: as vendas nunca ficam todas em memória
+        totais = []
+
+        def blocos_com_totais():
+            for bloco in self.gerar_vendas_em_blocos(produtos, tamanho_bloco):
+                totais.append(self.totais_mensais(bloco))
+                yield bloco
+
+        with EscritorExcelStreaming(caminhos[2]) as escritor:
+            escritor.escrever_blocos('Vendas_Completo', blocos_com_totais(), colunas=COLUNAS_VENDAS)
+            if totais:
+                resumo = self.finalizar_resumo(pd.concat(totais).groupby(level=0).sum())
+            else:
+                resumo = self.resumo_mensal(pd.DataFrame(columns=COLUNAS_VENDAS))
+            escritor.escrever_aba('Resumo_Mensal', resumo)
+
+        return caminhos
+
+    def _salvar_csv(self, diretorio, produtos, estoque, blocos):
+        caminhos = [os.path.join(diretorio, nome) for nome in ('produtos.csv', 'estoque.csv', 'vendas.csv')]
+        produtos.to_csv(caminhos[0], index=False)
+        estoque.to_csv(caminhos[1], index=False)
+
+        pd.DataFrame(columns=COLUNAS_VENDAS).to_csv(caminhos[2], index=False)
+        for bloco in blocos:
+            bloco.to_csv(caminhos[2], mode='a', header=False, index=False)
+
+        return caminhos
+
+    def _salvar_parquet(self, diretorio, produtos, estoque, blocos):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("O formato parquet requer o pacote pyarrow (pip install pyarrow)")
+
+        caminhos = [os.path.join(diretorio, nome)
+                    for nome in ('produtos.parquet', 'estoque.parquet', 'vendas.parquet')]
+        produtos.to_parquet(caminhos[0], index=False)
+        estoque.to_parquet(caminhos[1], index=False)
+
+        escritor = None
+        try:
+            for bloco in blocos:
+                if escritor is None:
+                    # Esquema fixo: um bloco sem observações não pode mudar o tipo da coluna
+                    esquema = pa.Schema.from_pandas(bloco, preserve_index=False)
+                    esquema = esquema.set(esquema.get_field_index('Observações'),
+                                          pa.field('Observações', pa.string()))
+                    escritor = pq.ParquetWriter(caminhos[2], esquema)
+                escritor.write_table(pa.Table.from_pandas(bloco, schema=esquema, preserve_index=False))
+        finally:
+            if escritor is not None:
+                escritor.close()
+        if escritor is None:
+            pd.DataFrame(columns=COLUNAS_VENDAS).to_parquet(caminhos[2], index=False)
+
+        return caminhos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gerador de dados sintéticos de vendas e estoque')
+    parser.add_argument('--vendas', type=int, default=1800, help='número de vendas a gerar')
+    parser.add_argument('--produtos', type=int, default=15, help='número de produtos no cadastro')
+    parser.add_argument('--formato', choices=FORMATOS, default='xlsx',
+                        help='xlsx (mesmo layout das planilhas originais), csv ou parquet')
+    parser.add_argument('--destino', default='data/sintetico', help='diretório de saída')
+    parser.add_argument('--inicio', default='2024-01-01', help='primeira data das vendas (AAAA-MM-DD)')
+    parser.add_argument('--fim', default='2024-06-30', help='última data das vendas (AAAA-MM-DD)')
+    parser.add_argument('--semente', type=int, default=42, help='semente do gerador aleatório')
+    args = parser.parse_args()
+
+    gerador = GeradorDadosSinteticos(num_vendas=args.vendas, num_produtos=args.produtos,
+                                     data_inicio=args.inicio, data_fim=args.fim, semente=args.semente)
+
+    print(f'\nGerando {args.vendas} vendas e {args.produtos} produtos ({args.formato})...')
+    for caminho in gerador.salvar(args.destino, formato=args.formato):
+        print(f'Gerado: {caminho}')
+    print()
+
+if __name__ == '__main__':
+    main()
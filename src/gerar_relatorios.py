@@ -6,13 +6,33 @@ Módulo de geração de relatórios automatizados em Excel
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import argparse
+import copy
 import os
+import re
+import unicodedata
 import warnings
+from carregador_dados import carregar_produtos, carregar_estoque, carregar_vendas
+from analise_estoque import classificar_estoque
+from cubo_vendas import CuboVendas
+from cache_kpis import CacheKPIs, impressao_dataframe
+from escritor_excel import gravar_abas
+from instrumentacao import Instrumentador
 warnings.filterwarnings('ignore')
 
+
+def _slug_filial(filial):
+    texto = unicodedata.normalize('NFKD', str(filial)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', texto.lower()).strip('_')
+
+
 class GeradorRelatorios:
     
-    def __init__(self):
+    def __init__(self, excel_streaming=False, instrumentador=None, cache_kpis=None):
+        self.excel_streaming = excel_streaming
+        self.cache_kpis = cache_kpis
+        self.instrumentador = instrumentador or Instrumentador('report')
         self.data_processamento = datetime.now().strftime('%Y%m%d_%H%M%S')
         self.path_reports = 'reports'
         
@@ -20,15 +40,34 @@ class GeradorRelatorios:
             os.makedirs(self.path_reports)
     
     def carregar_dados(self):
-        self.df_produtos = pd.read_excel('data/produtos.xlsx')
-        self.df_estoque = pd.read_excel('data/estoque_filiais.xlsx')
-        self.df_vendas = pd.read_excel('data/vendas_jan_jun_2024.xlsx', sheet_name='Vendas_Completo')
+        df_vendas = carregar_vendas()
+        df_vendas['Data'] = pd.to_datetime(df_vendas['Data'], format='%d/%m/%Y')
+        df_vendas = df_vendas[df_vendas['Valor Total'] > 0]
         
-        self.df_vendas['Data'] = pd.to_datetime(self.df_vendas['Data'], format='%d/%m/%Y')
-        self.df_vendas = self.df_vendas[self.df_vendas['Valor Total'] > 0]
+        self.definir_dados(carregar_produtos(), carregar_estoque(), df_vendas)
+    
+    def definir_dados(self, df_produtos, df_estoque, df_vendas):
+        # Permite reaproveitar DataFrames já validados (ex.: ProcessadorDados)
+        self.df_produtos = df_produtos
+        self.df_estoque = df_estoque.copy()
+        self.df_vendas = df_vendas
+        self.cubo = CuboVendas.construir(self.df_vendas)
+        self._impressao_vendas = None
+    
+    def _memoizar(self, nome, calcular):
+        # KPIs dependem só das vendas (via cubo): a impressão de df_vendas identifica o resultado
+        if self.cache_kpis is None:
+            return calcular()
+        # Impressão calculada uma vez por definir_dados: o mesmo instantâneo das vendas usado no cubo
+        if self._impressao_vendas is None:
+            self._impressao_vendas = impressao_dataframe(self.df_vendas)
+        return self.cache_kpis.obter(f'relatorios.{nome}', [self._impressao_vendas], calcular)
     
     def processar_vendas(self):
-        vendas_processadas = self.df_vendas.groupby(['Cód. Produto', 'Produto', 'Categoria']).agg({
+        return self._memoizar('vendas_produtos', self._processar_vendas)
+    
+    def _processar_vendas(self):
+        vendas_processadas = self.cubo.agregar(['Cód. Produto', 'Produto', 'Categoria'], {
             'Qtd': 'sum',
             'Valor Total': 'sum',
             'ID Venda': 'count',
@@ -46,14 +85,9 @@ class GeradorRelatorios:
         return vendas_processadas
     
     def processar_estoque(self):
-        self.df_estoque['Status'] = self.df_estoque.apply(
-            lambda x: 'Crítico' if x['Quantidade Disponível'] < x['Estoque Mínimo'] * 0.5
-            else 'Baixo' if x['Quantidade Disponível'] < x['Estoque Mínimo']
-            else 'Normal', axis=1
-        )
-        
-        self.df_estoque['Diferenca_Minimo'] = (self.df_estoque['Quantidade Disponível'] - 
-                                                self.df_estoque['Estoque Mínimo'])
+        niveis = classificar_estoque(self.df_estoque)
+        self.df_estoque['Status'] = niveis['Status']
+        self.df_estoque['Diferenca_Minimo'] = niveis['Diferenca_Minimo']
         
         estoque_critico = self.df_estoque[self.df_estoque['Status'].isin(['Crítico', 'Baixo'])].copy()
         estoque_critico = estoque_critico.sort_values('Diferenca_Minimo')
@@ -61,7 +95,10 @@ class GeradorRelatorios:
         return estoque_critico
     
     def calcular_kpis_filial(self):
-        kpis = self.df_vendas.groupby('Filial').agg({
+        return self._memoizar('kpis_filial', self._calcular_kpis_filial)
+    
+    def _calcular_kpis_filial(self):
+        kpis = self.cubo.agregar('Filial', {
             'Valor Total': ['sum', 'mean', 'count'],
             'Qtd': 'sum',
             'Desconto': 'sum'
@@ -74,95 +111,178 @@ class GeradorRelatorios:
         return kpis.reset_index()
     
     def calcular_performance_mensal(self):
-        self.df_vendas['Mes'] = self.df_vendas['Data'].dt.to_period('M')
-        
-        mensal = self.df_vendas.groupby('Mes').agg({
+        return self._memoizar('performance_mensal', self._calcular_performance_mensal)
+    
+    def _calcular_performance_mensal(self):
+        mensal = self.cubo.agregar(['Ano', 'Mes'], {
             'Valor Total': 'sum',
             'ID Venda': 'count',
             'Qtd': 'sum'
         }).reset_index()
         
+        mensal['Mes'] = mensal['Ano'].astype(str) + '-' + mensal['Mes'].astype(str).str.zfill(2)
+        mensal = mensal.drop(columns='Ano')
         mensal.columns = ['Mes', 'Faturamento', 'Num_Vendas', 'Unidades']
-        mensal['Mes'] = mensal['Mes'].astype(str)
         
         mensal['Crescimento_%'] = mensal['Faturamento'].pct_change() * 100
         mensal['Crescimento_%'] = mensal['Crescimento_%'].round(2)
         
         return mensal
     
-    def gerar_relatorio_completo(self):
-        nome_arquivo = f'{self.path_reports}/relatorio_vendas_estoque_{self.data_processamento}.xlsx'
+    def montar_relatorio_completo(self):
+        vendas_proc = self.processar_vendas()
+        estoque_crit = self.processar_estoque()
+        kpis_filial = self.calcular_kpis_filial()
+        perf_mensal = self.calcular_performance_mensal()
         
-        with pd.ExcelWriter(nome_arquivo, engine='openpyxl') as writer:
-            
-            vendas_proc = self.processar_vendas()
-            vendas_proc.to_excel(writer, sheet_name='Vendas_Produtos', index=False)
-            
-            estoque_crit = self.processar_estoque()
-            estoque_crit.to_excel(writer, sheet_name='Alertas_Estoque', index=False)
-            
-            kpis_filial = self.calcular_kpis_filial()
-            kpis_filial.to_excel(writer, sheet_name='Performance_Filiais', index=False)
-            
-            perf_mensal = self.calcular_performance_mensal()
-            perf_mensal.to_excel(writer, sheet_name='Evolucao_Mensal', index=False)
-            
-            faturamento_total = self.df_vendas['Valor Total'].sum()
-            total_vendas = len(self.df_vendas)
-            ticket_medio = self.df_vendas['Valor Total'].mean()
-            total_unidades = self.df_vendas['Qtd'].sum()
-            
-            resumo = pd.DataFrame({
-                'Indicador': ['Faturamento Total', 'Total de Vendas', 'Ticket Médio', 
-                              'Unidades Vendidas', 'Data Processamento'],
-                'Valor': [f'R$ {faturamento_total:,.2f}', total_vendas, 
-                          f'R$ {ticket_medio:.2f}', total_unidades, 
-                          datetime.now().strftime('%d/%m/%Y %H:%M')]
-            })
-            resumo.to_excel(writer, sheet_name='Resumo_Executivo', index=False)
+        totais = self.cubo.totais({'Valor Total': ['sum', 'mean'], 'Qtd': 'sum'})
+        faturamento_total = totais[('Valor Total', 'sum')]
+        total_vendas = len(self.df_vendas)
+        ticket_medio = totais[('Valor Total', 'mean')]
+        total_unidades = int(totais[('Qtd', 'sum')])
+        
+        resumo = pd.DataFrame({
+            'Indicador': ['Faturamento Total', 'Total de Vendas', 'Ticket Médio', 
+                          'Unidades Vendidas', 'Data Processamento'],
+            'Valor': [f'R$ {faturamento_total:,.2f}', total_vendas, 
+                      f'R$ {ticket_medio:.2f}', total_unidades, 
+                      datetime.now().strftime('%d/%m/%Y %H:%M')]
+        })
+        
+        return [
+            ('Vendas_Produtos', vendas_proc),
+            ('Alertas_Estoque', estoque_crit),
+            ('Performance_Filiais', kpis_filial),
+            ('Evolucao_Mensal', perf_mensal),
+            ('Resumo_Executivo', resumo)
+        ]
+    
+    def montar_relatorio_estoque_detalhado(self):
+        estoque_completo = self.df_estoque.copy()
+        estoque_completo['Perc_Estoque_Minimo'] = classificar_estoque(estoque_completo)['% do Mínimo']
+        
+        por_filial = self.df_estoque.groupby('Filial').agg({
+            'Quantidade Disponível': 'sum',
+            'Código Produto': 'count'
+        }).reset_index()
+        por_filial.columns = ['Filial', 'Total_Unidades', 'Num_SKUs']
+        
+        criticos = self.df_estoque[self.df_estoque['Quantidade Disponível'] < 
+                                   self.df_estoque['Estoque Mínimo']].copy()
+        criticos = criticos.sort_values('Quantidade Disponível')
+        
+        return [
+            ('Estoque_Completo', estoque_completo),
+            ('Estoque_Por_Filial', por_filial),
+            ('Reposicao_Urgente', criticos)
+        ]
+    
+    def _gravar_instrumentado(self, nome_etapa, nome_arquivo, montar):
+        with self.instrumentador.etapa(f'montar_{nome_etapa}', len(self.df_vendas)) as etapa:
+            abas = montar()
+            etapa['linhas_saida'] = sum(len(aba[1]) for aba in abas)
         
-        return nome_arquivo
+        with self.instrumentador.etapa(f'gravar_{nome_etapa}', etapa['linhas_saida']):
+            return gravar_abas(nome_arquivo, abas, self.excel_streaming)
+    
+    def gerar_relatorio_completo(self):
+        nome_arquivo = f'{self.path_reports}/relatorio_vendas_estoque_{self.data_processamento}.xlsx'
+        return self._gravar_instrumentado('relatorio_completo', nome_arquivo, self.montar_relatorio_completo)
     
     def gerar_relatorio_estoque_detalhado(self):
         nome_arquivo = f'{self.path_reports}/relatorio_estoque_detalhado_{self.data_processamento}.xlsx'
+        return self._gravar_instrumentado('relatorio_estoque', nome_arquivo,
+                                          self.montar_relatorio_estoque_detalhado)
+    
+    def filtrar_filial(self, filial):
+        gerador = copy.copy(self)
+        gerador.df_vendas = self.df_vendas[self.df_vendas['Filial'] == filial]
+        gerador.df_estoque = self.df_estoque[self.df_estoque['Filial'] == filial].copy()
+        gerador.cubo = self.cubo.filtrar('Filial', filial)
+        gerador._impressao_vendas = None
+        return gerador
+    
+    def montar_relatorio_filial(self, filial):
+        gerador = self.filtrar_filial(filial)
+        return gerador.montar_relatorio_completo() + gerador.montar_relatorio_estoque_detalhado()
+    
+    def gerar_relatorios_por_filial(self, max_workers=None):
+        path_filiais = f'{self.path_reports}/filiais'
+        os.makedirs(path_filiais, exist_ok=True)
         
-        with pd.ExcelWriter(nome_arquivo, engine='openpyxl') as writer:
-            
-            estoque_completo = self.df_estoque.copy()
-            estoque_completo['Perc_Estoque_Minimo'] = (
-                (estoque_completo['Quantidade Disponível'] / estoque_completo['Estoque Mínimo']) * 100
-            ).round(1)
-            estoque_completo.to_excel(writer, sheet_name='Estoque_Completo', index=False)
-            
-            por_filial = self.df_estoque.groupby('Filial').agg({
-                'Quantidade Disponível': 'sum',
-                'Código Produto': 'count'
-            }).reset_index()
-            por_filial.columns = ['Filial', 'Total_Unidades', 'Num_SKUs']
-            por_filial.to_excel(writer, sheet_name='Estoque_Por_Filial', index=False)
-            
-            criticos = self.df_estoque[self.df_estoque['Quantidade Disponível'] < 
-                                       self.df_estoque['Estoque Mínimo']].copy()
-            criticos = criticos.sort_values('Quantidade Disponível')
-            criticos.to_excel(writer, sheet_name='Reposicao_Urgente', index=False)
+        # Os DataFrames são calculados aqui; os processos só serializam as planilhas
+        with self.instrumentador.etapa('montar_relatorios_filiais', len(self.df_vendas)) as etapa:
+            trabalhos = [
+                (f'{self.path_reports}/relatorio_vendas_estoque_{self.data_processamento}.xlsx',
+                 self.montar_relatorio_completo()),
+                (f'{self.path_reports}/relatorio_estoque_detalhado_{self.data_processamento}.xlsx',
+                 self.montar_relatorio_estoque_detalhado())
+            ]
+            for filial in sorted(self.df_vendas['Filial'].dropna().unique()):
+                nome_arquivo = f'{path_filiais}/relatorio_{_slug_filial(filial)}_{self.data_processamento}.xlsx'
+                trabalhos.append((nome_arquivo, self.montar_relatorio_filial(filial)))
+            etapa['linhas_saida'] = sum(len(aba[1]) for _, abas in trabalhos for aba in abas)
         
-        return nome_arquivo
+        # O CPU dos processos filhos não aparece no registro; o tempo de parede sim
+        with self.instrumentador.etapa('gravar_relatorios_filiais', etapa['linhas_saida']):
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futuros = [
+                    executor.submit(gravar_abas, nome_arquivo, abas, self.excel_streaming)
+                    for nome_arquivo, abas in trabalhos
+                ]
+                return [futuro.result() for futuro in futuros]
 
 def main():
-    print('\nIniciando geração de relatórios...\n')
-    
-    gerador = GeradorRelatorios()
+    parser = argparse.ArgumentParser(description='Geração de relatórios Excel')
+    parser.add_argument('--por-filial', action='store_true',
+                        help='gera também um relatório por filial, em paralelo')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='número de processos para o modo --por-filial')
+    parser.add_argument('--excel-streaming', action='store_true',
+                        help='grava as planilhas linha a linha (openpyxl write-only)')
+    parser.add_argument('--instrumentar', action='store_true',
+                        help='grava log JSON com tempo, CPU, memória e linhas de cada etapa')
+    parser.add_argument('--memoria', action='store_true',
+                        help='com --instrumentar, pico de memória por etapa via tracemalloc (mais lento)')
+    parser.add_argument('--perfil', action='store_true',
+                        help='com --instrumentar, grava também um perfil cProfile por etapa')
+    parser.add_argument('--cache-kpis', action='store_true',
+                        help='reaproveita KPIs já calculados para os mesmos dados (cache em disco)')
+    args = parser.parse_args()
     
-    print('Carregando dados...')
-    gerador.carregar_dados()
+    print('\nIniciando geração de relatórios...\n')
     
-    print('Processando vendas e estoque...')
-    relatorio_principal = gerador.gerar_relatorio_completo()
-    print(f'Gerado: {relatorio_principal}')
+    instrumentador = None
+    if args.instrumentar:
+        instrumentador = Instrumentador.ativo('report', memoria=args.memoria, perfil=args.perfil)
+    cache_kpis = CacheKPIs.persistente() if args.cache_kpis else None
+    gerador = GeradorRelatorios(excel_streaming=args.excel_streaming, instrumentador=instrumentador,
+                                cache_kpis=cache_kpis)
     
-    print('Gerando relatório detalhado de estoque...')
-    relatorio_estoque = gerador.gerar_relatorio_estoque_detalhado()
-    print(f'Gerado: {relatorio_estoque}')
+    try:
+        print('Carregando dados...')
+        with gerador.instrumentador.etapa('report_carregar_dados') as etapa:
+            gerador.carregar_dados()
+            etapa['linhas_saida'] = len(gerador.df_vendas)
+        
+        if args.por_filial:
+            print('Gerando relatórios consolidados e por filial em paralelo...')
+            for relatorio in gerador.gerar_relatorios_por_filial(max_workers=args.workers):
+                print(f'Gerado: {relatorio}')
+        else:
+            print('Processando vendas e estoque...')
+            relatorio_principal = gerador.gerar_relatorio_completo()
+            print(f'Gerado: {relatorio_principal}')
+            
+            print('Gerando relatório detalhado de estoque...')
+            relatorio_estoque = gerador.gerar_relatorio_estoque_detalhado()
+            print(f'Gerado: {relatorio_estoque}')
+    finally:
+        if instrumentador is not None:
+            instrumentador.imprimir_resumo()
+            print(f'\nLog de execução: {instrumentador.salvar()}\n')
+        if cache_kpis is not None:
+            cache_kpis.imprimir_resumo()
     
     print('\nRelatórios gerados com sucesso!')
     print(f'Verifique a pasta: {gerador.path_reports}/\n')
@@ -0,0 +1,155 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Instrumentação das etapas do pipeline
+Tempo de parede, tempo de CPU, memória e linhas de cada etapa, gravados num log JSON por execução
+"""
+
+import cProfile
+import json
+import os
+import platform
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+LOG_DIR = 'data/.logs'
+
+
+def _pico_rss_mb():
+    # Maior memória residente do processo até agora (ru_maxrss em KB no Linux, bytes no macOS)
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    divisor = 2 ** 20 if platform.system() == 'Darwin' else 2 ** 10
+    return round(pico / divisor, 1)
+
+
+class Instrumentador:
+
+    def __init__(self, execucao, log_dir=None, memoria=False, perfil=False):
+        # Sem log_dir as medições ficam só em memória (tempo e linhas custam quase nada);
+        # memoria=True liga o tracemalloc por etapa, preciso mas com custo em código Python puro
+        self.execucao = execucao
+        self.log_dir = log_dir
+        self.memoria = memoria
+        self.perfil = perfil
+        self.etapas = []
+        self.inicio = datetime.now()
+        self._identificador = self.inicio.strftime('%Y%m%d_%H%M%S')
+        self._etapa_ativa = None
+
+    @classmethod
+    def ativo(cls, execucao, log_dir=LOG_DIR, memoria=False, perfil=False):
+        return cls(execucao, log_dir=log_dir, memoria=memoria, perfil=perfil)
+
+    @contextmanager
+    def etapa(self, nome, linhas_entrada=None):
+        if self._etapa_ativa is not None:
+            raise RuntimeError(f"Etapa '{nome}' iniciada dentro de '{self._etapa_ativa}'")
+        self._etapa_ativa = nome
+
+        registro = {
+            'etapa': nome,
+            'inicio': datetime.now().isoformat(timespec='milliseconds'),
+            'linhas_entrada': linhas_entrada,
+            'linhas_saida': None
+        }
+
+        iniciou_rastreio = self.memoria and not tracemalloc.is_tracing()
+        if iniciou_rastreio:
+            tracemalloc.start()
+        if self.memoria:
+            tracemalloc.reset_peak()
+            memoria_inicial = tracemalloc.get_traced_memory()[0]
+
+        rss_pico_inicial = _pico_rss_mb()
+        perfilador = cProfile.Profile() if self.perfil else None
+        inicio_parede = time.perf_counter()
+        inicio_cpu = time.process_time()
+        if perfilador is not None:
+            perfilador.enable()
+
+        try:
+            yield registro
+        except BaseException as erro:
+            registro['erro'] = f'{type(erro).__name__}: {erro}'
+            raise
+        finally:
+            if perfilador is not None:
+                perfilador.disable()
+
+            # CPU do processo atual: trabalho feito em processos filhos não entra aqui
+            registro['tempo_s'] = round(time.perf_counter() - inicio_parede, 4)
+            registro['cpu_s'] = round(time.process_time() - inicio_cpu, 4)
+            # ru_maxrss só cresce: o delta é quanto a etapa elevou o pico do processo
+            # (zero se ficou abaixo de um pico anterior); o valor exato por etapa vem do tracemalloc
+            registro['rss_pico_mb'] = _pico_rss_mb()
+            if rss_pico_inicial is not None:
+                registro['rss_pico_delta_mb'] = round(registro['rss_pico_mb'] - rss_pico_inicial, 1)
+
+            if self.memoria:
+                atual, pico = tracemalloc.get_traced_memory()
+                registro['memoria_pico_mb'] = round((pico - memoria_inicial) / 2 ** 20, 2)
+                registro['memoria_delta_mb'] = round((atual - memoria_inicial) / 2 ** 20, 2)
+                if iniciou_rastreio:
+                    tracemalloc.stop()
+
+            if perfilador is not None and self.log_dir:
+                registro['perfil'] = self._salvar_perfil(perfilador, nome)
+
+            self.etapas.append(registro)
+            self._etapa_ativa = None
+
+    def _salvar_perfil(self, perfilador, nome):
+        pasta = os.path.join(self.log_dir, 'perfis')
+        os.makedirs(pasta, exist_ok=True)
+        nome_arquivo = f'{self._identificador}_{self.execucao}_{len(self.etapas) + 1:02d}_{nome}.prof'
+        caminho = os.path.join(pasta, nome_arquivo)
+        perfilador.dump_stats(caminho)
+        return caminho
+
+    def relatorio(self):
+        fim = datetime.now()
+        return {
+            'execucao': self.execucao,
+            'inicio': self.inicio.isoformat(timespec='seconds'),
+            'fim': fim.isoformat(timespec='seconds'),
+            'duracao_s': round((fim - self.inicio).total_seconds(), 3),
+            'ambiente': {
+                'python': platform.python_version(),
+                'plataforma': platform.platform(),
+                'pid': os.getpid()
+            },
+            'memoria_rastreada': self.memoria,
+            'etapas': self.etapas
+        }
+
+    def salvar(self):
+        if not self.log_dir:
+            return None
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        caminho = os.path.join(self.log_dir, f'{self._identificador}_{self.execucao}.json')
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(self.relatorio(), f, ensure_ascii=False, indent=2)
+
+        return caminho
+
+    def imprimir_resumo(self):
+        print(f'\nEtapas ({self.execucao}):')
+        for registro in self.etapas:
+            if 'memoria_pico_mb' in registro:
+                memoria = f' pico {registro["memoria_pico_mb"]:>8.1f} MB'
+            elif 'rss_pico_delta_mb' in registro:
+                memoria = f' RSS +{registro["rss_pico_delta_mb"]:>7.1f} MB'
+            else:
+                memoria = ''
+            linhas = f' {registro["linhas_saida"]:>10} linhas' if registro['linhas_saida'] is not None else ''
+            print(f'   {registro["etapa"]:<28} {registro["tempo_s"]:>8.3f} s '
+                  f'(CPU {registro["cpu_s"]:.3f} s){memoria}{linhas}')
@@ -0,0 +1,194 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Previsão de demanda em lote por produto × filial
+Séries diárias ou semanais em uma matriz; média móvel, suavização exponencial e sazonal ingênuo ajustados para todas as séries de uma vez
+"""
+
+import pandas as pd
+import numpy as np
+
+CHAVES_SERIE = ('Cód. Produto', 'Filial')
+CHAVES_ESTOQUE = ('Código Produto', 'Filial')
+
+# Dias por período, sazonalidade e janelas de cada frequência
+FREQUENCIAS = {
+    'diaria': {'passo': 1, 'sazonalidade': 7, 'janela_media': 28, 'validacao': 28},
+    'semanal': {'passo': 7, 'sazonalidade': 52, 'janela_media': 4, 'validacao': 4}
+}
+
+ALFAS_PADRAO = (0.1, 0.2, 0.3, 0.5)
+HORIZONTE_DIAS_PADRAO = 30
+PRAZO_REPOSICAO_DIAS_PADRAO = 7
+PERIODO_REVISAO_DIAS_PADRAO = 14
+
+MODELOS = ('media_movel', 'suavizacao_exponencial', 'sazonal_ingenuo')
+
+
+class PrevisorDemanda:
+
+    def __init__(self, frequencia='diaria', horizonte_dias=HORIZONTE_DIAS_PADRAO,
+                 prazo_reposicao_dias=PRAZO_REPOSICAO_DIAS_PADRAO,
+                 periodo_revisao_dias=PERIODO_REVISAO_DIAS_PADRAO, alfas=ALFAS_PADRAO):
+        if frequencia not in FREQUENCIAS:
+            raise ValueError(f"Frequência inválida: {frequencia} (use {', '.join(FREQUENCIAS)})")
+        if horizonte_dias < 1:
+            raise ValueError("O horizonte deve ter pelo menos um dia")
+        if not all(0 < alfa <= 1 for alfa in alfas):
+            raise ValueError("Os alfas da suavização exponencial devem estar em (0, 1]")
+
+        self.frequencia = frequencia
+        self.horizonte_dias = horizonte_dias
+        self.prazo_reposicao_dias = prazo_reposicao_dias
+        self.periodo_revisao_dias = periodo_revisao_dias
+        self.alfas = tuple(alfas)
+        self.parametros = FREQUENCIAS[frequencia]
+
+    def construir_series(self, vendas):
+        # Uma linha por produto × filial, uma coluna por período; o último período termina na última venda
+        datas = pd.to_datetime(vendas['Data']).to_numpy()
+        validas = ~np.isnat(datas)
+        datas = datas[validas]
+        quantidades = vendas['Qtd'].to_numpy(dtype='float64')[validas]
+
+        # Cada chave fatorada em separado e combinada como inteiro: bem mais barato que fatorar tuplas
+        codigos = np.zeros(len(datas), dtype='int64')
+        niveis = []
+        for coluna in CHAVES_SERIE:
+            codigos_coluna, unicos = pd.factorize(np.asarray(vendas[coluna])[validas])
+            codigos = codigos * len(unicos) + codigos_coluna
+            niveis.append(unicos)
+        codigos, combinados = pd.factorize(codigos)
+        chaves = pd.MultiIndex.from_arrays(
+            [unicos[indices] for unicos, indices in zip(niveis, np.unravel_index(combinados, [len(u) for u in niveis]))],
+            names=list(CHAVES_SERIE))
+        if not len(datas):
+            return chaves, np.zeros((0, 0)), pd.DatetimeIndex([])
+
+        passo = self.parametros['passo']
+        fim = datas.max().astype('datetime64[D]')
+        atraso = (fim - datas.astype('datetime64[D]')).astype('int64') // passo
+        num_periodos = int(atraso.max()) + 1
+        periodos = num_periodos - 1 - atraso
+
+        matriz = np.bincount(codigos * num_periodos + periodos, weights=quantidades,
+                             minlength=len(chaves) * num_periodos).reshape(len(chaves), num_periodos)
+        inicios = pd.DatetimeIndex(fim - np.arange(num_periodos)[::-1] * passo - (passo - 1))
+        return chaves, matriz, inicios
+
+    def demanda_diaria(self, vendas, anterior=None):
+        # Qtd somada por produto × filial × dia: gera as mesmas séries sem guardar as vendas (ETL incremental)
+        colunas = [*CHAVES_SERIE, 'Data']
+        diaria = pd.DataFrame({coluna: np.asarray(vendas[coluna]) for coluna in colunas})
+        diaria['Qtd'] = vendas['Qtd'].to_numpy(dtype='float64')
+        if anterior is not None:
+            diaria = pd.concat([anterior, diaria], ignore_index=True)
+        return diaria.groupby(colunas, sort=False).sum().reset_index()
+
+    def _media_movel(self, matriz, inicio):
+        # Previsão de t = média dos `janela` períodos anteriores, via somas acumuladas
+        janela = self.parametros['janela_media']
+        acumulado = np.concatenate([np.zeros((len(matriz), 1)), np.cumsum(matriz, axis=1)], axis=1)
+        alvos = np.arange(inicio, matriz.shape[1] + 1)
+        comeco = np.maximum(alvos - janela, 0)
+        previsoes = (acumulado[:, alvos] - acumulado[:, comeco]) / np.maximum(alvos - comeco, 1)
+        return previsoes[:, :-1], previsoes[:, -1]
+
+    def _suavizacao_exponencial(self, matriz, inicio):
+        # Todos os alfas e todas as séries avançam juntos: o laço é só sobre os períodos
+        alfas = np.asarray(self.alfas)[:, None]
+        nivel = np.repeat(matriz[None, :, 0], len(alfas), axis=0)
+        ajustadas = np.empty((len(alfas), len(matriz), matriz.shape[1] - inicio))
+        for t in range(1, matriz.shape[1]):
+            if t >= inicio:
+                ajustadas[:, :, t - inicio] = nivel
+            nivel = alfas * matriz[None, :, t] + (1 - alfas) * nivel
+        if inicio == 0:
+            ajustadas[:, :, 0] = matriz[None, :, 0]
+        return ajustadas, nivel
+
+    def _sazonal_ingenuo(self, matriz, inicio, horizonte):
+        # Repete o último ciclo; sem um ciclo completo antes da validação o modelo não concorre
+        sazonalidade = self.parametros['sazonalidade']
+        num_periodos = matriz.shape[1]
+        if inicio < sazonalidade:
+            return None, None
+        ajustadas = matriz[:, inicio - sazonalidade:num_periodos - sazonalidade]
+        futuro = matriz[:, num_periodos - sazonalidade + np.arange(horizonte) % sazonalidade]
+        return ajustadas, futuro
+
+    def ajustar(self, matriz):
+        # Erro absoluto médio um passo à frente nos últimos períodos escolhe o modelo de cada série
+        num_series, num_periodos = matriz.shape
+        if not matriz.size:
+            return pd.DataFrame({
+                'Modelo_Previsao': pd.Categorical([], categories=list(MODELOS)),
+                'Alfa_Suavizacao': np.zeros(num_series), 'Erro_Previsao': np.zeros(num_series),
+                'Demanda_Prevista_Dia': np.zeros(num_series), 'Demanda_Prevista_Horizonte': np.zeros(num_series)
+            })
+        horizonte = -(-self.horizonte_dias // self.parametros['passo'])
+        inicio = max(num_periodos - self.parametros['validacao'], 1) if num_periodos > 1 else 0
+        observado = matriz[:, inicio:]
+
+        candidatos = []
+        ajustadas, proxima = self._media_movel(matriz, inicio)
+        candidatos.append(('media_movel', None, ajustadas, np.repeat(proxima[:, None], horizonte, axis=1)))
+
+        ajustadas, niveis = self._suavizacao_exponencial(matriz, inicio)
+        for alfa, ajustada, nivel in zip(self.alfas, ajustadas, niveis):
+            candidatos.append(('suavizacao_exponencial', alfa, ajustada, np.repeat(nivel[:, None], horizonte, axis=1)))
+
+        ajustadas, futuro = self._sazonal_ingenuo(matriz, inicio, horizonte)
+        if ajustadas is not None:
+            candidatos.append(('sazonal_ingenuo', None, ajustadas, futuro))
+
+        erros = np.stack([np.abs(ajustada - observado).mean(axis=1) for _, _, ajustada, _ in candidatos])
+        previsoes = np.stack([futuro.sum(axis=1) for _, _, _, futuro in candidatos])
+        # Empate no erro: vence o candidato listado primeiro (modelo mais simples)
+        escolhido = np.argmin(erros, axis=0)
+        linhas = np.arange(num_series)
+
+        dias = horizonte * self.parametros['passo']
+        demanda_horizonte = previsoes[escolhido, linhas] * self.horizonte_dias / dias
+        nomes = np.array([nome for nome, _, _, _ in candidatos], dtype=object)
+        alfas = np.array([np.nan if alfa is None else alfa for _, alfa, _, _ in candidatos])
+        return pd.DataFrame({
+            'Modelo_Previsao': pd.Categorical(nomes[escolhido], categories=list(MODELOS)),
+            'Alfa_Suavizacao': alfas[escolhido],
+            'Erro_Previsao': erros[escolhido, linhas].round(3),
+            'Demanda_Prevista_Dia': (demanda_horizonte / self.horizonte_dias).round(3),
+            'Demanda_Prevista_Horizonte': demanda_horizonte.round(2)
+        })
+
+    def prever(self, vendas):
+        chaves, matriz, inicios = self.construir_series(vendas)
+        previsao = self.ajustar(matriz)
+        previsao.index = chaves
+        previsao.insert(0, 'Demanda_Historica_Dia',
+                        (matriz.sum(axis=1) / max(len(inicios) * self.parametros['passo'], 1)).round(3))
+        return previsao
+
+    def aplicar_ao_estoque(self, estoque, previsao):
+        # Leitura posicional pela chave produto × filial; item sem vendas tem demanda prevista zero
+        posicoes = previsao.index.get_indexer(pd.MultiIndex.from_frame(estoque[list(CHAVES_ESTOQUE)]))
+        encontrado = posicoes >= 0
+        demanda_dia = np.where(encontrado, previsao['Demanda_Prevista_Dia'].to_numpy()[posicoes], 0.0)
+        demanda_horizonte = np.where(encontrado, previsao['Demanda_Prevista_Horizonte'].to_numpy()[posicoes], 0.0)
+
+        disponivel = estoque['Quantidade Disponível'].to_numpy(dtype='float64')
+        minimo = estoque['Estoque Mínimo'].to_numpy(dtype='float64')
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cobertura = np.where(demanda_dia > 0, disponivel / demanda_dia, np.nan)
+
+        # Repor até cobrir prazo de entrega + período de revisão, mantendo o estoque mínimo como segurança
+        alvo = demanda_dia * (self.prazo_reposicao_dias + self.periodo_revisao_dias) + minimo
+        sugerido = np.ceil(np.maximum(alvo - disponivel, 0))
+
+        estoque = estoque.copy()
+        estoque['Demanda_Prevista_Dia'] = demanda_dia
+        estoque[f'Demanda_Prevista_{self.horizonte_dias}d'] = demanda_horizonte
+        estoque['Modelo_Previsao'] = np.where(encontrado, previsao['Modelo_Previsao'].astype(object).to_numpy()[posicoes],
+                                              'sem_vendas')
+        estoque['Cobertura_Dias'] = np.round(cobertura, 1)
+        estoque['Quantidade_Sugerida'] = sugerido.astype('int64')
+        return estoque
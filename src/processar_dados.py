@@ -8,21 +8,126 @@ import pandas as pd
 import numpy as np
 from datetime import datetime
 import warnings
+import argparse
+import json
+import os
+from carregador_dados import (carregar_produtos, carregar_estoque, carregar_vendas,
+                              carregar_vendas_em_blocos, carregar_vendas_multiplas, listar_arquivos_vendas,
+                              abas_continuacao, ARQUIVO_VENDAS, TAMANHO_BLOCO_PADRAO)
+from analise_estoque import AnalisadorEstoque
+from cubo_vendas import CuboVendas
+from dimensao_data import DimensaoData
+from escritor_excel import EscritorExcelStreaming, precisa_streaming, nome_continuacao, LIMITE_LINHAS_EXCEL
+from instrumentacao import Instrumentador
+from sketch_quantis import SketchQuantis, PRECISAO_PADRAO
+from esquema_estrela import EsquemaEstrela, CHAVE_PRODUTO, atribuir_chaves, enriquecer_com_produtos
+from validacao_regras import ValidadorRegras, REGRAS_PRODUTOS, REGRAS_ESTOQUE, REGRAS_VENDAS, CAMINHO_QUARENTENA
+from armazem_vendas import ArmazemVendas, filtrar_periodo
+from previsao_demanda import PrevisorDemanda, FREQUENCIAS, HORIZONTE_DIAS_PADRAO
 warnings.filterwarnings('ignore')
 
+ESTADO_DIR = 'data/.estado_etl'
+
+# Escopos aceitos para a detecção de outliers (None = IQR global sobre todas as vendas)
+ESCOPOS_OUTLIERS = {
+    'categoria': 'Categoria',
+    'filial': 'Filial',
+    'produto': 'Cód. Produto',
+    'global': None
+}
+
+ESPECIFICACAO_METRICAS = {
+    'por_produto': (['Cód. Produto'], {
+        'Qtd': 'sum',
+        'Valor Total': 'sum',
+        'Lucro_Venda': 'sum',
+        'ID Venda': 'count'
+    }),
+    'por_filial': (['Filial'], {
+        'Valor Total': ['sum', 'mean', 'count'],
+        'Lucro_Venda': 'sum',
+        'Qtd': 'sum'
+    }),
+    'por_categoria': (['Categoria'], {
+        'Valor Total': 'sum',
+        'Lucro_Venda': 'sum',
+        'Qtd': 'sum'
+    }),
+    'por_periodo': (['Mes', 'Ano'], {
+        'Valor Total': 'sum',
+        'Lucro_Venda': 'sum',
+        'ID Venda': 'count'
+    })
+}
+
+def minuto_do_dia(hora):
+    # Poucos horários distintos: converte só os valores únicos e reindexa
+    codigos, unicos = pd.factorize(hora)
+    minutos_unicos = np.array([
+        h.hour * 60 + h.minute if hasattr(h, 'hour')
+        else int(str(h)[:2]) * 60 + int(str(h)[3:5])
+        for h in unicos
+    ], dtype='int16')
+    
+    minutos = np.full(len(codigos), -1, dtype='int16')
+    validos = codigos >= 0
+    minutos[validos] = minutos_unicos[codigos[validos]]
+    return pd.Series(minutos, index=hora.index)
+
+
+def bytes_por_linha(df):
+    if len(df) == 0:
+        return 0.0
+    return df.memory_usage(index=True, deep=True).sum() / len(df)
+
+
 class ProcessadorDados:
     
-    def __init__(self):
+    def __init__(self, estado_dir=ESTADO_DIR, compacto=False, excel_streaming=False, instrumentador=None,
+                 outliers_por='Categoria', outliers_exato=False, frequencia_previsao='diaria',
+                 horizonte_previsao=HORIZONTE_DIAS_PADRAO, armazem=None, fonte_vendas=None,
+                 workers_carga=None):
         self.produtos = None
         self.estoque = None
         self.vendas = None
+        self.brutos = None
+        self.estado_dir = estado_dir
+        self.compacto = compacto
+        self.excel_streaming = excel_streaming
+        self.calendario = DimensaoData()
+        self.dimensao_data = None
+        self.esquema = None
+        self.analisador_estoque = AnalisadorEstoque(rotulos=('Crítico', 'Baixo', 'Adequado'))
+        self.instrumentador = instrumentador or Instrumentador('etl')
+        self.outliers_por = outliers_por
+        self.outliers_exato = outliers_exato
+        self.previsor = PrevisorDemanda(frequencia_previsao, horizonte_dias=horizonte_previsao)
+        self.previsao_demanda = None
+        self.validador = ValidadorRegras()
+        self.armazem = armazem
+        self.fonte_vendas = fonte_vendas
+        self.workers_carga = workers_carga
+        self.relatorio_carga = None
+        
+    def carregar_vendas_brutas(self):
+        # Sem fonte, a planilha única de sempre; com arquivo, diretório ou glob as planilhas são lidas em paralelo
+        if self.fonte_vendas is None:
+            return carregar_vendas()
+        vendas, self.relatorio_carga = carregar_vendas_multiplas(self.fonte_vendas, self.workers_carga)
+        return vendas
+    
+    def imprimir_relatorio_carga(self):
+        if self.relatorio_carga is None:
+            return
+        relatorio = self.relatorio_carga
+        print(f'   {len(relatorio)} planilhas de vendas em {relatorio.attrs["segundos_total"]:.2f} s '
+              f'(soma das leituras: {relatorio["Segundos"].sum():.2f} s)')
+        for _, arquivo in relatorio.iterrows():
+            print(f'      - {os.path.basename(arquivo["Arquivo"])}: {arquivo["Linhas"]} linhas, '
+                  f'{arquivo["Duplicadas"]} duplicadas, {arquivo["Segundos"]:.2f} s')
         
     def validar_produtos(self, df):
-        df = df.copy()
-        
-        df = df.dropna(subset=['Código', 'Descrição', 'Preço Venda'])
-        df = df[df['Preço Venda'] > 0]
-        df = df[df['Custo Aquisição'] > 0]
+        df = self.validador.aplicar('produtos', df, REGRAS_PRODUTOS)
         
         df['Descrição'] = df['Descrição'].str.strip()
         df['Categoria'] = df['Categoria'].str.strip()
@@ -35,44 +140,35 @@ class ProcessadorDados:
         
         return df
     
+    def atribuir_chave_produto(self, df, coluna):
+        # Chave substituta = posição no cadastro validado, atribuída uma vez na carga;
+        # daí em diante o enriquecimento e o esquema estrela só fazem leitura posicional
+        if self.produtos is not None:
+            df[CHAVE_PRODUTO] = atribuir_chaves(df[coluna], self.produtos['Código'])
+        return df
+    
     def validar_estoque(self, df):
-        df = df.copy()
-        
-        df = df.dropna(subset=['Código Produto', 'Filial', 'Quantidade Disponível'])
-        df = df[df['Quantidade Disponível'] >= 0]
+        df = self.validador.aplicar('estoque', df, REGRAS_ESTOQUE)
+        df = self.atribuir_chave_produto(df, 'Código Produto')
         
         df['Última Entrada'] = df['Última Entrada'].fillna('Não informado')
         df['Lote'] = df['Lote'].fillna('N/A')
         
-        df['Nivel_Estoque'] = pd.cut(
-            df['Quantidade Disponível'] / df['Estoque Mínimo'],
-            bins=[0, 0.5, 1.0, float('inf')],
-            labels=['Crítico', 'Baixo', 'Adequado']
-        )
-        
-        df['Necessidade_Reposicao'] = np.where(
-            df['Quantidade Disponível'] < df['Estoque Mínimo'],
-            df['Estoque Mínimo'] - df['Quantidade Disponível'],
-            0
-        )
+        niveis = self.analisador_estoque.classificar(df, categorico=True)
+        df['Nivel_Estoque'] = niveis['Status']
+        df['Necessidade_Reposicao'] = niveis['Necessidade_Reposicao']
         
         return df
     
-    def validar_vendas(self, df):
-        df = df.copy()
-        
-        df['Data'] = pd.to_datetime(df['Data'], format='%d/%m/%Y', errors='coerce')
-        df = df.dropna(subset=['Data'])
+    def validar_vendas(self, df, acumular=False):
+        # Data convertida uma vez sobre o quadro bruto; a quarentena guarda o texto original
+        datas = pd.to_datetime(df['Data'], format='%d/%m/%Y', errors='coerce')
+        regras = [('data_invalida', lambda df, validas: datas.notna())] + REGRAS_VENDAS
+        df = self.validador.aplicar('vendas', df, regras, acumular=acumular, convertidas={'Data': datas})
+        df = self.atribuir_chave_produto(df, 'Cód. Produto')
         
-        df = df[df['Valor Total'] > 0]
-        df = df[df['Qtd'] > 0]
-        
-        df['Ano'] = df['Data'].dt.year
-        df['Mes'] = df['Data'].dt.month
-        df['Trimestre'] = df['Data'].dt.quarter
-        df['Dia_Semana'] = df['Data'].dt.dayofweek
-        df['Nome_Dia'] = df['Data'].dt.day_name()
-        df['Semana_Ano'] = df['Data'].dt.isocalendar().week
+        # Atributos de calendário calculados por data distinta, não por venda
+        df, self.dimensao_data = self.calendario.anexar(df)
         
         df['Preco_Com_Desconto'] = np.where(
             df['Desconto'] > 0,
@@ -81,7 +177,7 @@ class ProcessadorDados:
         )
         
         df['Periodo_Dia'] = pd.cut(
-            df['Hora'].str[:2].astype(int),
+            minuto_do_dia(df['Hora']) // 60,
             bins=[0, 12, 18, 24],
             labels=['Manhã', 'Tarde', 'Noite'],
             include_lowest=True
@@ -89,83 +185,172 @@ class ProcessadorDados:
         
         return df
     
-    def enriquecer_vendas_com_produtos(self):
-        if self.vendas is None or self.produtos is None:
-            raise ValueError("Dados de vendas e produtos devem ser carregados primeiro")
+    def compactar_vendas(self, df, limite_cardinalidade=0.5):
+        df = df.copy(deep=False)
+        
+        df['Minuto_Dia'] = minuto_do_dia(df['Hora'])
+        
+        for coluna in df.columns:
+            serie = df[coluna]
+            if serie.dtype == object:
+                if serie.nunique(dropna=True) <= limite_cardinalidade * len(serie):
+                    df[coluna] = serie.astype('category')
+            elif pd.api.types.is_integer_dtype(serie.dtype):
+                df[coluna] = pd.to_numeric(serie, downcast='integer')
+            elif pd.api.types.is_float_dtype(serie.dtype):
+                # float32 só quando não há perda (valores em reais normalmente não cabem)
+                reduzida = serie.astype('float32')
+                if np.array_equal(reduzida.astype('float64').to_numpy(), serie.to_numpy(), equal_nan=True):
+                    df[coluna] = reduzida
         
-        vendas_enriquecidas = self.vendas.merge(
-            self.produtos[['Código', 'Custo Aquisição', 'Margem_Real', 'Fornecedor']],
-            left_on='Cód. Produto',
-            right_on='Código',
-            how='left'
-        )
+        return df
+    
+    def validar_vendas_em_blocos(self, blocos):
+        self.validador.descartar('vendas')
+        for bloco in blocos:
+            yield self.validar_vendas(bloco, acumular=True)
+    
+    def enriquecer_vendas_com_produtos(self, vendas=None):
+        if vendas is None:
+            vendas = self.vendas
+        if vendas is None or self.produtos is None:
+            raise ValueError("Dados de vendas e produtos devem ser carregados primeiro")
         
-        vendas_enriquecidas['Lucro_Venda'] = (
-            (vendas_enriquecidas['Valor Total'] - 
-             (vendas_enriquecidas['Custo Aquisição'] * vendas_enriquecidas['Qtd']))
-        ).round(2)
+        # Vendas validadas já trazem a chave: leitura posicional direta; vendas de fora: hash só nos códigos distintos
+        if CHAVE_PRODUTO in vendas.columns:
+            chaves = vendas[CHAVE_PRODUTO].to_numpy()
+        else:
+            chaves = atribuir_chaves(vendas['Cód. Produto'], self.produtos['Código'])
         
-        vendas_enriquecidas['Margem_Venda_%'] = (
-            (vendas_enriquecidas['Lucro_Venda'] / vendas_enriquecidas['Valor Total']) * 100
-        ).round(2)
+        return enriquecer_com_produtos(vendas, self.produtos, chaves)
+    
+    def construir_esquema_estrela(self):
+        if self.vendas is None or self.produtos is None or self.estoque is None:
+            raise ValueError("Dados de vendas, produtos e estoque devem ser carregados primeiro")
         
-        return vendas_enriquecidas
+        self.esquema = EsquemaEstrela.construir(self.produtos, self.estoque, self.vendas, self.calendario)
+        return self.esquema
     
-    def calcular_metricas_agregadas(self, vendas_enriquecidas):
-        metricas = {
-            'por_produto': vendas_enriquecidas.groupby('Cód. Produto').agg({
-                'Qtd': 'sum',
-                'Valor Total': 'sum',
-                'Lucro_Venda': 'sum',
-                'ID Venda': 'count'
-            }).round(2),
-            
-            'por_filial': vendas_enriquecidas.groupby('Filial').agg({
-                'Valor Total': ['sum', 'mean', 'count'],
-                'Lucro_Venda': 'sum',
-                'Qtd': 'sum'
-            }).round(2),
-            
-            'por_categoria': vendas_enriquecidas.groupby('Categoria').agg({
-                'Valor Total': 'sum',
-                'Lucro_Venda': 'sum',
-                'Qtd': 'sum'
-            }).round(2),
-            
-            'por_periodo': vendas_enriquecidas.groupby(['Mes', 'Ano']).agg({
-                'Valor Total': 'sum',
-                'Lucro_Venda': 'sum',
-                'ID Venda': 'count'
-            }).round(2)
+    def prever_demanda(self, vendas=None):
+        # Uma série por produto × filial; previsão, cobertura e quantidade sugerida vão para o estoque
+        # (vendas pode ser a demanda diária agregada do estado incremental)
+        self.previsao_demanda = self.previsor.prever(self.vendas if vendas is None else vendas)
+        self.estoque = self.previsor.aplicar_ao_estoque(self.estoque, self.previsao_demanda)
+        return self.previsao_demanda
+    
+    def calcular_metricas_parciais(self, vendas_enriquecidas):
+        # O cubo guarda somas em centavos: combinar blocos dá o mesmo resultado do cálculo completo
+        return CuboVendas.construir(vendas_enriquecidas)
+    
+    def combinar_metricas_parciais(self, *lista_parciais):
+        return CuboVendas.combinar(*lista_parciais)
+    
+    def finalizar_metricas(self, parciais):
+        return {
+            nome: parciais.agregar(dimensoes, especificacao).round(2)
+            for nome, (dimensoes, especificacao) in ESPECIFICACAO_METRICAS.items()
         }
-        
-        return metricas
     
-    def identificar_outliers_vendas(self, vendas_enriquecidas):
-        q1 = vendas_enriquecidas['Valor Total'].quantile(0.25)
-        q3 = vendas_enriquecidas['Valor Total'].quantile(0.75)
-        iqr = q3 - q1
+    def calcular_metricas_agregadas(self, vendas_enriquecidas):
+        if isinstance(vendas_enriquecidas, pd.DataFrame):
+            return self.finalizar_metricas(self.calcular_metricas_parciais(vendas_enriquecidas))
         
-        limite_inferior = q1 - (1.5 * iqr)
-        limite_superior = q3 + (1.5 * iqr)
+        # Iterável de blocos: combina os parciais à medida que chegam
+        acumulado = None
+        for bloco in vendas_enriquecidas:
+            acumulado = self.combinar_metricas_parciais(acumulado, self.calcular_metricas_parciais(bloco))
         
-        outliers = vendas_enriquecidas[
-            (vendas_enriquecidas['Valor Total'] < limite_inferior) |
-            (vendas_enriquecidas['Valor Total'] > limite_superior)
-        ].copy()
+        if acumulado is None:
+            raise ValueError("Nenhum bloco de vendas recebido")
         
+        return self.finalizar_metricas(acumulado)
+    
+    def _dimensoes_outliers(self, por):
+        if por is None:
+            return []
+        return [por] if isinstance(por, str) else list(por)
+    
+    def criar_sketch_outliers(self, por='Categoria', precisao=PRECISAO_PADRAO):
+        # Acumula os quartis por grupo ao longo de blocos (SketchQuantis.atualizar / combinar)
+        return SketchQuantis(self._dimensoes_outliers(por), coluna='Valor Total', precisao=precisao)
+    
+    def limites_iqr(self, quartis):
+        limites = pd.DataFrame({'Q1': quartis[0.25], 'Q3': quartis[0.75]})
+        iqr = limites['Q3'] - limites['Q1']
+        limites['Limite_Inferior'] = limites['Q1'] - (1.5 * iqr)
+        limites['Limite_Superior'] = limites['Q3'] + (1.5 * iqr)
+        return limites
+    
+    def calcular_limites_outliers(self, vendas_enriquecidas, por='Categoria', exato=False,
+                                  precisao=PRECISAO_PADRAO):
+        dimensoes = self._dimensoes_outliers(por)
+        
+        if not exato:
+            sketch = SketchQuantis.construir(vendas_enriquecidas, dimensoes, 'Valor Total', precisao)
+            return self.limites_iqr(sketch.quantis([0.25, 0.75]))
+        
+        # Modo exato (ordenação completa por grupo), mantido para validar o sketch
+        if dimensoes:
+            quartis = vendas_enriquecidas.groupby(dimensoes, observed=True)['Valor Total'] \
+                .quantile([0.25, 0.75]).unstack()
+        else:
+            quartis = vendas_enriquecidas['Valor Total'].quantile([0.25, 0.75]).to_frame().T
+            quartis = quartis.reset_index(drop=True)
+        return self.limites_iqr(quartis)
+    
+    def marcar_outliers(self, vendas_enriquecidas, limites):
+        dimensoes = [nome for nome in limites.index.names if nome is not None]
+        
+        if dimensoes:
+            # Chaves como object: limites e vendas podem vir de colunas categóricas ou não
+            chaves = pd.MultiIndex.from_frame(vendas_enriquecidas[dimensoes].astype(object))
+            indice = pd.MultiIndex.from_frame(limites.index.to_frame(index=False).astype(object))
+            alinhados = limites.set_axis(indice).reindex(chaves)
+            inferior = alinhados['Limite_Inferior'].to_numpy()
+            superior = alinhados['Limite_Superior'].to_numpy()
+        else:
+            inferior = np.full(len(vendas_enriquecidas), limites['Limite_Inferior'].iloc[0])
+            superior = np.full(len(vendas_enriquecidas), limites['Limite_Superior'].iloc[0])
+        
+        valores = vendas_enriquecidas['Valor Total'].to_numpy()
+        fora = (valores < inferior) | (valores > superior)
+        
+        outliers = vendas_enriquecidas[fora].copy()
+        outliers['Limite_Inferior'] = inferior[fora]
+        outliers['Limite_Superior'] = superior[fora]
         outliers['Tipo_Outlier'] = np.where(
-            outliers['Valor Total'] > limite_superior,
+            outliers['Valor Total'] > outliers['Limite_Superior'],
             'Venda Alta',
             'Venda Baixa'
         )
         
         return outliers
     
+    def identificar_outliers_vendas(self, vendas_enriquecidas, por='Categoria', exato=False,
+                                    precisao=PRECISAO_PADRAO):
+        # IQR por grupo: um notebook só é atípico quando comparado a outros notebooks (por=None: global)
+        limites = self.calcular_limites_outliers(vendas_enriquecidas, por, exato, precisao)
+        return self.marcar_outliers(vendas_enriquecidas, limites)
+    
     def gerar_dataset_analise(self, output_path='data/dataset_processado.xlsx'):
         vendas_enriquecidas = self.enriquecer_vendas_com_produtos()
         metricas = self.calcular_metricas_agregadas(vendas_enriquecidas)
         
+        # Linhas rejeitadas na validação, com as regras violadas, ao lado do dataset
+        self.validador.gravar(os.path.join(os.path.dirname(output_path), os.path.basename(CAMINHO_QUARENTENA)))
+        
+        # Acima do limite de linhas do Excel o modo streaming é obrigatório (abas de continuação)
+        if self.excel_streaming or precisa_streaming(vendas_enriquecidas, self.produtos, self.estoque):
+            with EscritorExcelStreaming(output_path) as escritor:
+                escritor.escrever_aba('Vendas_Processadas', vendas_enriquecidas)
+                escritor.escrever_aba('Produtos_Validados', self.produtos)
+                escritor.escrever_aba('Estoque_Validado', self.estoque)
+                
+                for nome, df in metricas.items():
+                    escritor.escrever_aba(f'Metricas_{nome}', df, index=True)
+            
+            return output_path
+        
         with pd.ExcelWriter(output_path, engine='openpyxl') as writer:
             vendas_enriquecidas.to_excel(writer, sheet_name='Vendas_Processadas', index=False)
             self.produtos.to_excel(writer, sheet_name='Produtos_Validados', index=False)
@@ -176,45 +361,365 @@ class ProcessadorDados:
         
         return output_path
     
+    def atualizar_dataset_incremental(self, vendas_novas, metricas, output_path='data/dataset_processado.xlsx'):
+        # Sem regravar o histórico: vendas novas anexadas a Vendas_Processadas, demais abas substituídas
+        if not os.path.exists(output_path):
+            return None
+        
+        with pd.ExcelWriter(output_path, engine='openpyxl', mode='a', if_sheet_exists='overlay') as writer:
+            livro = writer.book
+            abas_vendas = ['Vendas_Processadas'] + abas_continuacao('Vendas_Processadas', livro.sheetnames)
+            ws = livro[abas_vendas[-1]]
+            # Mesma ordem de colunas do que já está gravado
+            novas = vendas_novas.reindex(columns=[celula.value for celula in ws[1]])
+            
+            inicio = 0
+            numero = len(abas_vendas)
+            while inicio < len(novas):
+                livres = LIMITE_LINHAS_EXCEL - ws.max_row
+                if livres <= 0:
+                    numero += 1
+                    nome = nome_continuacao('Vendas_Processadas', numero)
+                    novas.iloc[:0].to_excel(writer, sheet_name=nome, index=False)
+                    ws = livro[nome]
+                    continue
+                parte = novas.iloc[inicio:inicio + livres]
+                parte.to_excel(writer, sheet_name=ws.title, startrow=ws.max_row, header=False, index=False)
+                inicio += len(parte)
+            
+            # Produtos e estoque são revalidados e a previsão refeita a cada execução: abas substituídas
+            for aba, df in (('Produtos_Validados', self.produtos), ('Estoque_Validado', self.estoque)):
+                if aba in livro.sheetnames:
+                    livro.remove(livro[aba])
+                df.to_excel(writer, sheet_name=aba, index=False)
+            
+            for nome, df in metricas.items():
+                aba = f'Metricas_{nome}'
+                if aba in livro.sheetnames:
+                    livro.remove(livro[aba])
+                df.to_excel(writer, sheet_name=aba)
+        
+        return output_path
+    
+    def _datas_e_ids(self, df_vendas_raw):
+        datas = pd.to_datetime(df_vendas_raw['Data'], format='%d/%m/%Y', errors='coerce')
+        return datas, df_vendas_raw['ID Venda']
+    
+    def _assinatura_produtos(self):
+        colunas = self.produtos[['Código', 'Custo Aquisição', 'Margem_Real', 'Fornecedor']]
+        return str(int(pd.util.hash_pandas_object(colunas, index=False).sum()))
+    
+    def salvar_estado_incremental(self, df_vendas_raw, agregados):
+        # agregados: cubo das métricas, demanda diária da previsão e sketch dos outliers
+        datas, ids = self._datas_e_ids(df_vendas_raw)
+        validas = datas.notna()
+        
+        if validas.any():
+            ultima_data = datas[validas].max()
+            ids_ultima_data = ids[validas & (datas == ultima_data) & ids.notna()]
+            ultimo_id = int(ids_ultima_data.max()) if len(ids_ultima_data) else None
+            marca = {'data': ultima_data.strftime('%Y-%m-%d'), 'id_venda': ultimo_id}
+        else:
+            marca = None
+        
+        os.makedirs(self.estado_dir, exist_ok=True)
+        pd.to_pickle(agregados, os.path.join(self.estado_dir, 'agregados.pkl'))
+        
+        estado = {
+            'marca_dagua': marca,
+            'linhas_processadas': int(validas.sum()),
+            'assinatura_produtos': self._assinatura_produtos(),
+            'atualizado_em': datetime.now().strftime('%d/%m/%Y %H:%M:%S')
+        }
+        with open(os.path.join(self.estado_dir, 'estado.json'), 'w', encoding='utf-8') as f:
+            json.dump(estado, f, ensure_ascii=False, indent=2)
+        
+        return estado
+    
+    def carregar_estado_incremental(self):
+        try:
+            with open(os.path.join(self.estado_dir, 'estado.json'), 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+            agregados = pd.read_pickle(os.path.join(self.estado_dir, 'agregados.pkl'))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None, None
+        
+        return estado, agregados
+    
+    def separar_vendas_novas(self, df_vendas_raw, estado):
+        datas, ids = self._datas_e_ids(df_vendas_raw)
+        marca = estado['marca_dagua']
+        
+        if marca is None:
+            novas = datas.notna()
+        else:
+            ultima_data = pd.Timestamp(marca['data'])
+            # Sem ID válido na última data gravada, qualquer venda com ID nessa data é nova
+            posteriores = ids.notna() if marca['id_venda'] is None else ids > marca['id_venda']
+            novas = (datas > ultima_data) | ((datas == ultima_data) & posteriores)
+        
+        # Se o histórico já processado mudou (não foi só acrescentado), o estado não vale mais
+        antigas = datas.notna() & ~novas
+        if int(antigas.sum()) != estado['linhas_processadas']:
+            return None
+        
+        return df_vendas_raw[novas]
+    
+    def executar_pipeline_incremental(self):
+        print('\nExecutando pipeline ETL incremental...\n')
+        
+        print('1. Carregando dados brutos e estado anterior...')
+        with self.instrumentador.etapa('carregar_dados') as etapa:
+            df_produtos_raw = carregar_produtos()
+            df_estoque_raw = carregar_estoque()
+            df_vendas_raw = self.carregar_vendas_brutas()
+            estado, agregados = self.carregar_estado_incremental()
+            etapa['linhas_saida'] = len(df_produtos_raw) + len(df_estoque_raw) + len(df_vendas_raw)
+        
+        with self.instrumentador.etapa('validar_produtos_estoque',
+                                       len(df_produtos_raw) + len(df_estoque_raw)) as etapa:
+            self.produtos = self.validar_produtos(df_produtos_raw)
+            self.estoque = self.validar_estoque(df_estoque_raw)
+            etapa['linhas_saida'] = len(self.produtos) + len(self.estoque)
+        
+        if estado is None:
+            print('   Nenhum estado anterior encontrado: executando pipeline completo')
+            return self.executar_pipeline()
+        
+        if estado['assinatura_produtos'] != self._assinatura_produtos():
+            print('   Cadastro de produtos alterado: executando pipeline completo')
+            return self.executar_pipeline()
+        
+        if self.outliers_exato:
+            print('   Quartis exatos exigem o histórico completo: executando pipeline completo')
+            return self.executar_pipeline()
+        
+        if agregados['outliers'].dimensoes != self._dimensoes_outliers(self.outliers_por):
+            print('   Escopo dos outliers alterado: executando pipeline completo')
+            return self.executar_pipeline()
+        
+        df_novas_raw = self.separar_vendas_novas(df_vendas_raw, estado)
+        if df_novas_raw is None:
+            print('   Histórico de vendas alterado: executando pipeline completo')
+            return self.executar_pipeline()
+        
+        marca = estado['marca_dagua']
+        if marca is not None:
+            print(f'   Marca d\'água: {marca["data"]} / ID Venda {marca["id_venda"]}')
+        print(f'   Vendas novas: {len(df_novas_raw)} de {len(df_vendas_raw)} registros')
+        
+        print('\n2. Validando e enriquecendo vendas novas...')
+        with self.instrumentador.etapa('validar_enriquecer_vendas', len(df_novas_raw)) as etapa:
+            self.vendas = self.validar_vendas(df_novas_raw)
+            if self.compacto:
+                self.vendas = self.compactar_vendas(self.vendas)
+            vendas_novas = self.enriquecer_vendas_com_produtos()
+            etapa['linhas_saida'] = len(vendas_novas)
+        print(f'   Vendas novas válidas: {len(vendas_novas)}')
+        
+        print('\n3. Incorporando ao estado agregado...')
+        with self.instrumentador.etapa('metricas_incrementais', len(vendas_novas)) as etapa:
+            agregados = {
+                'metricas': self.combinar_metricas_parciais(agregados['metricas'],
+                                                            self.calcular_metricas_parciais(vendas_novas)),
+                'demanda': self.previsor.demanda_diaria(vendas_novas, agregados['demanda']),
+                'outliers': SketchQuantis.combinar(agregados['outliers'],
+                                                   self.criar_sketch_outliers(self.outliers_por).atualizar(vendas_novas))
+            }
+            metricas = self.finalizar_metricas(agregados['metricas'])
+            self.salvar_estado_incremental(df_vendas_raw, agregados)
+            etapa['linhas_saida'] = sum(len(df) for df in metricas.values())
+        print(f'   {len(metricas)} conjuntos de métricas atualizados')
+        
+        print('\n4. Prevendo demanda por produto e filial...')
+        with self.instrumentador.etapa('prever_demanda', len(agregados['demanda'])) as etapa:
+            previsao = self.prever_demanda(agregados['demanda'])
+            etapa['linhas_saida'] = len(previsao)
+        repor = int((self.estoque['Quantidade_Sugerida'] > 0).sum())
+        print(f'   {len(previsao)} séries previstas ({self.previsor.frequencia}); {repor} itens com reposição sugerida')
+        
+        print('\n5. Identificando outliers nas vendas novas...')
+        with self.instrumentador.etapa('identificar_outliers', len(vendas_novas)) as etapa:
+            # Limites do histórico inteiro, vindos do sketch acumulado no estado
+            limites = self.limites_iqr(agregados['outliers'].quantis([0.25, 0.75]))
+            outliers = self.marcar_outliers(vendas_novas, limites)
+            etapa['linhas_saida'] = len(outliers)
+        print(f'   {len(outliers)} vendas atípicas identificadas')
+        
+        print('\n6. Atualizando dataset processado...')
+        output_path = 'data/dataset_processado.xlsx'
+        with self.instrumentador.etapa('atualizar_dataset', len(vendas_novas)):
+            output_file = self.atualizar_dataset_incremental(vendas_novas, metricas, output_path)
+            caminho_quarentena = os.path.join(os.path.dirname(output_path), os.path.basename(CAMINHO_QUARENTENA))
+            self.validador.incorporar_gravada('vendas', caminho_quarentena)
+            self.validador.gravar(caminho_quarentena)
+        if output_file is None:
+            print('   Dataset processado não encontrado: execute o pipeline completo para gerá-lo')
+        else:
+            print(f'   Salvo em: {output_file}')
+        print(f'   Quarentena: {self.validador.total_rejeitadas()} linhas rejeitadas')
+        
+        print('\nPipeline ETL incremental concluído com sucesso!\n')
+        
+        return {
+            'produtos': self.produtos,
+            'estoque': self.estoque,
+            'vendas': vendas_novas,
+            'metricas': metricas,
+            'outliers': outliers
+        }
+    
+    def carregar_e_validar(self, inicio=None, fim=None, filiais=None):
+        # Com armazém atualizado as vendas vêm só das partições do período/filiais pedidos, já validadas
+        if self.armazem is not None and self.armazem.atualizado():
+            return self._carregar_do_armazem(inicio, fim, filiais)
+        
+        with self.instrumentador.etapa('carregar_dados') as etapa:
+            self.brutos = {
+                'produtos': carregar_produtos(),
+                'estoque': carregar_estoque(),
+                'vendas': self.carregar_vendas_brutas()
+            }
+            etapa['linhas_saida'] = sum(len(df) for df in self.brutos.values())
+        
+        with self.instrumentador.etapa('validar_dados', etapa['linhas_saida']) as etapa:
+            self.produtos = self.validar_produtos(self.brutos['produtos'])
+            self.estoque = self.validar_estoque(self.brutos['estoque'])
+            self.vendas = self.validar_vendas(self.brutos['vendas'])
+            etapa['linhas_saida'] = len(self.produtos) + len(self.estoque) + len(self.vendas)
+        
+        if self.armazem is not None:
+            self.gravar_armazem()
+        
+        self.vendas = filtrar_periodo(self.vendas, inicio, fim, filiais)
+        if self.compacto:
+            self.vendas = self.compactar_vendas(self.vendas)
+        
+        return self
+    
+    def _carregar_do_armazem(self, inicio, fim, filiais):
+        with self.instrumentador.etapa('carregar_dados') as etapa:
+            self.brutos = {'produtos': carregar_produtos(), 'estoque': carregar_estoque()}
+            self.produtos = self.validar_produtos(self.brutos['produtos'])
+            self.estoque = self.validar_estoque(self.brutos['estoque'])
+            etapa['linhas_saida'] = len(self.produtos) + len(self.estoque)
+        
+        with self.instrumentador.etapa('ler_armazem', self.armazem.catalogo['linhas']) as etapa:
+            self.vendas = self.armazem.ler(inicio, fim, filiais)
+            # A chave gravada vale para o cadastro da época; o atual pode ter mudado
+            self.atribuir_chave_produto(self.vendas, 'Cód. Produto')
+            self.brutos['vendas'] = self.vendas
+            if self.compacto:
+                self.vendas = self.compactar_vendas(self.vendas)
+            etapa['linhas_saida'] = len(self.vendas)
+        
+        return self
+    
+    def gravar_armazem(self):
+        with self.instrumentador.etapa('gravar_armazem', len(self.vendas)) as etapa:
+            catalogo = self.armazem.gravar(self.vendas)
+            etapa['linhas_saida'] = catalogo['linhas']
+        return catalogo
+    
     def executar_pipeline(self):
         print('\nExecutando pipeline ETL...\n')
         
         print('1. Carregando dados brutos...')
-        df_produtos_raw = pd.read_excel('data/produtos.xlsx')
-        df_estoque_raw = pd.read_excel('data/estoque_filiais.xlsx')
-        df_vendas_raw = pd.read_excel('data/vendas_jan_jun_2024.xlsx')
+        with self.instrumentador.etapa('carregar_dados') as etapa:
+            df_produtos_raw = carregar_produtos()
+            df_estoque_raw = carregar_estoque()
+            df_vendas_raw = self.carregar_vendas_brutas()
+            etapa['linhas_saida'] = len(df_produtos_raw) + len(df_estoque_raw) + len(df_vendas_raw)
+        
+        self.brutos = {'produtos': df_produtos_raw, 'estoque': df_estoque_raw, 'vendas': df_vendas_raw}
         
         print(f'   Produtos: {len(df_produtos_raw)} registros')
         print(f'   Estoque: {len(df_estoque_raw)} registros')
         print(f'   Vendas: {len(df_vendas_raw)} registros')
+        self.imprimir_relatorio_carga()
         
         print('\n2. Validando e transformando produtos...')
-        self.produtos = self.validar_produtos(df_produtos_raw)
+        with self.instrumentador.etapa('validar_produtos', len(df_produtos_raw)) as etapa:
+            self.produtos = self.validar_produtos(df_produtos_raw)
+            etapa['linhas_saida'] = len(self.produtos)
         print(f'   Produtos válidos: {len(self.produtos)}')
         
         print('\n3. Validando e transformando estoque...')
-        self.estoque = self.validar_estoque(df_estoque_raw)
+        with self.instrumentador.etapa('validar_estoque', len(df_estoque_raw)) as etapa:
+            self.estoque = self.validar_estoque(df_estoque_raw)
+            etapa['linhas_saida'] = len(self.estoque)
         print(f'   Registros válidos: {len(self.estoque)}')
         
         print('\n4. Validando e transformando vendas...')
-        self.vendas = self.validar_vendas(df_vendas_raw)
+        with self.instrumentador.etapa('validar_vendas', len(df_vendas_raw)) as etapa:
+            self.vendas = self.validar_vendas(df_vendas_raw)
+            etapa['linhas_saida'] = len(self.vendas)
         print(f'   Vendas válidas: {len(self.vendas)}')
-        
-        print('\n5. Enriquecendo dados de vendas...')
-        vendas_enriquecidas = self.enriquecer_vendas_com_produtos()
+        self.validador.imprimir_resumo()
+        
+        if self.armazem is not None:
+            catalogo = self.gravar_armazem()
+            print(f'   Armazém: {len(catalogo["particoes"])} partições em {self.armazem.diretorio}')
+        
+        if self.compacto:
+            with self.instrumentador.etapa('compactar_vendas', len(self.vendas)) as etapa:
+                antes = bytes_por_linha(self.vendas)
+                self.vendas = self.compactar_vendas(self.vendas)
+                depois = bytes_por_linha(self.vendas)
+                etapa['linhas_saida'] = len(self.vendas)
+            print(f'   Representação compacta: {antes:.0f} -> {depois:.0f} bytes por linha')
+        
+        print('\n5. Prevendo demanda por produto e filial...')
+        with self.instrumentador.etapa('prever_demanda', len(self.vendas)) as etapa:
+            previsao = self.prever_demanda()
+            etapa['linhas_saida'] = len(previsao)
+        repor = int((self.estoque['Quantidade_Sugerida'] > 0).sum())
+        print(f'   {len(previsao)} séries previstas ({self.previsor.frequencia}); {repor} itens com reposição sugerida')
+        
+        print('\n6. Montando esquema estrela...')
+        with self.instrumentador.etapa('esquema_estrela', len(self.vendas)) as etapa:
+            esquema = self.construir_esquema_estrela()
+            etapa['linhas_saida'] = len(esquema.fato_vendas) + len(esquema.fato_estoque)
+        sem_chave = esquema.chaves_sem_correspondencia()
+        print(f'   Dimensões: {len(esquema.dim_produto)} produtos, {len(esquema.dim_filial)} filiais, '
+              f'{len(esquema.dim_data)} datas')
+        print(f'   Sem produto no cadastro: {sem_chave["vendas"][CHAVE_PRODUTO]} vendas, '
+              f'{sem_chave["estoque"][CHAVE_PRODUTO]} itens de estoque')
+        
+        print('\n7. Enriquecendo dados de vendas...')
+        with self.instrumentador.etapa('enriquecer_vendas', len(self.vendas)) as etapa:
+            vendas_enriquecidas = self.enriquecer_vendas_com_produtos()
+            etapa['linhas_saida'] = len(vendas_enriquecidas)
         print(f'   Vendas enriquecidas: {len(vendas_enriquecidas)} registros')
         
-        print('\n6. Calculando métricas agregadas...')
-        metricas = self.calcular_metricas_agregadas(vendas_enriquecidas)
+        print('\n8. Calculando métricas agregadas...')
+        with self.instrumentador.etapa('metricas_agregadas', len(vendas_enriquecidas)) as etapa:
+            # Quartis dos outliers e demanda diária vão junto com o cubo para o estado incremental
+            agregados = {
+                'metricas': self.calcular_metricas_parciais(vendas_enriquecidas),
+                'demanda': self.previsor.demanda_diaria(vendas_enriquecidas),
+                'outliers': self.criar_sketch_outliers(self.outliers_por).atualizar(vendas_enriquecidas)
+            }
+            metricas = self.finalizar_metricas(agregados['metricas'])
+            self.salvar_estado_incremental(df_vendas_raw, agregados)
+            etapa['linhas_saida'] = sum(len(df) for df in metricas.values())
         print(f'   {len(metricas)} conjuntos de métricas gerados')
         
-        print('\n7. Identificando outliers...')
-        outliers = self.identificar_outliers_vendas(vendas_enriquecidas)
+        print('\n9. Identificando outliers...')
+        with self.instrumentador.etapa('identificar_outliers', len(vendas_enriquecidas)) as etapa:
+            if self.outliers_exato:
+                outliers = self.identificar_outliers_vendas(vendas_enriquecidas, por=self.outliers_por, exato=True)
+            else:
+                limites = self.limites_iqr(agregados['outliers'].quantis([0.25, 0.75]))
+                outliers = self.marcar_outliers(vendas_enriquecidas, limites)
+            etapa['linhas_saida'] = len(outliers)
         print(f'   {len(outliers)} vendas atípicas identificadas')
         
-        print('\n8. Gerando dataset processado...')
-        output_file = self.gerar_dataset_analise()
+        print('\n10. Gerando dataset processado...')
+        with self.instrumentador.etapa('gerar_dataset', len(vendas_enriquecidas)):
+            output_file = self.gerar_dataset_analise()
         print(f'   Salvo em: {output_file}')
+        print(f'   Quarentena: {self.validador.total_rejeitadas()} linhas rejeitadas')
         
         print('\nPipeline ETL concluído com sucesso!\n')
         
@@ -225,16 +730,133 @@ class ProcessadorDados:
             'metricas': metricas,
             'outliers': outliers
         }
+    
+    def executar_pipeline_em_blocos(self, tamanho_bloco=TAMANHO_BLOCO_PADRAO):
+        print(f'\nExecutando pipeline ETL em blocos de {tamanho_bloco} vendas...\n')
+        
+        print('1. Validando produtos e estoque...')
+        with self.instrumentador.etapa('validar_produtos_estoque') as etapa:
+            self.produtos = self.validar_produtos(carregar_produtos())
+            self.estoque = self.validar_estoque(carregar_estoque())
+            etapa['linhas_saida'] = len(self.produtos) + len(self.estoque)
+        print(f'   Produtos válidos: {len(self.produtos)}')
+        print(f'   Registros de estoque válidos: {len(self.estoque)}')
+        
+        print('\n2. Validando, enriquecendo e agregando vendas por bloco...')
+        contagem = {'blocos': 0, 'vendas': 0}
+        # Os quartis para outliers são acumulados na mesma passada que as métricas
+        sketch = self.criar_sketch_outliers(self.outliers_por)
+        
+        def blocos_enriquecidos():
+            arquivos = None if self.fonte_vendas is None else listar_arquivos_vendas(self.fonte_vendas)
+            blocos = self.validar_vendas_em_blocos(carregar_vendas_em_blocos(tamanho_bloco, arquivos))
+            for bloco in blocos:
+                contagem['blocos'] += 1
+                contagem['vendas'] += len(bloco)
+                enriquecido = self.enriquecer_vendas_com_produtos(bloco)
+                sketch.atualizar(enriquecido)
+                yield enriquecido
+        
+        with self.instrumentador.etapa('processar_blocos_vendas') as etapa:
+            metricas = self.calcular_metricas_agregadas(blocos_enriquecidos())
+            etapa['linhas_saida'] = contagem['vendas']
+        print(f'   {contagem["blocos"]} blocos processados')
+        print(f'   Vendas válidas: {contagem["vendas"]}')
+        print(f'   {len(metricas)} conjuntos de métricas gerados')
+        
+        # Sem segunda leitura: limites por grupo e contagem estimada de outliers vêm do sketch
+        limites = self.limites_iqr(sketch.quantis([0.25, 0.75]))
+        limites['Outliers_Estimados'] = sketch.contar_fora(limites['Limite_Inferior'],
+                                                           limites['Limite_Superior'])
+        print(f'   {int(limites["Outliers_Estimados"].sum())} vendas atípicas estimadas')
+        
+        self.validador.imprimir_resumo()
+        print(f'   Quarentena: {self.validador.gravar()}')
+        
+        print('\nPipeline ETL em blocos concluído com sucesso!\n')
+        
+        return {
+            'produtos': self.produtos,
+            'estoque': self.estoque,
+            'metricas': metricas,
+            'limites_outliers': limites,
+            'num_vendas': contagem['vendas']
+        }
 
 def main():
-    processador = ProcessadorDados()
-    resultado = processador.executar_pipeline()
+    parser = argparse.ArgumentParser(description='Pipeline ETL de vendas e estoque')
+    parser.add_argument('--incremental', action='store_true',
+                        help='processa apenas as vendas posteriores à última execução')
+    parser.add_argument('--blocos', type=int, default=None, metavar='N',
+                        help='lê e agrega as vendas em blocos de N linhas (memória limitada; só métricas, sem dataset)')
+    parser.add_argument('--compacto', action='store_true',
+                        help='armazena as vendas com categorias e tipos numéricos reduzidos')
+    parser.add_argument('--excel-streaming', action='store_true',
+                        help='grava o dataset processado linha a linha (openpyxl write-only)')
+    parser.add_argument('--outliers-por', choices=ESCOPOS_OUTLIERS, default='categoria',
+                        help='grupo dentro do qual o IQR de Valor Total é calculado')
+    parser.add_argument('--outliers-exato', action='store_true',
+                        help='quartis exatos (ordenação completa) em vez do sketch aproximado')
+    parser.add_argument('--previsao-frequencia', choices=FREQUENCIAS, default='diaria',
+                        help='séries de demanda diárias ou semanais por produto e filial')
+    parser.add_argument('--previsao-horizonte', type=int, default=HORIZONTE_DIAS_PADRAO,
+                        help='dias de demanda prevista usados na cobertura e na reposição')
+    parser.add_argument('--armazem', action='store_true',
+                        help='grava as vendas validadas no armazém particionado por Ano/Mês')
+    parser.add_argument('--armazem-por-filial', action='store_true',
+                        help='com --armazem, particiona também por filial')
+    parser.add_argument('--vendas', default=None,
+                        help='planilha, diretório ou glob de planilhas de vendas (lidas em paralelo, sem IDs repetidos)')
+    parser.add_argument('--workers-carga', type=int, default=None,
+                        help='com --vendas, processos para ler as planilhas')
+    parser.add_argument('--instrumentar', action='store_true',
+                        help='grava log JSON com tempo, CPU, memória e linhas de cada etapa')
+    parser.add_argument('--memoria', action='store_true',
+                        help='com --instrumentar, pico de memória por etapa via tracemalloc (mais lento)')
+    parser.add_argument('--perfil', action='store_true',
+                        help='com --instrumentar, grava também um perfil cProfile por etapa')
+    args = parser.parse_args()
+    if args.blocos is not None:
+        if args.blocos < 1:
+            parser.error('--blocos precisa ser um inteiro positivo')
+        if args.incremental or args.armazem:
+            parser.error('--blocos não grava dataset nem armazém: não combina com --incremental/--armazem')
+    
+    instrumentador = None
+    if args.instrumentar:
+        instrumentador = Instrumentador.ativo('etl', memoria=args.memoria, perfil=args.perfil)
+    processador = ProcessadorDados(compacto=args.compacto, excel_streaming=args.excel_streaming,
+                                   instrumentador=instrumentador,
+                                   outliers_por=ESCOPOS_OUTLIERS[args.outliers_por],
+                                   outliers_exato=args.outliers_exato,
+                                   frequencia_previsao=args.previsao_frequencia,
+                                   horizonte_previsao=args.previsao_horizonte,
+                                   armazem=ArmazemVendas(por_filial=args.armazem_por_filial,
+                                                         fonte=args.vendas or ARQUIVO_VENDAS) if args.armazem else None,
+                                   fonte_vendas=args.vendas, workers_carga=args.workers_carga)
+    try:
+        if args.blocos:
+            resultado = processador.executar_pipeline_em_blocos(args.blocos)
+        elif args.incremental:
+            resultado = processador.executar_pipeline_incremental()
+        else:
+            resultado = processador.executar_pipeline()
+    finally:
+        if instrumentador is not None:
+            instrumentador.imprimir_resumo()
+            print(f'\nLog de execução: {instrumentador.salvar()}\n')
     
     print('Resumo do processamento:')
     print(f'- Produtos processados: {len(resultado["produtos"])}')
     print(f'- Estoque processado: {len(resultado["estoque"])}')
-    print(f'- Vendas processadas: {len(resultado["vendas"])}')
-    print(f'- Outliers identificados: {len(resultado["outliers"])}')
+    if args.blocos:
+        # O modo em blocos não retém as vendas: só a contagem e os outliers estimados pelo sketch
+        print(f'- Vendas processadas: {resultado["num_vendas"]}')
+        print(f'- Outliers estimados: {int(resultado["limites_outliers"]["Outliers_Estimados"].sum())}')
+    else:
+        print(f'- Vendas processadas: {len(resultado["vendas"])}')
+        if resultado['outliers'] is not None:
+            print(f'- Outliers identificados: {len(resultado["outliers"])}')
     print()
 
 if __name__ == '__main__':
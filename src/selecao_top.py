@@ -0,0 +1,102 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Seleção dos N primeiros por grupo
+Seleção parcial (argpartition) em vez de ordenar o quadro inteiro; empates resolvidos de forma determinística
+"""
+
+import pandas as pd
+import numpy as np
+
+
+def _chave_ordenacao(valores, ascendente):
+    # Menor chave = melhor posição; nulos sempre no fim, como em sort_values
+    chave = np.asarray(valores, dtype='float64')
+    chave = chave.copy() if ascendente else -chave
+    chave[np.isnan(chave)] = np.inf
+    return chave
+
+
+def _ordenar(posicoes, chave, desempate):
+    # Chave primeiro, depois colunas de desempate, por fim a posição original
+    colunas = [posicoes] + [d[posicoes] for d in reversed(desempate)] + [chave[posicoes]]
+    return posicoes[np.lexsort(colunas)]
+
+
+def _selecionar(posicoes, chave, k, desempate):
+    if len(posicoes) > k:
+        # Candidatos: tudo que empata com o k-ésimo entra, para o desempate decidir quem fica
+        limite = np.partition(chave[posicoes], k - 1)[k - 1]
+        posicoes = posicoes[chave[posicoes] <= limite]
+    return _ordenar(posicoes, chave, desempate)[:k]
+
+
+def indices_top_n(valores, n, ascendente=False, desempate=None, grupos=None):
+    # O(len + g·k log k): um argpartition por grupo e ordenação só dos candidatos;
+    # resultado agrupado pelo código do grupo e, dentro dele, na ordem do ranking
+    if n < 1:
+        raise ValueError("n deve ser pelo menos 1")
+
+    chave = _chave_ordenacao(valores, ascendente)
+    desempate = [np.asarray(d) for d in (desempate or [])]
+
+    if grupos is None:
+        return _selecionar(np.arange(len(chave)), chave, n, desempate)
+
+    grupos = np.asarray(grupos)
+    num_grupos = int(grupos.max()) + 1 if len(grupos) else 0
+    if num_grupos == 0:
+        # Nenhuma linha com grupo (vazio ou todas as chaves nulas)
+        return np.zeros(0, dtype='int64')
+    tamanhos = np.bincount(grupos[grupos >= 0], minlength=num_grupos)
+
+    # Limite de cada grupo = k-ésima melhor chave; grupos com até k linhas aceitam tudo.
+    # Só o argpartition dos grupos grandes passa pelo laço, o resto é vetorizado
+    limites = np.full(num_grupos, np.inf)
+    grandes = np.flatnonzero(tamanhos > n)
+    if len(grandes):
+        # Códigos deslocados (sem grupo = 0) cabem em uint16 na maioria dos casos: argsort estável vira radix
+        codigos = grupos + 1
+        ordem = np.argsort(codigos.astype('uint16') if num_grupos < 2 ** 16 else codigos, kind='stable')
+        inicios = np.r_[0, np.cumsum(tamanhos)[:-1]] + int((grupos < 0).sum())
+        for g in grandes:
+            bloco = chave[ordem[inicios[g]:inicios[g] + tamanhos[g]]]
+            limites[g] = np.partition(bloco, n - 1)[n - 1]
+
+    validos = grupos >= 0
+    candidatos = np.flatnonzero(validos & (chave <= limites[np.where(validos, grupos, 0)]))
+    colunas = [candidatos] + [d[candidatos] for d in reversed(desempate)] + [chave[candidatos], grupos[candidatos]]
+    candidatos = candidatos[np.lexsort(colunas)]
+
+    # Posição de cada candidato dentro do seu grupo; ficam os n primeiros
+    selecionados = grupos[candidatos]
+    inicio = np.r_[0, np.flatnonzero(np.diff(selecionados)) + 1]
+    posicao = np.arange(len(candidatos)) - np.repeat(inicio, np.diff(np.r_[inicio, len(candidatos)]))
+    return candidatos[posicao < n]
+
+
+def top_n(df, coluna, n=10, por=None, ascendente=False, desempate=None, coluna_posicao=None):
+    # Empates em `coluna`: colunas de `desempate` (crescentes) e depois a ordem original;
+    # grupos em ordem crescente, `coluna_posicao` acrescenta o ranking (1..n) dentro do grupo
+    desempate = [desempate] if isinstance(desempate, str) else list(desempate or [])
+    valores_desempate = [pd.factorize(df[c], sort=True)[0] for c in desempate]
+
+    grupos = None
+    if por is not None:
+        por = [por] if isinstance(por, str) else list(por)
+        chaves_grupo = df[por[0]] if len(por) == 1 else pd.MultiIndex.from_frame(df[por])
+        grupos = pd.factorize(chaves_grupo, sort=True)[0]
+
+    posicoes = indices_top_n(df[coluna].to_numpy(dtype='float64'), n, ascendente, valores_desempate, grupos)
+    resultado = df.iloc[posicoes]
+
+    if coluna_posicao is not None:
+        resultado = resultado.copy()
+        if grupos is None:
+            resultado[coluna_posicao] = np.arange(1, len(posicoes) + 1)
+        else:
+            selecionados = grupos[posicoes]
+            inicio = np.r_[0, np.flatnonzero(np.diff(selecionados)) + 1]
+            tamanhos = np.diff(np.r_[inicio, len(selecionados)])
+            resultado[coluna_posicao] = np.arange(len(selecionados)) - np.repeat(inicio, tamanhos) + 1
+
+    return resultado
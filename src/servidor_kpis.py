@@ -0,0 +1,384 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Servidor local de consultas de KPIs
+HTTP assíncrono (asyncio puro) sobre os dados carregados uma vez em memória; filtros por período, filial e categoria
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+
+from analise_estoque import classificar_estoque
+from selecao_top import indices_top_n
+
+HOST_PADRAO = '127.0.0.1'
+PORTA_PADRAO = 8765
+TOP_PADRAO = 10
+LIMITE_ALERTAS_PADRAO = 10
+TAMANHO_MAX_CABECALHO = 16 * 1024
+TEMPO_OCIOSO_S = 15
+
+STATUS_HTTP = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               431: 'Request Header Fields Too Large', 500: 'Internal Server Error'}
+
+
+def chave_filial(filial):
+    # Mesma chave usada em kpis_por_filial.json ('Centro - SP' -> 'centro')
+    return str(filial).split(' - ')[0].lower()
+
+
+def _interpretar_data(texto, parametro):
+    for formato in ('%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return np.datetime64(pd.to_datetime(texto, format=formato).date(), 'D')
+        except (ValueError, TypeError):
+            continue
+    raise ValueError(f"Data inválida em '{parametro}': {texto} (use AAAA-MM-DD ou DD/MM/AAAA)")
+
+
+def _lista(parametros, nome):
+    valores = []
+    for valor in parametros.get(nome, []):
+        valores.extend(v.strip() for v in valor.split(',') if v.strip())
+    return valores
+
+
+def _inteiro(parametros, nome, padrao, minimo=1, maximo=1000):
+    valores = parametros.get(nome)
+    if not valores:
+        return padrao
+    try:
+        valor = int(valores[-1])
+    except ValueError:
+        raise ValueError(f"'{nome}' deve ser inteiro: {valores[-1]}")
+    if not minimo <= valor <= maximo:
+        raise ValueError(f"'{nome}' deve estar entre {minimo} e {maximo}")
+    return valor
+
+
+class ConsultasKPI:
+    # Consultas síncronas: colunas extraídas uma vez como arrays e códigos inteiros,
+    # cada consulta é uma máscara booleana seguida de bincount
+
+    def __init__(self, produtos, estoque, vendas):
+        self.produtos = produtos
+        self.estoque = estoque
+        self.num_vendas = len(vendas)
+
+        self._datas = vendas['Data'].to_numpy(dtype='datetime64[D]')
+        self._centavos = np.rint(vendas['Valor Total'].to_numpy(dtype='float64') * 100).astype('int64')
+        self._qtd = vendas['Qtd'].to_numpy(dtype='int64')
+
+        # np.asarray normaliza colunas categóricas (modo --compacto)
+        self._cod_filial, self.filiais = pd.factorize(np.asarray(vendas['Filial']), sort=True)
+        self._cod_categoria, self.categorias = pd.factorize(np.asarray(vendas['Categoria']), sort=True)
+        self._cod_produto, self._codigos_produto = pd.factorize(np.asarray(vendas['Cód. Produto']), sort=True)
+        nomes = pd.Series(np.asarray(vendas['Produto'])).groupby(self._cod_produto).first()
+        self._nomes_produto = nomes.reindex(range(len(self._codigos_produto))).to_numpy()
+
+        status = classificar_estoque(estoque)['Status']
+        alertas = estoque.loc[status.isin(['Crítico', 'Baixo'])].copy()
+        alertas['status'] = status[alertas.index]
+        self._alertas = alertas.sort_values('Quantidade Disponível', kind='stable')
+
+    @classmethod
+    def a_partir_do_processador(cls, processador):
+        return cls(processador.produtos, processador.estoque, processador.vendas)
+
+    def _resolver_filiais(self, nomes):
+        indices = []
+        for nome in nomes:
+            alvo = nome.lower()
+            encontrados = [i for i, f in enumerate(self.filiais) if alvo in (chave_filial(f), f.lower())]
+            if not encontrados:
+                opcoes = ', '.join(chave_filial(f) for f in self.filiais)
+                raise ValueError(f"Filial desconhecida: {nome} (opções: {opcoes})")
+            indices.extend(encontrados)
+        return indices
+
+    def _resolver_categorias(self, nomes):
+        por_nome = {c.lower(): i for i, c in enumerate(self.categorias)}
+        indices = []
+        for nome in nomes:
+            if nome.lower() not in por_nome:
+                raise ValueError(f"Categoria desconhecida: {nome} (opções: {', '.join(self.categorias)})")
+            indices.append(por_nome[nome.lower()])
+        return indices
+
+    def mascara(self, parametros):
+        mascara = np.ones(self.num_vendas, dtype=bool)
+
+        if parametros.get('inicio'):
+            mascara &= self._datas >= _interpretar_data(parametros['inicio'][-1], 'inicio')
+        if parametros.get('fim'):
+            mascara &= self._datas <= _interpretar_data(parametros['fim'][-1], 'fim')
+
+        filiais = _lista(parametros, 'filial')
+        if filiais:
+            mascara &= np.isin(self._cod_filial, self._resolver_filiais(filiais))
+        categorias = _lista(parametros, 'categoria')
+        if categorias:
+            mascara &= np.isin(self._cod_categoria, self._resolver_categorias(categorias))
+
+        return mascara
+
+    def kpis_gerais(self, parametros):
+        mascara = self.mascara(parametros)
+        total_vendas = int(mascara.sum())
+        faturamento = int(self._centavos[mascara].sum())
+        datas = self._datas[mascara]
+
+        return {
+            'faturamento_total': faturamento / 100,
+            'total_vendas': total_vendas,
+            'ticket_medio': round(faturamento / total_vendas / 100, 2) if total_vendas else 0.0,
+            'total_unidades': int(self._qtd[mascara].sum()),
+            'periodo': {
+                'inicio': str(datas.min()) if total_vendas else None,
+                'fim': str(datas.max()) if total_vendas else None
+            }
+        }
+
+    def vendas_filial(self, parametros):
+        mascara = self.mascara(parametros)
+        codigos = self._cod_filial[mascara]
+        tamanho = len(self.filiais)
+        faturamento = np.bincount(codigos, weights=self._centavos[mascara], minlength=tamanho)
+        num_vendas = np.bincount(codigos, minlength=tamanho)
+        unidades = np.bincount(codigos, weights=self._qtd[mascara], minlength=tamanho)
+
+        resultado = []
+        for i in np.argsort(-faturamento, kind='stable'):
+            if not num_vendas[i]:
+                continue
+            resultado.append({
+                'filial': self.filiais[i],
+                'chave': chave_filial(self.filiais[i]),
+                'faturamento': int(faturamento[i]) / 100,
+                'num_vendas': int(num_vendas[i]),
+                'unidades': int(unidades[i]),
+                'ticket_medio': round(faturamento[i] / num_vendas[i] / 100, 2)
+            })
+        return resultado
+
+    def top_produtos(self, parametros):
+        n = _inteiro(parametros, 'n', TOP_PADRAO)
+        mascara = self.mascara(parametros)
+        codigos = self._cod_produto[mascara]
+        tamanho = len(self._codigos_produto)
+        receita = np.bincount(codigos, weights=self._centavos[mascara], minlength=tamanho)
+        unidades = np.bincount(codigos, weights=self._qtd[mascara], minlength=tamanho)
+        transacoes = np.bincount(codigos, minlength=tamanho)
+
+        # Receita decrescente; empate resolvido pelo código do produto (índices já ordenados por código)
+        vendidos = np.flatnonzero(transacoes > 0)
+        ordem = vendidos[indices_top_n(receita[vendidos], n)]
+
+        return [{
+            'codigo': self._codigos_produto[i],
+            'produto': str(self._nomes_produto[i])[:50],
+            'receita': int(receita[i]) / 100,
+            'unidades': int(unidades[i]),
+            'transacoes': int(transacoes[i])
+        } for i in ordem]
+
+    def alertas_estoque(self, parametros):
+        limite = _inteiro(parametros, 'limite', LIMITE_ALERTAS_PADRAO)
+        alertas = self._alertas
+
+        filiais = _lista(parametros, 'filial')
+        if filiais:
+            nomes = [self.filiais[i] for i in self._resolver_filiais(filiais)]
+            alertas = alertas[alertas['Filial'].isin(nomes)]
+
+        return [{
+            'produto': linha['Produto'],
+            'filial': linha['Filial'],
+            'estoque_atual': int(linha['Quantidade Disponível']),
+            'estoque_minimo': int(linha['Estoque Mínimo']),
+            'status': linha['status']
+        } for _, linha in alertas.head(limite).iterrows()]
+
+    def dimensoes(self, parametros):
+        return {
+            'filiais': [{'filial': f, 'chave': chave_filial(f)} for f in self.filiais],
+            'categorias': list(self.categorias),
+            'periodo': {
+                'inicio': str(self._datas.min()) if self.num_vendas else None,
+                'fim': str(self._datas.max()) if self.num_vendas else None
+            },
+            'num_vendas': self.num_vendas
+        }
+
+
+class ServidorKPIs:
+
+    def __init__(self, consultas, host=HOST_PADRAO, porta=PORTA_PADRAO, max_workers=None):
+        self.consultas = consultas
+        self.host = host
+        self.porta = porta
+        # Consultas rodam em threads: o laço de eventos continua aceitando conexões durante o cálculo
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='kpis')
+        self.servidor = None
+        self.rotas = {
+            '/kpis/gerais': consultas.kpis_gerais,
+            '/kpis/filiais': consultas.vendas_filial,
+            '/kpis/top-produtos': consultas.top_produtos,
+            '/estoque/alertas': consultas.alertas_estoque,
+            '/dimensoes': consultas.dimensoes
+        }
+
+    async def iniciar(self):
+        self.servidor = await asyncio.start_server(self._atender, self.host, self.porta,
+                                                   limit=TAMANHO_MAX_CABECALHO)
+        # porta=0 escolhe uma porta livre; a porta efetiva fica disponível aqui
+        self.porta = self.servidor.sockets[0].getsockname()[1]
+        return self
+
+    async def servir(self):
+        if self.servidor is None:
+            await self.iniciar()
+        async with self.servidor:
+            await self.servidor.serve_forever()
+
+    async def fechar(self):
+        if self.servidor is not None:
+            self.servidor.close()
+            await self.servidor.wait_closed()
+        self.executor.shutdown(wait=False)
+
+    @property
+    def endereco(self):
+        return f'http://{self.host}:{self.porta}'
+
+    async def _responder(self, writer, status, corpo, manter_conexao):
+        conteudo = json.dumps(corpo, ensure_ascii=False).encode('utf-8')
+        cabecalho = (
+            f'HTTP/1.1 {status} {STATUS_HTTP[status]}\r\n'
+            'Content-Type: application/json; charset=utf-8\r\n'
+            f'Content-Length: {len(conteudo)}\r\n'
+            'Cache-Control: no-store\r\n'
+            f'Connection: {"keep-alive" if manter_conexao else "close"}\r\n\r\n'
+        )
+        writer.write(cabecalho.encode('latin-1') + conteudo)
+        await writer.drain()
+
+    async def _processar(self, metodo, alvo):
+        if metodo != 'GET':
+            return 405, {'erro': f'Método não suportado: {metodo}'}
+
+        url = urlsplit(alvo)
+        caminho = url.path.rstrip('/') or '/'
+        if caminho == '/':
+            return 200, {'rotas': sorted(self.rotas), 'filtros': ['inicio', 'fim', 'filial', 'categoria']}
+
+        consulta = self.rotas.get(caminho)
+        if consulta is None:
+            return 404, {'erro': f'Rota desconhecida: {caminho}', 'rotas': sorted(self.rotas)}
+
+        parametros = parse_qs(url.query)
+        inicio = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            dados = await loop.run_in_executor(self.executor, consulta, parametros)
+        except ValueError as erro:
+            return 400, {'erro': str(erro)}
+
+        return 200, {'dados': dados, 'tempo_ms': round((time.perf_counter() - inicio) * 1000, 2)}
+
+    async def _atender(self, reader, writer):
+        try:
+            while True:
+                try:
+                    bruto = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), TEMPO_OCIOSO_S)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._responder(writer, 431, {'erro': 'Cabeçalho muito grande'}, False)
+                    break
+
+                linhas = bruto.decode('latin-1').split('\r\n')
+                partes = linhas[0].split()
+                if len(partes) != 3:
+                    await self._responder(writer, 400, {'erro': 'Requisição malformada'}, False)
+                    break
+
+                metodo, alvo, versao = partes
+                cabecalhos = {}
+                for linha in linhas[1:]:
+                    nome, _, valor = linha.partition(':')
+                    if nome:
+                        cabecalhos[nome.strip().lower()] = valor.strip().lower()
+
+                conexao = cabecalhos.get('connection', '')
+                manter_conexao = conexao == 'keep-alive' or (versao == 'HTTP/1.1' and conexao != 'close')
+
+                # Corpo é descartado: todas as rotas são GET
+                tamanho_corpo = cabecalhos.get('content-length', '') or '0'
+                if not (tamanho_corpo.isascii() and tamanho_corpo.isdigit()):
+                    await self._responder(writer, 400, {'erro': 'Content-Length inválido'}, False)
+                    break
+                tamanho_corpo = int(tamanho_corpo)
+                if tamanho_corpo:
+                    await reader.readexactly(tamanho_corpo)
+
+                try:
+                    status, corpo = await self._processar(metodo, alvo)
+                except Exception as erro:
+                    status, corpo = 500, {'erro': f'{type(erro).__name__}: {erro}'}
+
+                await self._responder(writer, status, corpo, manter_conexao)
+                if not manter_conexao:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def carregar_consultas(compacto=False, instrumentador=None):
+    from processar_dados import ProcessadorDados
+
+    processador = ProcessadorDados(compacto=compacto, instrumentador=instrumentador)
+    processador.carregar_e_validar()
+    return ConsultasKPI.a_partir_do_processador(processador)
+
+
+async def executar_servidor(consultas, host=HOST_PADRAO, porta=PORTA_PADRAO, max_workers=None):
+    servidor = await ServidorKPIs(consultas, host, porta, max_workers).iniciar()
+    print(f'\nServidor de KPIs em {servidor.endereco} ({consultas.num_vendas} vendas em memória)')
+    print('Rotas: ' + ', '.join(sorted(servidor.rotas)))
+    print('Filtros: inicio, fim (AAAA-MM-DD), filial (ex.: centro), categoria; Ctrl+C encerra\n')
+    try:
+        await servidor.servir()
+    finally:
+        await servidor.fechar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local de consultas de KPIs')
+    parser.add_argument('--host', default=HOST_PADRAO, help='endereço de escuta (padrão: só esta máquina)')
+    parser.add_argument('--porta', type=int, default=PORTA_PADRAO, help='porta TCP (0 = escolhe uma livre)')
+    parser.add_argument('--workers', type=int, default=None, help='threads para as consultas')
+    parser.add_argument('--compacto', action='store_true',
+                        help='mantém as vendas em memória com categorias e tipos reduzidos')
+    args = parser.parse_args()
+
+    print('\nCarregando e validando dados...')
+    consultas = carregar_consultas(compacto=args.compacto)
+    try:
+        asyncio.run(executar_servidor(consultas, args.host, args.porta, args.workers))
+    except KeyboardInterrupt:
+        print('\nServidor encerrado\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Simulação Monte Carlo de ruptura de estoque
+Trajetórias de demanda diária por produto × filial até a próxima entrega, sorteadas do histórico em blocos de arrays NumPy
+"""
+
+import pandas as pd
+import numpy as np
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from previsao_demanda import PrevisorDemanda, CHAVES_ESTOQUE, PRAZO_REPOSICAO_DIAS_PADRAO
+from selecao_top import top_n
+
+CAMINHOS_PADRAO = 10000
+SEMENTE_PADRAO = 42
+HISTORICO_DIAS_PADRAO = 90
+
+# Blocos de tamanho fixo com sementes derivadas da semente base: o resultado não depende do número de processos
+SERIES_POR_BLOCO = 256
+MIN_SERIES_PARALELO = 2048
+
+
+def simular_bloco(historico, inicios, disponivel, prazo_dias, caminhos, semente):
+    # Cada dia do prazo sorteia um dia do histórico da própria série (a partir da primeira venda);
+    # ruptura = demanda acumulada no prazo acima do disponível, o excedente é venda perdida
+    rng = np.random.default_rng(semente)
+    num_series, num_dias = historico.shape
+    # Índices planos em int32 e sorteios em float32: metade da memória e do tempo por trajetória
+    plano = historico.astype('float32').ravel()
+    base = (np.arange(num_series) * num_dias + inicios).astype('int32')[:, None]
+    amplitude = (num_dias - inicios).astype('float32')[:, None]
+    ultimo = (num_dias - inicios - 1).astype('int32')[:, None]
+
+    demanda = np.zeros((num_series, caminhos), dtype='float32')
+    sorteio = np.empty((num_series, caminhos), dtype='float32')
+    for _ in range(prazo_dias):
+        rng.random(dtype='float32', out=sorteio)
+        sorteio *= amplitude
+        dias = np.minimum(sorteio.astype('int32'), ultimo)
+        dias += base
+        demanda += np.take(plano, dias)
+
+    falta = np.maximum(demanda - disponivel[:, None], 0)
+    return (falta > 0).mean(axis=1), falta.mean(axis=1), np.percentile(demanda, 95, axis=1)
+
+
+class SimuladorRuptura:
+
+    def __init__(self, caminhos=CAMINHOS_PADRAO, prazo_dias=PRAZO_REPOSICAO_DIAS_PADRAO,
+                 historico_dias=HISTORICO_DIAS_PADRAO, semente=SEMENTE_PADRAO, max_workers=None):
+        if caminhos < 1 or prazo_dias < 1 or historico_dias < 1:
+            raise ValueError("Caminhos, prazo e histórico devem ser positivos")
+
+        self.caminhos = caminhos
+        self.prazo_dias = prazo_dias
+        self.historico_dias = historico_dias
+        self.semente = semente
+        self.max_workers = max_workers
+
+    def historico_estoque(self, estoque, vendas):
+        # Demanda diária de cada linha do estoque; item sem vendas fica com histórico zerado
+        chaves, matriz, _ = PrevisorDemanda('diaria').construir_series(vendas)
+        matriz = matriz[:, -self.historico_dias:]
+        posicoes = chaves.get_indexer(pd.MultiIndex.from_frame(estoque[list(CHAVES_ESTOQUE)]))
+
+        historico = np.zeros((len(estoque), max(matriz.shape[1], 1)))
+        encontrado = posicoes >= 0
+        historico[encontrado, :matriz.shape[1]] = matriz[posicoes[encontrado]]
+
+        # Dias antes da primeira venda não entram no sorteio (produto ainda não era vendido)
+        vendeu = historico > 0
+        inicios = np.where(vendeu.any(axis=1), vendeu.argmax(axis=1), historico.shape[1] - 1)
+        return historico, inicios
+
+    def simular(self, estoque, vendas):
+        historico, inicios = self.historico_estoque(estoque, vendas)
+        disponivel = estoque['Quantidade Disponível'].to_numpy(dtype='float64')
+
+        limites = range(0, len(estoque), SERIES_POR_BLOCO)
+        sementes = np.random.SeedSequence(self.semente).spawn(len(limites))
+        trabalhos = [
+            (historico[i:i + SERIES_POR_BLOCO], inicios[i:i + SERIES_POR_BLOCO], disponivel[i:i + SERIES_POR_BLOCO],
+             self.prazo_dias, self.caminhos, semente)
+            for i, semente in zip(limites, sementes)
+        ]
+
+        # Catálogos pequenos ficam no processo atual: o custo de subir o pool seria maior que a simulação
+        if len(estoque) >= MIN_SERIES_PARALELO and self.max_workers != 1:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                resultados = list(executor.map(simular_bloco, *zip(*trabalhos)))
+        else:
+            resultados = [simular_bloco(*trabalho) for trabalho in trabalhos]
+
+        if resultados:
+            probabilidade, perdidas, demanda_p95 = (np.concatenate(partes) for partes in zip(*resultados))
+        else:
+            probabilidade = perdidas = demanda_p95 = np.zeros(0)
+
+        resultado = estoque.copy()
+        resultado['Demanda_Media_Dia'] = (historico.sum(axis=1) / (historico.shape[1] - inicios)).round(3)
+        resultado[f'Demanda_P95_{self.prazo_dias}d'] = demanda_p95.round(1)
+        resultado['Prob_Ruptura_%'] = (probabilidade * 100).round(1)
+        resultado['Vendas_Perdidas_Esperadas'] = perdidas.round(2)
+        return resultado
+
+    def ranking(self, resultado, n=10):
+        # Maior probabilidade primeiro; empate: mais vendas perdidas
+        resultado = resultado.assign(_perdidas=-resultado['Vendas_Perdidas_Esperadas'])
+        return top_n(resultado, 'Prob_Ruptura_%', n, desempate='_perdidas').drop(columns='_perdidas')
+
+
+def imprimir_ranking(ranking, simulador):
+    print(f'\nRisco de ruptura em {simulador.prazo_dias} dias '
+          f'({simulador.caminhos:,} trajetórias, semente {simulador.semente}):')
+    for _, item in ranking.iterrows():
+        print(f'   • {str(item["Produto"])[:45]} | {item["Filial"]}')
+        print(f'     Estoque: {int(item["Quantidade Disponível"])} | Ruptura: {item["Prob_Ruptura_%"]:.1f}% | '
+              f'Vendas perdidas esperadas: {item["Vendas_Perdidas_Esperadas"]:.1f} un.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulação Monte Carlo de ruptura de estoque')
+    parser.add_argument('--caminhos', type=int, default=CAMINHOS_PADRAO, help='trajetórias de demanda por item')
+    parser.add_argument('--prazo', type=int, default=PRAZO_REPOSICAO_DIAS_PADRAO,
+                        help='dias até a próxima entrega')
+    parser.add_argument('--historico', type=int, default=HISTORICO_DIAS_PADRAO,
+                        help='últimos N dias de vendas usados como distribuição da demanda')
+    parser.add_argument('--semente', type=int, default=SEMENTE_PADRAO, help='semente (resultado reprodutível)')
+    parser.add_argument('--workers', type=int, default=None, help='processos para catálogos grandes')
+    parser.add_argument('--top', type=int, default=10, help='itens exibidos no ranking')
+    parser.add_argument('--saida', default=None, help='grava o estoque com as colunas de risco em CSV')
+    args = parser.parse_args()
+
+    from processar_dados import ProcessadorDados
+
+    print('\nCarregando e validando dados...')
+    processador = ProcessadorDados().carregar_e_validar()
+    simulador = SimuladorRuptura(args.caminhos, args.prazo, args.historico, args.semente, args.workers)
+    resultado = simulador.simular(processador.estoque, processador.vendas)
+    imprimir_ranking(simulador.ranking(resultado, args.top), simulador)
+
+    if args.saida:
+        resultado.to_csv(args.saida, index=False)
+        print(f'\nSalvo em: {args.saida}')
+    print()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Sketch de quantis por grupo
+Histograma em baldes logarítmicos (estilo DDSketch): uma passada, sem ordenação e combinável entre blocos
+"""
+
+import pandas as pd
+import numpy as np
+
+PRECISAO_PADRAO = 0.01
+
+# Valores não positivos vão para um balde próprio, representado por zero
+BALDE_ZERO = np.iinfo('int64').min
+COLUNA_BALDE = '_balde'
+
+
+def _normalizar_dimensoes(dimensoes):
+    if dimensoes is None:
+        return []
+    if isinstance(dimensoes, str):
+        return [dimensoes]
+    return list(dimensoes)
+
+
+class SketchQuantis:
+
+    def __init__(self, dimensoes=None, coluna='Valor Total', precisao=PRECISAO_PADRAO):
+        if not 0 < precisao < 1:
+            raise ValueError("precisao deve estar entre 0 e 1")
+
+        self.dimensoes = _normalizar_dimensoes(dimensoes)
+        self.coluna = coluna
+        self.precisao = precisao
+        # Qualquer quantil estimado fica a no máximo `precisao` (relativa) do valor exato
+        self.gamma = (1 + precisao) / (1 - precisao)
+        self._log_gamma = np.log(self.gamma)
+        self.contagens = None
+
+    def _baldes(self, valores):
+        baldes = np.full(len(valores), BALDE_ZERO, dtype='int64')
+        positivos = valores > 0
+        baldes[positivos] = np.ceil(np.log(valores[positivos]) / self._log_gamma)
+        return baldes
+
+    def _valor_balde(self, baldes):
+        valores = 2 * np.power(self.gamma, baldes.astype('float64')) / (self.gamma + 1)
+        return np.where(baldes == BALDE_ZERO, 0.0, valores)
+
+    def atualizar(self, df):
+        valores = df[self.coluna].to_numpy(dtype='float64')
+        validos = ~np.isnan(valores)
+
+        # to_numpy também normaliza colunas categóricas: sketches de dados compactos combinam com os demais
+        chaves = pd.DataFrame({d: df[d].to_numpy()[validos] for d in self.dimensoes})
+        chaves[COLUNA_BALDE] = self._baldes(valores[validos])
+        contagens = chaves.groupby(self.dimensoes + [COLUNA_BALDE], dropna=False, sort=False).size()
+
+        if self.contagens is None:
+            self.contagens = contagens
+        else:
+            self.contagens = self.contagens.add(contagens, fill_value=0).astype('int64')
+        return self
+
+    @classmethod
+    def construir(cls, df, dimensoes=None, coluna='Valor Total', precisao=PRECISAO_PADRAO):
+        return cls(dimensoes, coluna, precisao).atualizar(df)
+
+    @classmethod
+    def combinar(cls, *sketches):
+        sketches = [s for s in sketches if s is not None]
+        if not sketches:
+            return None
+
+        base = sketches[0]
+        for outro in sketches[1:]:
+            if (outro.dimensoes, outro.coluna, outro.precisao) != (base.dimensoes, base.coluna, base.precisao):
+                raise ValueError("Sketches com dimensões, coluna ou precisão diferentes não podem ser combinados")
+
+        combinado = cls(base.dimensoes, base.coluna, base.precisao)
+        partes = [s.contagens for s in sketches if s.contagens is not None]
+        if partes:
+            niveis = list(range(partes[0].index.nlevels))
+            combinado.contagens = pd.concat(partes).groupby(level=niveis, dropna=False).sum()
+        return combinado
+
+    def _estrutura(self):
+        # Contagens ordenadas por grupo e balde crescente; códigos contíguos por grupo
+        contagens = self.contagens.sort_index()
+        baldes = contagens.index.get_level_values(COLUNA_BALDE).to_numpy(dtype='int64')
+
+        if self.dimensoes:
+            grupos_idx = contagens.index.droplevel(COLUNA_BALDE)
+            codigos, grupos = pd.factorize(grupos_idx, sort=False)
+            grupos = (pd.MultiIndex.from_tuples(grupos, names=self.dimensoes) if len(self.dimensoes) > 1
+                      else pd.Index(grupos, name=self.dimensoes[0]))
+        else:
+            codigos = np.zeros(len(contagens), dtype='int64')
+            grupos = pd.RangeIndex(1)
+
+        return codigos, grupos, baldes, contagens.to_numpy(dtype='int64')
+
+    def quantis(self, qs):
+        qs = list(qs)
+        if self.contagens is None or len(self.contagens) == 0:
+            return pd.DataFrame(columns=qs, dtype='float64')
+
+        codigos, grupos, baldes, contagens = self._estrutura()
+        totais = np.bincount(codigos, weights=contagens)
+        acumulado = np.cumsum(contagens)
+        inicio_grupo = np.concatenate([[0], np.cumsum(totais)[:-1]])
+        acumulado_grupo = acumulado - inicio_grupo[codigos]
+        valores = self._valor_balde(baldes)
+
+        resultado = {}
+        for q in qs:
+            if not 0 <= q <= 1:
+                raise ValueError(f"Quantil fora de [0, 1]: {q}")
+            # Primeiro balde cujo acumulado ultrapassa o posto q·(n-1), como no DDSketch
+            atingiu = np.flatnonzero(acumulado_grupo > q * (totais[codigos] - 1))
+            primeiro = atingiu[np.r_[True, codigos[atingiu][1:] != codigos[atingiu][:-1]]]
+            estimativas = np.full(len(grupos), np.nan)
+            estimativas[codigos[primeiro]] = valores[primeiro]
+            resultado[q] = estimativas
+
+        return pd.DataFrame(resultado, index=grupos)
+
+    def contar_fora(self, inferior, superior):
+        # inferior/superior: Series alinhadas ao índice de quantis(); contagem aproximada (resolução do balde)
+        if self.contagens is None:
+            return pd.Series(dtype='int64')
+
+        codigos, grupos, baldes, contagens = self._estrutura()
+        inferior = inferior.reindex(grupos).to_numpy(dtype='float64')[codigos]
+        superior = superior.reindex(grupos).to_numpy(dtype='float64')[codigos]
+        valores = self._valor_balde(baldes)
+
+        fora = (valores < inferior) | (valores > superior)
+        return pd.Series(np.bincount(codigos, weights=contagens * fora, minlength=len(grupos)).astype('int64'),
+                         index=grupos)
+
+    @property
+    def total(self):
+        return 0 if self.contagens is None else int(self.contagens.sum())
+
+    @property
+    def num_baldes(self):
+        return 0 if self.contagens is None else len(self.contagens)
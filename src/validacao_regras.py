@@ -0,0 +1,156 @@
+"""
+Sistema de Análise de Vendas e Estoque
+Validação por máscara única com quarentena
+Todas as regras avaliadas como máscaras sobre o quadro original; o quadro limpo é materializado uma vez e as linhas rejeitadas vão para a quarentena com as regras violadas
+"""
+
+import pandas as pd
+import numpy as np
+import time
+
+CAMINHO_QUARENTENA = 'data/quarentena_validacao.xlsx'
+COLUNA_REGRAS = 'Regras_Violadas'
+COLUNA_LINHA = 'Linha_Origem'
+
+
+def _obrigatorios(*colunas):
+    return lambda df, validas: df[list(colunas)].notna().all(axis=1)
+
+
+def _sem_duplicata(coluna):
+    # Duplicata só entre linhas ainda válidas: a primeira ocorrência válida é mantida
+    return lambda df, validas: ~(df[coluna].where(validas).duplicated().to_numpy() & validas)
+
+
+# Cada regra devolve True para as linhas que a respeitam; `validas` acumula as regras anteriores
+REGRAS_PRODUTOS = [
+    ('campos_obrigatorios', _obrigatorios('Código', 'Descrição', 'Preço Venda')),
+    ('codigo_duplicado', _sem_duplicata('Código')),
+    ('preco_venda_nao_positivo', lambda df, validas: df['Preço Venda'] > 0),
+    ('custo_nao_positivo', lambda df, validas: df['Custo Aquisição'] > 0)
+]
+
+REGRAS_ESTOQUE = [
+    ('campos_obrigatorios', _obrigatorios('Código Produto', 'Filial', 'Quantidade Disponível')),
+    ('quantidade_negativa', lambda df, validas: df['Quantidade Disponível'] >= 0)
+]
+
+REGRAS_VENDAS = [
+    ('valor_total_nao_positivo', lambda df, validas: df['Valor Total'] > 0),
+    ('quantidade_nao_positiva', lambda df, validas: df['Qtd'] > 0)
+]
+
+
+class ValidadorRegras:
+
+    def __init__(self):
+        self.contagens = {}
+        self.quarentenas = {}
+
+    def descartar(self, tabela):
+        self.contagens.pop(tabela, None)
+        self.quarentenas.pop(tabela, None)
+
+    def aplicar(self, tabela, df, regras, acumular=False, convertidas=None):
+        # acumular=True soma ao resultado anterior da tabela (validação em blocos);
+        # convertidas: colunas já transformadas que substituem as originais só no quadro limpo
+        if not acumular:
+            self.descartar(tabela)
+
+        validas = np.ones(len(df), dtype=bool)
+        falhas = {}
+        contagens = self.contagens.setdefault(tabela, {'linhas_entrada': 0, 'linhas_validas': 0, 'regras': {}})
+        for nome, regra in regras:
+            inicio = time.perf_counter()
+            falha = ~np.asarray(regra(df, validas), dtype=bool)
+            duracao = time.perf_counter() - inicio
+
+            validas &= ~falha
+            falhas[nome] = falha
+            acumulado = contagens['regras'].setdefault(nome, {'rejeitadas': 0, 'segundos': 0.0})
+            acumulado['rejeitadas'] += int(falha.sum())
+            acumulado['segundos'] += duracao
+
+        contagens['linhas_entrada'] += len(df)
+        contagens['linhas_validas'] += int(validas.sum())
+
+        rejeitadas = np.flatnonzero(~validas)
+        if len(rejeitadas):
+            quarentena = df.take(rejeitadas)
+            motivos = np.full(len(rejeitadas), '', dtype=object)
+            for nome, falha in falhas.items():
+                motivos = motivos + np.where(falha[rejeitadas], nome + ', ', '')
+            quarentena.insert(0, COLUNA_LINHA, df.index[rejeitadas])
+            quarentena.insert(0, COLUNA_REGRAS, [motivo[:-2] for motivo in motivos])
+            self.quarentenas.setdefault(tabela, []).append(quarentena.reset_index(drop=True))
+
+        # take com posições não deixa o resultado marcado como fatia: uma única cópia, sem avisos
+        posicoes = np.flatnonzero(validas)
+        limpo = df.take(posicoes)
+        for coluna, valores in (convertidas or {}).items():
+            limpo[coluna] = np.asarray(valores)[posicoes]
+        return limpo
+
+    def incorporar_gravada(self, tabela, caminho=CAMINHO_QUARENTENA):
+        # ETL incremental: contagens e linhas já em quarentena de execuções anteriores somam às desta
+        try:
+            abas = pd.read_excel(caminho, sheet_name=None)
+        except FileNotFoundError:
+            return False
+        resumo = abas.get('Resumo_Regras', pd.DataFrame(columns=['Tabela']))
+        resumo = resumo[resumo['Tabela'] == tabela]
+        if resumo.empty:
+            return False
+
+        contagens = self.contagens.setdefault(tabela, {'linhas_entrada': 0, 'linhas_validas': 0, 'regras': {}})
+        contagens['linhas_entrada'] += int(resumo['Linhas_Entrada'].iloc[0])
+        contagens['linhas_validas'] += int(resumo['Linhas_Validas'].iloc[0])
+        for linha in resumo.itertuples(index=False):
+            acumulado = contagens['regras'].setdefault(linha.Regra, {'rejeitadas': 0, 'segundos': 0.0})
+            acumulado['rejeitadas'] += int(linha.Rejeitadas)
+            acumulado['segundos'] += float(linha.Tempo_ms) / 1000
+
+        anteriores = abas.get(f'Quarentena_{tabela.capitalize()}')
+        if anteriores is not None and len(anteriores):
+            self.quarentenas.setdefault(tabela, []).insert(0, anteriores)
+        return True
+
+    def quarentena(self, tabela):
+        partes = self.quarentenas.get(tabela)
+        if not partes:
+            return pd.DataFrame(columns=[COLUNA_REGRAS, COLUNA_LINHA])
+        return pd.concat(partes, ignore_index=True)
+
+    def resumo(self):
+        linhas = []
+        for tabela, contagens in self.contagens.items():
+            for nome, regra in contagens['regras'].items():
+                linhas.append({
+                    'Tabela': tabela,
+                    'Regra': nome,
+                    'Linhas_Entrada': contagens['linhas_entrada'],
+                    'Rejeitadas': regra['rejeitadas'],
+                    'Linhas_Validas': contagens['linhas_validas'],
+                    'Tempo_ms': round(regra['segundos'] * 1000, 3)
+                })
+        return pd.DataFrame(linhas, columns=['Tabela', 'Regra', 'Linhas_Entrada', 'Rejeitadas',
+                                             'Linhas_Validas', 'Tempo_ms'])
+
+    def total_rejeitadas(self):
+        return sum(c['linhas_entrada'] - c['linhas_validas'] for c in self.contagens.values())
+
+    def gravar(self, caminho=CAMINHO_QUARENTENA):
+        with pd.ExcelWriter(caminho, engine='openpyxl') as writer:
+            self.resumo().to_excel(writer, sheet_name='Resumo_Regras', index=False)
+            for tabela in self.contagens:
+                self.quarentena(tabela).to_excel(writer, sheet_name=f'Quarentena_{tabela.capitalize()}',
+                                                 index=False)
+        return caminho
+
+    def imprimir_resumo(self):
+        for tabela, contagens in self.contagens.items():
+            rejeitadas = contagens['linhas_entrada'] - contagens['linhas_validas']
+            print(f'   {tabela}: {rejeitadas} de {contagens["linhas_entrada"]} linhas em quarentena')
+            for nome, regra in contagens['regras'].items():
+                if regra['rejeitadas']:
+                    print(f'      - {nome}: {regra["rejeitadas"]} ({regra["segundos"] * 1000:.1f} ms)')